@@ -0,0 +1,436 @@
+# Ambiente para aprendizado por reforço, com interface no estilo do Gym
+#
+# Env envolve uma Simulation: reset() começa o nível e step(ação) avança um
+# tick, devolvendo (observação, recompensa, terminou, truncou, info). A
+# ação é o valor de Action (0 a 6) e a recompensa é a variação da pontuação
+# do jogo (inimigos, power-ups e o bônus de nível limpo). O episódio termina
+# quando o nível é limpo ou as vidas acabam e é truncado em MAX_TICKS. As
+# observações são arrays NumPy pequenos:
+#
+#     walls    (H, W)     uint8  1 nas paredes
+#     enemies  (3, H, W)  uint8  inimigos positivos, negativos e dipolos por célula
+#     charges  (2, H, W)  uint8  cargas positivas e negativas colocadas: ticks até
+#                                sumirem (o campo fica ativo nos últimos FIELD_TICKS)
+#     player   (2,)       int32  x e y do jogador
+#
+# VectorEnv roda N tabuleiros independentes de uma vez. O estado de todos
+# fica em arrays (N, ...) e as regras de Simulation viram operações em lote,
+# então não há laço em Python por ambiente a cada passo; só o nível de quem
+# terminou o episódio é gerado (por create_level ou generate_level), um a um. As observações e
+# ações ganham a dimensão N na frente. Meta: > 100.000 passos de ambiente
+# por segundo por núcleo. Para medir:
+#
+#     python ambiente.py --envs 1024 --steps 2000
+
+import random
+import time
+
+import numpy as np
+
+from niveis import generate_level
+from simulacao import (GRID_WIDTH, GRID_HEIGHT, MAX_TICKS, GameState, ChargeType, PowerUpType,
+                       Action, Simulation, create_level)
+
+# Ticks entre colocar uma carga e ela sumir, e os últimos, com o campo ativo
+CHARGE_TICKS = 239
+FIELD_TICKS = 59
+
+# Cargas ao mesmo tempo: a inicial e a do power-up de campo extra (um
+# episódio é um nível só, com no máximo um power-up de cada)
+MAX_CHARGES = 2
+MAX_POWERUPS = 2
+
+# Ticks entre dois movimentos dos inimigos
+MOVE_EVERY = 30
+
+# Maior raio de campo considerado na linha de visão em lote (o raio começa
+# em 2 e cresce 0.5 por power-up)
+MAX_REACH = 4
+
+ACTIONS = list(Action)
+
+# Plano de cada carga de inimigo nas observações, indexado por q + 1
+CHANNELS = (1, 2, 0)
+
+# Deslocamento e sinal da carga colocada de cada ação, indexados pelo valor
+ACTION_X = np.array([0, -1, 1, 0, 0, 0, 0], dtype=np.int32)
+ACTION_Y = np.array([0, 0, 0, -1, 1, 0, 0], dtype=np.int32)
+ACTION_CHARGE = np.array([0, 0, 0, 0, 0, 1, -1], dtype=np.int8)
+
+# Direções do movimento aleatório, na mesma ordem de Enemy.update
+DIRECTION_X = np.array([0, 1, 0, -1], dtype=np.int32)
+DIRECTION_Y = np.array([1, 0, -1, 0], dtype=np.int32)
+
+def line_cells(dx, dy):
+    # Células que has_wall_between confere de uma carga em (0, 0) até um
+    # inimigo em (dx, dy): só dependem do deslocamento
+    cells = []
+    x = y = 0
+    sx = -1 if dx < 0 else 1
+    sy = -1 if dy < 0 else 1
+    ax, ay = abs(dx), abs(dy)
+    err = ax - ay
+    while x != dx or y != dy:
+        cells.append((x, y))
+        e2 = 2 * err
+        if e2 > -ay:
+            err -= ay
+            x += sx
+        if e2 < ax:
+            err += ax
+            y += sy
+    return cells
+
+def line_table(reach):
+    # Caminho de cada deslocamento da janela (2*reach+1)², completado com a
+    # célula da própria carga (nunca parede: o jogador estava lá)
+    side = 2 * reach + 1
+    lines = [line_cells(dx, dy) for dy in range(-reach, reach + 1) for dx in range(-reach, reach + 1)]
+    length = max(len(cells) for cells in lines)
+    table = np.zeros((side * side, length, 2), dtype=np.int32)
+    for i, cells in enumerate(lines):
+        if cells:
+            table[i, :len(cells)] = cells
+    return table[:, :, 0], table[:, :, 1]
+
+LINE_X, LINE_Y = line_table(MAX_REACH)
+
+def observe(sim):
+    grid = sim.grid
+    width, height = grid.width, grid.height
+    walls = np.frombuffer(grid.walls, dtype=np.uint8).reshape(height, width).copy()
+    enemies = np.zeros((3, height, width), dtype=np.uint8)
+    for enemy in sim.enemies:
+        enemies[CHANNELS[enemy.charge.value + 1], enemy.y, enemy.x] += 1
+    charges = np.zeros((2, height, width), dtype=np.uint8)
+    for charge in sim.player.placed_charges:
+        left = charge.activation_timer if charge.active else charge.timer + FIELD_TICKS
+        charges[0 if charge.type == ChargeType.POSITIVE else 1, charge.y, charge.x] = left
+    player = np.array((sim.player.x, sim.player.y), dtype=np.int32)
+    return {'walls': walls, 'enemies': enemies, 'charges': charges, 'player': player}
+
+class Env:
+    def __init__(self, level=1, seed=None, backend='objects', board=(GRID_WIDTH, GRID_HEIGHT),
+                 field=None, ai=False, max_ticks=MAX_TICKS, generator='classic'):
+        self.level = level
+        self.backend = backend
+        self.board = board
+        self.field = field
+        self.ai = ai
+        self.generator = generator
+        self.max_ticks = max_ticks
+        self.action_count = len(ACTIONS)
+        self.rng = random.Random(seed)  # Sementes dos episódios
+        self.sim = None
+        self.score = 0
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.rng.randrange(2**32)
+        self.sim = Simulation(self.level, self.backend, seed, self.board, self.field, self.ai,
+                              self.generator)
+        self.score = 0
+        return observe(self.sim), {'seed': seed}
+
+    def step(self, action):
+        sim = self.sim
+        state = sim.step((ACTIONS[action],))
+        score = sim.player.score
+        reward = score - self.score
+        self.score = score
+        terminated = state != GameState.PLAYING
+        truncated = not terminated and sim.ticks >= self.max_ticks
+        return observe(sim), reward, terminated, truncated, {'score': score, 'lives': sim.player.lives}
+
+# N partidas em arrays. Implementa as regras de Simulation sem --field e
+# --ai: movimento aleatório, campos com raio e linha de visão, dipolos,
+# power-ups, vidas e pontuação.
+class VectorEnv:
+    def __init__(self, num_envs, level=1, seed=None, board=(GRID_WIDTH, GRID_HEIGHT),
+                 max_ticks=MAX_TICKS, generator='classic'):
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.num_envs = num_envs
+        self.level = level
+        self.seed = seed
+        self.board = board
+        self.max_ticks = max_ticks
+        self.generate = generate_level if generator == 'checked' else create_level
+        self.action_count = len(ACTIONS)
+        self.rng = np.random.default_rng(seed)
+        self.episodes = 0  # Níveis já gerados, cada um com sua semente
+
+        n = num_envs
+        width, height = board
+        scale = max(1, (width * height) // (GRID_WIDTH * GRID_HEIGHT))
+        slots = (2 + level * 2) * scale  # Máximo de inimigos dos dois geradores
+        self.rows = np.arange(n)
+
+        self.walls = np.zeros((n, height, width), dtype=np.uint8)
+        self.walls_flat = self.walls.reshape(n, -1)
+
+        # Inimigos em posições fixas por ambiente, com máscara dos vivos.
+        # Todos começam o nível com o contador de movimento zerado e nada
+        # os atordoa, então um contador por ambiente basta.
+        self.enemy_x = np.zeros((n, slots), dtype=np.int32)
+        self.enemy_y = np.zeros((n, slots), dtype=np.int32)
+        self.enemy_q = np.zeros((n, slots), dtype=np.int8)
+        self.alive = np.zeros((n, slots), dtype=bool)
+        self.move_counter = np.zeros(n, dtype=np.int32)
+
+        # Cargas colocadas em ordem de colocação; left = ticks até sumir (0 = vazio)
+        self.charge_x = np.zeros((n, MAX_CHARGES), dtype=np.int32)
+        self.charge_y = np.zeros((n, MAX_CHARGES), dtype=np.int32)
+        self.charge_q = np.zeros((n, MAX_CHARGES), dtype=np.int8)
+        self.charge_left = np.zeros((n, MAX_CHARGES), dtype=np.int16)
+        self.charge_count = np.zeros(n, dtype=np.int32)
+
+        self.powerup_x = np.zeros((n, MAX_POWERUPS), dtype=np.int32)
+        self.powerup_y = np.zeros((n, MAX_POWERUPS), dtype=np.int32)
+        self.powerup_type = np.zeros((n, MAX_POWERUPS), dtype=np.int8)
+        self.powerup_active = np.zeros((n, MAX_POWERUPS), dtype=bool)
+
+        self.player_x = np.zeros(n, dtype=np.int32)
+        self.player_y = np.zeros(n, dtype=np.int32)
+        self.max_charges = np.zeros(n, dtype=np.int32)
+        self.radius = np.zeros(n)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.invincible = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int32)
+
+    def load(self, i):
+        # Nível novo no ambiente i, com o jogador de Player recém-criado
+        rng = random.Random(f"{self.seed}:{self.episodes}:level")
+        self.episodes += 1
+        grid, player_x, player_y, enemies, powerups = self.generate(self.level, rng, *self.board)
+        self.walls_flat[i] = np.frombuffer(grid.walls, dtype=np.uint8)
+
+        count = len(enemies)
+        self.enemy_x[i, :count] = [enemy.x for enemy in enemies]
+        self.enemy_y[i, :count] = [enemy.y for enemy in enemies]
+        self.enemy_q[i, :count] = [enemy.charge.value for enemy in enemies]
+        self.alive[i] = False
+        self.alive[i, :count] = True
+        self.move_counter[i] = 0
+
+        self.charge_left[i] = 0
+        self.charge_count[i] = 0
+
+        self.powerup_active[i] = False
+        for slot, powerup in enumerate(powerups):
+            self.powerup_x[i, slot] = powerup.x
+            self.powerup_y[i, slot] = powerup.y
+            self.powerup_type[i, slot] = powerup.type.value
+            self.powerup_active[i, slot] = True
+
+        self.player_x[i] = player_x
+        self.player_y[i] = player_y
+        self.max_charges[i] = 1
+        self.radius[i] = 2
+        self.lives[i] = 3
+        self.invincible[i] = 0
+        self.score[i] = 0
+        self.ticks[i] = 0
+
+    def reset(self):
+        for i in range(self.num_envs):
+            self.load(i)
+        return self.observe(), {}
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        rows = self.rows
+        width = self.board[0]
+        self.ticks += 1
+        score = self.score.copy()
+
+        # Movimento do jogador
+        x = self.player_x + ACTION_X[actions]
+        y = self.player_y + ACTION_Y[actions]
+        free = self.walls_flat[rows, y * width + x] == 0
+        self.player_x = np.where(free, x, self.player_x)
+        self.player_y = np.where(free, y, self.player_y)
+
+        # Colocação de cargas
+        sign = ACTION_CHARGE[actions]
+        placing = np.flatnonzero((sign != 0) & (self.charge_count < self.max_charges))
+        if len(placing):
+            slot = self.charge_count[placing]
+            self.charge_x[placing, slot] = self.player_x[placing]
+            self.charge_y[placing, slot] = self.player_y[placing]
+            self.charge_q[placing, slot] = sign[placing]
+            self.charge_left[placing, slot] = CHARGE_TICKS
+            self.charge_count[placing] += 1
+
+        # Player.update: invencibilidade e temporizadores das cargas. Todas
+        # duram o mesmo tempo, então só a primeira da fila pode sumir.
+        self.invincible = np.maximum(self.invincible - 1, 0)
+        left = self.charge_left
+        left -= left > 0
+        expired = np.flatnonzero((self.charge_count > 0) & (left[:, 0] == 0))
+        if len(expired):
+            for values in (self.charge_x, self.charge_y, self.charge_q, left):
+                values[expired, :-1] = values[expired, 1:]
+                values[expired, -1] = 0
+            self.charge_count[expired] -= 1
+
+        # Inimigos (quem foi eliminado agora ainda encosta no jogador)
+        present = self.alive
+        self.move_counter += 1
+        movers = np.flatnonzero(self.move_counter >= MOVE_EVERY)
+        if len(movers):
+            self.move_counter[movers] = 0
+            present = present.copy()
+            self.move_enemies(movers)
+        hit = ((self.invincible == 0) &
+               (present & (self.enemy_x == self.player_x[:, None]) &
+                (self.enemy_y == self.player_y[:, None])).any(axis=1))
+        self.lives -= hit
+        self.invincible[hit] = 60
+        game_over = hit & (self.lives <= 0)
+
+        # Power-ups na célula do jogador
+        picked = (self.powerup_active & (self.powerup_x == self.player_x[:, None]) &
+                  (self.powerup_y == self.player_y[:, None]))
+        if picked.any():
+            kind = self.powerup_type
+            self.radius += 0.5 * (picked & (kind == PowerUpType.FIELD_STRENGTH.value)).sum(axis=1)
+            self.max_charges += (picked & (kind == PowerUpType.EXTRA_CHARGE.value)).sum(axis=1)
+            self.lives += (picked & (kind == PowerUpType.EXTRA_LIFE.value)).sum(axis=1)
+            self.score += 50 * picked.sum(axis=1)
+            self.powerup_active &= ~picked
+
+        # Nível limpo
+        complete = ~self.alive.any(axis=1)
+        self.score += complete * (500 * self.level)
+
+        terminated = complete | game_over
+        truncated = ~terminated & (self.ticks >= self.max_ticks)
+        reward = (self.score - score).astype(np.float32)
+        info = {'score': self.score.copy(), 'lives': self.lives.copy()}
+
+        # Quem terminou já começa o episódio seguinte
+        for i in np.flatnonzero(terminated | truncated):
+            self.load(i)
+        return self.observe(), reward, terminated, truncated, info
+
+    def move_enemies(self, rows):
+        # Laço de Enemy.update para os inimigos dos ambientes em rows
+        width = self.board[0]
+        walls = self.walls_flat[rows]
+        alive = self.alive[rows]
+        x = self.enemy_x[rows]
+        y = self.enemy_y[rows]
+        q = self.enemy_q[rows]
+
+        # Movimento aleatório
+        direction = self.rng.integers(0, 4, size=x.shape)
+        new_x = x + DIRECTION_X[direction]
+        new_y = y + DIRECTION_Y[direction]
+        free = alive & (np.take_along_axis(walls, new_y * width + new_x, axis=1) == 0)
+        x = np.where(free, new_x, x)
+        y = np.where(free, new_y, y)
+
+        # Interação com cada campo ativo, na ordem em que as cargas foram colocadas
+        left = self.charge_left[rows]
+        active = (left > 0) & (left <= FIELD_TICKS)
+        radius = (self.radius[rows] ** 2)[:, None]
+        dead = np.zeros_like(alive)
+        index = np.arange(len(rows))[:, None, None]
+        for slot in range(MAX_CHARGES):
+            on = active[:, slot]
+            if not on.any():
+                continue
+            charge_x = self.charge_x[rows, slot][:, None]
+            charge_y = self.charge_y[rows, slot][:, None]
+            charge_q = self.charge_q[rows, slot][:, None]
+            dx = x - charge_x
+            dy = y - charge_y
+            inside = alive & on[:, None] & (dx * dx + dy * dy <= radius)
+            if not inside.any():
+                continue
+
+            # Linha de visão pelas células de Bresenham de cada deslocamento
+            window = ((np.clip(dy, -MAX_REACH, MAX_REACH) + MAX_REACH) * (2 * MAX_REACH + 1) +
+                      np.clip(dx, -MAX_REACH, MAX_REACH) + MAX_REACH)
+            cells = ((charge_y[:, :, None] + LINE_Y[window]) * width +
+                     charge_x[:, :, None] + LINE_X[window])
+            inside &= ~walls[index, cells].any(axis=2)
+
+            # Dipolo vira carga do sinal do campo; cargas opostas são
+            # eliminadas e as de mesmo sinal empurradas para longe
+            normal = inside & (q != 0)
+            attracted = normal & (q != charge_q)
+            repelled = normal & ~attracted
+            q = np.where(inside & (q == 0), charge_q, q)
+            dead |= attracted
+            if repelled.any():
+                new_x = x + np.sign(dx)
+                new_y = y + np.sign(dy)
+                free = repelled & (np.take_along_axis(walls, new_y * width + new_x, axis=1) == 0)
+                x = np.where(free, new_x, x)
+                y = np.where(free, new_y, y)
+
+        self.enemy_x[rows] = x
+        self.enemy_y[rows] = y
+        self.enemy_q[rows] = q
+        if dead.any():
+            self.score[rows] += (dead * np.where(q == 0, 150, 100)).sum(axis=1)
+            self.alive[rows] = alive & ~dead
+
+    def observe(self):
+        n = self.num_envs
+        width, height = self.board
+        plane = height * width
+        base = self.rows[:, None] * 3 * plane
+        cells = base + np.take(CHANNELS, self.enemy_q + 1) * plane + self.enemy_y * width + self.enemy_x
+        enemies = np.bincount(cells[self.alive], minlength=n * 3 * plane).astype(np.uint8)
+
+        charges = np.zeros(n * 2 * plane, dtype=np.uint8)
+        placed = self.charge_left > 0
+        cells = (self.rows[:, None] * 2 * plane + (self.charge_q < 0) * plane +
+                 self.charge_y * width + self.charge_x)
+        charges[cells[placed]] = self.charge_left[placed]
+
+        return {
+            'walls': self.walls.copy(),
+            'enemies': enemies.reshape(n, 3, height, width),
+            'charges': charges.reshape(n, 2, height, width),
+            'player': np.stack((self.player_x, self.player_y), axis=1),
+        }
+
+# Mede passos de ambiente por segundo com ações aleatórias
+def run_benchmark(envs=1024, steps=2000, level=1, seed=0):
+    rng = np.random.default_rng(seed)
+    if envs:
+        env = VectorEnv(envs, level, seed)
+        env.reset()
+        start = time.perf_counter()
+        for _ in range(steps):
+            env.step(rng.integers(0, env.action_count, size=envs))
+        return envs * steps / (time.perf_counter() - start)
+
+    env = Env(level, seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, terminated, truncated, _ = env.step(int(rng.integers(0, env.action_count)))
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vazão do ambiente de aprendizado por reforço")
+    parser.add_argument("--envs", type=int, default=1024,
+                        help="ambientes em lote (0 = um Env sobre a Simulation)")
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rate = run_benchmark(args.envs, args.steps, args.level, args.seed)
+    kind = f"{args.envs} ambientes em lote" if args.envs else "Env"
+    print(f"{kind}, nível {args.level}: {rate:,.0f} passos/s")
@@ -0,0 +1,193 @@
+# Benchmarks do laço principal, com tempos separados por subsistema
+#
+# Roda cenários representativos com sementes fixas e mede, a cada tick,
+# Player.update, o laço de Enemy.update, draw_grid, o desenho das entidades
+# e draw_hud; create_level e a partida a frio do jogo (até o primeiro
+# frame do menu, em um processo novo) são medidos à parte. Usa o driver de vídeo "dummy"
+# do SDL, então roda em uma máquina Linux sem tela. A saída é JSON com
+# p50/p95/p99 (em microssegundos) por subsistema e cenário:
+#
+#     python benchmark.py --ticks 600 --output bench.json
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Mantém o stdout só com o JSON
+
+import pygame
+
+import jogo
+from simulacao import ChargeType, create_level, new_simulation
+
+SEED = 1234
+
+# Cenário com muitas cargas ativas ao mesmo tempo espalhadas pelo grid
+def place_many_charges(sim, rng):
+    player = sim.player
+    if len(player.placed_charges) >= player.max_charges:
+        return
+    x, y = rng.choice(sim.grid.free_cells())
+    saved = player.x, player.y
+    player.x, player.y = x, y
+    if player.place_charge(rng.choice([ChargeType.POSITIVE, ChargeType.NEGATIVE])):
+        player.placed_charges[-1].timer = 1  # Ativa já no próximo tick
+    player.x, player.y = saved
+
+def setup_many_charges(sim, rng):
+    sim.player.max_charges = 12
+    sim.player.field_radius = 3
+
+def setup_dipoles(sim, rng):
+    # Quase todos os inimigos nascem como dipolos
+    for enemy in sim.enemies:
+        if rng.random() < 0.9:
+            enemy.charge = ChargeType.DIPOLE
+
+# nome: (nível, preparação da partida, ação por tick)
+SCENARIOS = {
+    'level_1': (1, None, None),
+    'level_10': (10, None, None),
+    'level_50': (50, None, None),
+    'many_charges': (10, setup_many_charges, place_many_charges),
+    'dipoles': (20, setup_dipoles, None),
+}
+
+SUBSYSTEMS = ('player_update', 'enemy_update', 'draw_grid', 'draw_entities', 'draw_hud', 'tick')
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pick(p):
+        return ordered[min(n - 1, int(p * n))] / 1000
+
+    return {
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'mean': sum(ordered) / n / 1000,
+        'samples': n,
+    }
+
+def run_scenario(name, ticks):
+    level, setup, per_tick = SCENARIOS[name]
+    rng = random.Random(SEED)
+    timings = {key: [] for key in SUBSYSTEMS}
+    clock = time.perf_counter_ns
+    screen = jogo.screen
+    restarts = 0
+
+    def new_game():
+        sim = new_simulation(level, seed=SEED + restarts)
+        if setup:
+            setup(sim, rng)
+        return sim
+
+    sim = new_game()
+    for _ in range(ticks):
+        if per_tick:
+            per_tick(sim, rng)
+
+        sim.killed.clear()
+        sim.picked.clear()
+
+        t0 = clock()
+        sim.update_player()
+        t1 = clock()
+        sim.update_enemies()
+        sim.check_powerups()
+        t2 = clock()
+        screen.fill(jogo.BLACK)
+        jogo.draw_grid(sim.grid)
+        t3 = clock()
+        for powerup in sim.powerups:
+            jogo.draw_powerup(screen, powerup)
+        for enemy in sim.enemies:
+            jogo.draw_enemy(screen, enemy)
+        jogo.draw_player(screen, sim.player)
+        t4 = clock()
+        jogo.draw_hud(sim.player, sim.level)
+        t5 = clock()
+
+        timings['player_update'].append(t1 - t0)
+        timings['enemy_update'].append(t2 - t1)
+        timings['draw_grid'].append(t3 - t2)
+        timings['draw_entities'].append(t4 - t3)
+        timings['draw_hud'].append(t5 - t4)
+        timings['tick'].append(t5 - t0)
+
+        # Mantém o cenário rodando: sem game over, e fase nova quando esvaziar
+        sim.player.lives = 3
+        if not sim.enemies:
+            restarts += 1
+            sim = new_game()
+
+    result = {key: percentiles(samples) for key, samples in timings.items()}
+    result['level'] = level
+    result['restarts'] = restarts
+    return result
+
+def run_create_level(levels=(1, 10, 50), repeats=200):
+    result = {}
+    for level in levels:
+        rng = random.Random(SEED)
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter_ns()
+            create_level(level, rng)
+            samples.append(time.perf_counter_ns() - t0)
+        result[f'level_{level}'] = percentiles(samples)
+    return result
+
+def run_startup(repeats=5):
+    # Cada partida a frio roda em um processo novo; o próprio jogo informa
+    # o tempo desde o início do jogo.py até o primeiro frame do menu
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "jogo.py", "--startup-time"], 
+                                capture_output=True, text=True, check=True, 
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        ms = float(output.strip().splitlines()[-1].split()[-2])
+        samples.append(int(ms * 1_000_000))  # em ns, como os outros tempos
+    return percentiles(samples)
+
+def run(ticks=600, scenarios=None):
+    scenarios = scenarios or list(SCENARIOS)
+    return {
+        'meta': {
+            'seed': SEED,
+            'ticks': ticks,
+            'unit': 'us',
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'video_driver': os.environ["SDL_VIDEODRIVER"],
+        },
+        'create_level': run_create_level(),
+        'startup': run_startup(),
+        'scenarios': {name: run_scenario(name, ticks) for name in scenarios},
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks do EletroBlast")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="roda só os cenários indicados (pode repetir)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args.ticks, args.scenario), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
@@ -0,0 +1,160 @@
+# Mapas de distância compartilhados para a IA dos inimigos
+#
+# Em vez de cada inimigo procurar um caminho (BFS/A*) até o jogador, um só
+# mapa de distâncias (um "mapa de Dijkstra") é calculado a partir da célula
+# do jogador, e um mapa de perigo é mantido a partir das cargas colocadas.
+# Cada inimigo então só olha as quatro vizinhas e anda para a de menor
+# custo, em O(1):
+#
+#     custo = distância até o jogador + DANGER_WEIGHT * perigo   (cargas)
+#     custo = distância até o jogador - ALIGN_WEIGHT * campo     (dipolos)
+#
+# Cargas perseguem o jogador mas fogem dos campos de sinal oposto (que as
+# eliminariam); dipolos são puxados para os campos, onde se alinham e viram
+# carga. Os mapas só mudam quando precisam:
+#
+# - a distância é refeita só quando o jogador muda de célula, por uma busca
+#   em largura limitada a CHASE_RADIUS passos (quem está mais longe anda ao
+#   acaso), e só as células visitadas na busca anterior são apagadas;
+# - cada carga colocada soma seu perigo ao entrar e o subtrai ao sair, nas
+#   células do FieldIndex (dentro do raio e com linha de visão).
+#
+# Os mapas são arrays planas (y * width + x) do módulo array, então o
+# backend NumPy lê os mesmos dados sem cópia (np.frombuffer).
+
+import math
+from array import array
+
+# Passos até onde o mapa de distância chega
+CHASE_RADIUS = 32
+
+# Células além do raio do campo em que as cargas já são sentidas
+DANGER_MARGIN = 2
+
+# Peso do perigo para cargas e da atração dos campos para dipolos; o
+# perigo cai de 1 por célula, então com peso > 1 fugir vale mais que
+# perseguir
+DANGER_WEIGHT = 3
+ALIGN_WEIGHT = 2
+
+# Direções do passo, na mesma ordem de Enemy.update
+STEP_LIST = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+class DistanceMaps:
+    def __init__(self, grid, radius=CHASE_RADIUS):
+        self.grid = grid
+        self.radius = radius
+        cells = grid.width * grid.height
+
+        # Passos até o jogador (-1 = parede ou fora do alcance)
+        self.distance = array('i', [-1]) * cells
+        self.visited = []
+        self.origin = None
+
+        # Perigo para inimigos positivos (cargas negativas por perto) e
+        # negativos (positivas), e campo de qualquer sinal para os dipolos
+        self.danger = {1: array('i', [0]) * cells, -1: array('i', [0]) * cells,
+                       0: array('i', [0]) * cells}
+        self.charges = {}  # Carga já somada -> (sinal, [(célula, peso)])
+        self.sense_radius = None
+
+    def update(self, player, field_index):
+        if (player.x, player.y) != self.origin:
+            self.flood(player.x, player.y)
+
+        # Raio do campo mudou (power-up): refaz o perigo de todas as cargas
+        radius = player.field_radius + DANGER_MARGIN
+        if radius != self.sense_radius:
+            for charge in list(self.charges):
+                self.remove(charge)
+            self.sense_radius = radius
+
+        placed = player.placed_charges
+        charges = self.charges
+        if len(placed) != len(charges) or not all(charge in charges for charge in placed):
+            current = set(placed)
+            for charge in [c for c in charges if c not in current]:
+                self.remove(charge)
+            for charge in placed:
+                if charge not in charges:
+                    self.add(charge, field_index)
+
+    def reset(self):
+        # Esquece o jogador e as cargas (ao restaurar um snapshot); o
+        # próximo update refaz os mapas
+        for charge in list(self.charges):
+            self.remove(charge)
+        self.origin = None
+
+    def flood(self, x, y):
+        # Busca em largura a partir do jogador. As bordas do tabuleiro são
+        # sempre paredes, então os vizinhos de uma célula livre nunca saem
+        # da array.
+        distance = self.distance
+        for cell in self.visited:
+            distance[cell] = -1
+        width = self.grid.width
+        walls = self.grid.walls
+        start = y * width + x
+        distance[start] = 0
+        visited = [start]
+        frontier = visited
+        for steps in range(1, self.radius + 1):
+            reached = []
+            for cell in frontier:
+                for neighbor in (cell + width, cell + 1, cell - width, cell - 1):
+                    if distance[neighbor] < 0 and not walls[neighbor]:
+                        distance[neighbor] = steps
+                        reached.append(neighbor)
+            if not reached:
+                break
+            visited.extend(reached)
+            frontier = reached
+        self.visited = visited
+        self.origin = (x, y)
+
+    def add(self, charge, field_index):
+        # Perigo de 1 na borda do raio sentido até ~raio no centro
+        radius = self.sense_radius
+        width = self.grid.width
+        cells = []
+        for cell in field_index.affected(charge.x, charge.y, radius):
+            dx = cell % width - charge.x
+            dy = cell // width - charge.y
+            cells.append((cell, int(radius - math.sqrt(dx*dx + dy*dy)) + 1))
+        sign = charge.type.value
+        self.charges[charge] = (sign, cells)
+        self.mark(sign, cells, 1)
+
+    def remove(self, charge):
+        sign, cells = self.charges.pop(charge)
+        self.mark(sign, cells, -1)
+
+    def mark(self, sign, cells, delta):
+        # Uma carga q é perigosa para inimigos de carga -q e atrai dipolos
+        opposite = self.danger[-sign]
+        field = self.danger[0]
+        for cell, weight in cells:
+            opposite[cell] += delta * weight
+            field[cell] += delta * weight
+
+    def step(self, x, y, q):
+        # Passo de um inimigo de carga q na célula (x, y): (dx, dy), (0, 0)
+        # para ficar parado, ou None fora do alcance do mapa
+        distance = self.distance
+        width = self.grid.width
+        cell = y * width + x
+        if distance[cell] < 0:
+            return None
+        danger = self.danger[q]
+        weight = DANGER_WEIGHT if q else -ALIGN_WEIGHT
+        best = distance[cell] + weight * danger[cell]
+        move = (0, 0)
+        for dx, dy in STEP_LIST:
+            neighbor = cell + dy * width + dx
+            if distance[neighbor] >= 0:
+                cost = distance[neighbor] + weight * danger[neighbor]
+                if cost < best:
+                    best = cost
+                    move = (dx, dy)
+        return move
@@ -0,0 +1,222 @@
+# Motor de campo elétrico por superposição (NumPy)
+#
+# Guarda o campo elétrico resultante (Ex, Ey) e o potencial V em todas as
+# células do tabuleiro, somando a contribuição de cada carga ativa:
+#
+#     E = soma de q * r / |r|^3        V = soma de q * (1/|r| - 1/R)
+#
+# (k = 1, distâncias em células). A contribuição de uma carga unitária é
+# pré-calculada uma vez em um núcleo (2R+1) x (2R+1), truncado no raio de
+# corte R; somar ou tirar uma carga é somar uma fatia do núcleo às arrays,
+# então ativar, expirar ou mover uma carga custa O(R²), não O(células), e
+# o campo nunca é recalculado do zero. Os valores do núcleo são arredondados
+# para múltiplos de 2^-KERNEL_BITS, então essas somas são exatas em float64:
+# o campo depende só de quais fontes estão somadas, e não da ordem em que
+# entraram e saíram, e pode ser refeito a partir delas bit a bit igual
+# (estado.py grava só as fontes, não as arrays). Ex, Ey e V ficam juntos em
+# uma só array (altura, largura, 3), para cada carga ser uma única soma de fatia,
+# com uma margem de R células em volta do tabuleiro para as fatias nunca
+# precisarem de recorte.
+#
+# Paredes não bloqueiam o campo aqui; as regras de eliminação e repulsão
+# dentro do raio do campo (com linha de visão) continuam as de sempre, e o
+# motor só decide para onde os inimigos andam.
+
+import numpy as np
+
+# Raio de corte do núcleo, em células (a 12 células o campo cai para <1%)
+FIELD_CUTOFF = 12
+
+# Precisão do núcleo: com |núcleo| <= 1, somas de até 2^(52 - KERNEL_BITS)
+# cargas unitárias na mesma célula continuam exatas
+KERNEL_BITS = 32
+
+# Acima de quantas cargas add_many soma em lote, e quantas por vez
+ADD_MANY_MIN = 32
+ADD_MANY_CHUNK = 2048
+
+# Campo mínimo para o inimigo seguir a força em vez de andar ao acaso
+# (o de uma carga unitária a 6 células, arredondado como o núcleo)
+FIELD_MIN = round(2**KERNEL_BITS / 6**2) / 2**KERNEL_BITS
+
+# Direções do passo, na mesma ordem de Enemy.update
+STEP_LIST = ((0, 1), (1, 0), (0, -1), (-1, 0))
+STEPS = np.array(STEP_LIST, dtype=np.int32)
+
+# Núcleos já calculados, por raio de corte
+_kernels = {}
+
+def field_kernel(cutoff):
+    # Ex, Ey e V de uma carga +1 no centro de uma janela (2R+1) x (2R+1)
+    kernel = _kernels.get(cutoff)
+    if kernel is not None:
+        return kernel
+    offsets = np.arange(-cutoff, cutoff + 1, dtype=np.float64)
+    dx, dy = np.meshgrid(offsets, offsets)
+    r = np.hypot(dx, dy)
+    inside = (r > 0) & (r <= cutoff)
+    r = np.where(inside, r, 1.0)
+    ex = np.where(inside, dx / r**3, 0.0)
+    ey = np.where(inside, dy / r**3, 0.0)
+    v = np.where(inside, 1 / r - 1 / cutoff, 0.0)
+    kernel = np.stack([ex, ey, v], axis=-1)
+    kernel = _kernels[cutoff] = np.round(kernel * 2**KERNEL_BITS) / 2**KERNEL_BITS
+    return kernel
+
+class FieldEngine:
+    def __init__(self, width, height, cutoff=FIELD_CUTOFF, enemy_sources=False):
+        self.width = width
+        self.height = height
+        self.cutoff = cutoff
+        self.enemy_sources = enemy_sources  # Inclui as cargas dos inimigos
+        self.kernel = field_kernel(cutoff)
+        self.padded = np.zeros((height + 2 * cutoff, width + 2 * cutoff, 3))
+        self.ex_padded = self.padded[:, :, 0]
+        self.ey_padded = self.padded[:, :, 1]
+        self.v_padded = self.padded[:, :, 2]
+
+        # Cargas colocadas já somadas ao campo: carga -> (x, y, q)
+        self.charges = {}
+        self.charges_version = None
+
+        # Muda sempre que o campo muda (usado por quem guarda algo derivado dele)
+        self.version = 0
+
+    # Campo e potencial só na área do tabuleiro, indexados por [y, x]
+    @property
+    def ex(self):
+        c = self.cutoff
+        return self.ex_padded[c:c + self.height, c:c + self.width]
+
+    @property
+    def ey(self):
+        c = self.cutoff
+        return self.ey_padded[c:c + self.height, c:c + self.width]
+
+    @property
+    def potential(self):
+        c = self.cutoff
+        return self.v_padded[c:c + self.height, c:c + self.width]
+
+    def add(self, x, y, q):
+        # Soma (ou, com q negativo, tira) uma carga q na célula (x, y)
+        if not q:
+            return
+        size = 2 * self.cutoff + 1
+        window = self.padded[y:y + size, x:x + size]
+        if q == 1:
+            window += self.kernel
+        elif q == -1:
+            window -= self.kernel
+        else:
+            window += q * self.kernel
+        self.version += 1
+
+    def move_source(self, old_x, old_y, old_q, x, y, q):
+        if (old_x, old_y, old_q) != (x, y, q):
+            self.add(old_x, old_y, -old_q)
+            self.add(x, y, q)
+
+    def move_sources(self, old_x, old_y, old_q, x, y, q):
+        # Versão em lote para arrays (backend NumPy); dipolos têm q = 0
+        changed = np.flatnonzero((old_x != x) | (old_y != y) | (old_q != q))
+        for i in changed:
+            self.move_source(int(old_x[i]), int(old_y[i]), int(old_q[i]),
+                             int(x[i]), int(y[i]), int(q[i]))
+
+    def sync(self, charges):
+        # Acompanha as cargas ativas do jogador: só as que ativaram ou
+        # expiraram desde a última chamada mexem no campo
+        if charges.version == self.charges_version:
+            return
+        self.charges_version = charges.version
+        active = set(charges.active)
+        for charge in [c for c in self.charges if c not in active]:
+            x, y, q = self.charges.pop(charge)
+            self.add(x, y, -q)
+        for charge in active:
+            if charge not in self.charges:
+                q = charge.type.value
+                self.charges[charge] = (charge.x, charge.y, q)
+                self.add(charge.x, charge.y, q)
+
+    def add_many(self, xs, ys, qs):
+        # Soma várias cargas de uma vez (arrays de x, y e q): as janelas do
+        # núcleo viram índices da array achatada e cada componente é somado
+        # por bincount; como o núcleo é exato, o resultado é o mesmo de
+        # chamar add() para cada uma
+        if len(qs) <= ADD_MANY_MIN:
+            for x, y, q in zip(xs.tolist(), ys.tolist(), qs.tolist()):
+                self.add(x, y, q)
+            return
+        height, width = self.padded.shape[:2]
+        size = 2 * self.cutoff + 1
+        window = (np.arange(size)[:, None] * width + np.arange(size)).ravel()
+        kernel = self.kernel.reshape(-1, 3)
+        for start in range(0, len(qs), ADD_MANY_CHUNK):
+            corner = ys[start:start + ADD_MANY_CHUNK] * width + xs[start:start + ADD_MANY_CHUNK]
+            q = qs[start:start + ADD_MANY_CHUNK].astype(np.float64)
+            cells = (corner[:, None] + window).ravel()
+            for axis in range(3):
+                total = np.bincount(cells, (q[:, None] * kernel[:, axis]).ravel(), height * width)
+                self.padded[:, :, axis] += total.reshape(height, width)
+        self.version += 1
+
+    def field_at(self, x, y):
+        c = self.cutoff
+        return self.ex_padded[y + c, x + c], self.ey_padded[y + c, x + c]
+
+    def strength2(self, x, y):
+        ex, ey = self.field_at(x, y)
+        return ex * ex + ey * ey
+
+    def step(self, x, y, q):
+        # Passo de um inimigo de carga q na célula (x, y), ou None se o campo
+        # ali for fraco. Cargas andam na direção da força qE (o eixo de maior
+        # componente); dipolos (q = 0) se alinham ao campo e são puxados para
+        # onde ele é mais forte, então andam para a vizinha de maior |E|.
+        if q:
+            ex, ey = self.field_at(x, y)
+            fx, fy = q * ex, q * ey
+            if fx * fx + fy * fy < FIELD_MIN * FIELD_MIN:
+                return None
+            if abs(fx) >= abs(fy):
+                return (1 if fx > 0 else -1, 0)
+            return (0, 1 if fy > 0 else -1)
+
+        here = self.strength2(x, y)
+        if here < FIELD_MIN * FIELD_MIN:
+            return None
+        best = None
+        for dx, dy in STEP_LIST:
+            strength = self.strength2(x + dx, y + dy)
+            if strength > here:
+                here = strength
+                best = (dx, dy)
+        return best
+
+    def steps(self, xs, ys, qs):
+        # Versão vetorizada de step: devolve (dx, dy, máscara de quem segue o campo)
+        c = self.cutoff
+        ex = self.ex_padded[ys + c, xs + c]
+        ey = self.ey_padded[ys + c, xs + c]
+        fx = qs * ex
+        fy = qs * ey
+        follow = fx * fx + fy * fy >= FIELD_MIN * FIELD_MIN
+        horizontal = np.abs(fx) >= np.abs(fy)
+        dx = np.where(horizontal, np.sign(fx), 0).astype(np.int32)
+        dy = np.where(horizontal, 0, np.sign(fy)).astype(np.int32)
+
+        dipoles = np.flatnonzero(qs == 0)
+        if len(dipoles):
+            px = xs[dipoles] + c
+            py = ys[dipoles] + c
+            here = ex[dipoles] ** 2 + ey[dipoles] ** 2
+            around = np.stack([self.ex_padded[py + sy, px + sx] ** 2 + self.ey_padded[py + sy, px + sx] ** 2
+                               for sx, sy in STEP_LIST])
+            best = np.argmax(around, axis=0)
+            stronger = around[best, np.arange(len(dipoles))] > here
+            follow[dipoles] = (here >= FIELD_MIN * FIELD_MIN) & stronger
+            dx[dipoles] = STEPS[best, 0]
+            dy[dipoles] = STEPS[best, 1]
+        return dx, dy, follow
@@ -0,0 +1,344 @@
+# Partículas: faíscas, pulsos e deriva nos campos
+#
+# Faíscas saem dos inimigos eliminados (puxadas para a carga que os atraiu)
+# e dos power-ups pegos, um anel de partículas se abre até o raio do campo
+# quando uma carga ativa, e enquanto o campo está ativo partículas derivam
+# na direção dele: para fora nas cargas positivas, para dentro nas
+# negativas.
+#
+# Todas as partículas ficam em um pool de tamanho fixo (POOL_SIZE), com
+# uma array NumPy por atributo, alocada uma vez só; uma partícula nova
+# ocupa a vaga da mais antiga. A cada frame:
+#
+# - update(dt) avança todas de uma vez com operações em lote (out=), sem
+#   criar arrays novas;
+# - draw() escreve cada partícula (2x2 pixels, cor apagando com a vida)
+#   direto em um buffer de pixels que é a memória de uma Surface
+#   (pygame.image.frombuffer), só dentro da caixa que contém as partículas
+#   vivas, e a caixa vai para a tela em um único blit aditivo.
+#
+# Partículas fora da tela ou mortas são escritas em uma linha extra do
+# buffer, fora da Surface, em vez de filtradas, para nenhum tamanho mudar de
+# um frame para o outro. Para medir o custo por frame e as alocações:
+#
+#     python efeitos.py --particles 8000
+
+import math
+
+import numpy as np
+import pygame
+
+from simulacao import GRID_SIZE, ChargeType
+
+# Partículas vivas ao mesmo tempo (as mais antigas dão lugar às novas)
+POOL_SIZE = 8192
+
+# Máximo de partículas criadas por uma chamada
+EMIT_MAX = 256
+
+# Cores por sinal da carga
+CHARGE_COLORS = {
+    ChargeType.POSITIVE: (255, 90, 60),
+    ChargeType.NEGATIVE: (70, 140, 255),
+    ChargeType.DIPOLE: (200, 90, 255),
+}
+PICKUP_COLOR = (255, 230, 80)
+
+# Faíscas: quantidade, velocidade (pixels/s), vida (s), quanto da
+# velocidade sobra depois de 1 s e força da atração pela carga
+SPARK_COUNT = 28
+SPARK_SPEED = 260.0
+SPARK_LIFE = 0.45
+SPARK_DRAG = 0.05
+SPARK_PULL = 4.0
+PICKUP_COUNT = 20
+
+# Pulso: partículas no anel e tempo até chegar ao raio do campo
+PULSE_COUNT = 64
+PULSE_LIFE = 0.3
+
+# Deriva: partículas por tick e por carga ativa, e velocidade (células/s)
+DRIFT_PER_TICK = 2
+DRIFT_SPEED = 2.5
+
+HALF = GRID_SIZE / 2
+
+class Effects:
+    def __init__(self, width, height, size=POOL_SIZE, seed=None):
+        self.enabled = True
+        self.width = width
+        self.height = height
+        self.size = size
+        self.cursor = 0
+        self.live_time = 0.0  # Até quando a partícula mais longa vive
+        self.rng = np.random.default_rng(seed)
+
+        # Atributos das partículas, em pixels do mundo e segundos
+        (self.x, self.y, self.vx, self.vy, self.life, self.span, self.drag,
+         self.red, self.green, self.blue) = (np.zeros(size, dtype=np.float32) for _ in range(10))
+        self.span += 1.0
+
+        # Arrays de trabalho de update() e draw()
+        self.fade = np.zeros(size, dtype=np.float32)
+        self.work = np.zeros(size, dtype=np.float32)
+        self.ix = np.zeros(size, dtype=np.intp)
+        self.iy = np.zeros(size, dtype=np.intp)
+        self.index = np.zeros(size, dtype=np.intp)
+        self.channel = np.zeros(size, dtype=np.uint32)
+        self.color = np.zeros(size, dtype=np.uint32)
+        self.visible = np.zeros(size, dtype=bool)
+        self.test = np.zeros(size, dtype=bool)
+
+        # Arrays de trabalho da criação de partículas
+        self.scratch = [np.zeros(EMIT_MAX, dtype=np.float32) for _ in range(6)]
+        angles = np.arange(PULSE_COUNT, dtype=np.float32) * np.float32(2 * math.pi / PULSE_COUNT)
+        self.ring = (np.cos(angles), np.sin(angles))
+
+        # Buffer de pixels (BGRA) com duas linhas extras: o início da
+        # primeira extra recebe o que não deve aparecer
+        self.pixels = np.zeros((height + 2) * width, dtype=np.uint32)
+        self.rows = self.pixels[:width * height].reshape(height, width)
+        self.trash = width * height
+        self.surface = pygame.image.frombuffer(self.pixels[:width * height], (width, height), 'BGRA')
+        self.rect = pygame.Rect(0, 0, 0, 0)  # Caixa desenhada no último frame
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.clear()
+
+    def clear(self):
+        self.life.fill(0)
+        self.live_time = 0.0
+
+    def store(self, count, life, drag, color):
+        # Copia as partículas montadas em scratch para as vagas do pool
+        x, y, vx, vy, span = self.scratch[:5]
+        start = self.cursor
+        end = start + count
+        self.cursor = end % self.size
+        parts = [(slice(start, min(end, self.size)), 0)]
+        if end > self.size:
+            parts.append((slice(0, end - self.size), self.size - start))
+        for part, offset in parts:
+            n = part.stop - part.start
+            self.x[part] = x[offset:offset + n]
+            self.y[part] = y[offset:offset + n]
+            self.vx[part] = vx[offset:offset + n]
+            self.vy[part] = vy[offset:offset + n]
+            self.life[part] = span[offset:offset + n]
+            self.span[part] = span[offset:offset + n]
+            self.drag[part] = drag
+            self.red[part], self.green[part], self.blue[part] = color
+        self.live_time = max(self.live_time, life)
+
+    def burst(self, x, y, count, speed, life, color, drag=1.0, pull=(0.0, 0.0)):
+        # Partículas em direções ao acaso, somadas a uma velocidade comum
+        count = min(count, EMIT_MAX)
+        px, py, vx, vy, span, angle = (array[:count] for array in self.scratch)
+        self.rng.random(dtype=np.float32, out=angle)
+        angle *= np.float32(2 * math.pi)
+        self.rng.random(dtype=np.float32, out=span)
+        span *= np.float32(speed * 0.7)
+        span += np.float32(speed * 0.3)
+        np.cos(angle, out=vx)
+        np.sin(angle, out=vy)
+        vx *= span
+        vy *= span
+        vx += np.float32(pull[0])
+        vy += np.float32(pull[1])
+        px.fill(x)
+        py.fill(y)
+        self.rng.random(dtype=np.float32, out=span)
+        span *= np.float32(life * 0.5)
+        span += np.float32(life * 0.5)
+        self.store(count, life, drag, color)
+
+    def pulse(self, x, y, radius, color):
+        # Anel que se abre do centro da carga até o raio do campo
+        px, py, vx, vy, span = (array[:PULSE_COUNT] for array in self.scratch[:5])
+        cos, sin = self.ring
+        speed = np.float32(radius / PULSE_LIFE)
+        np.multiply(cos, speed, out=vx)
+        np.multiply(sin, speed, out=vy)
+        px.fill(x)
+        py.fill(y)
+        span.fill(PULSE_LIFE)
+        self.store(PULSE_COUNT, PULSE_LIFE, 1.0, color)
+
+    def drift(self, x, y, radius, count, outward, color):
+        # Partículas dentro do raio, andando na direção do campo da carga
+        count = min(count, EMIT_MAX)
+        px, py, vx, vy, span, angle = (array[:count] for array in self.scratch)
+        speed = np.float32(DRIFT_SPEED * GRID_SIZE)
+        self.rng.random(dtype=np.float32, out=angle)
+        angle *= np.float32(2 * math.pi)
+        np.cos(angle, out=vx)
+        np.sin(angle, out=vy)
+        self.rng.random(dtype=np.float32, out=span)  # Distância ao centro
+        span *= np.float32(radius * 0.8)
+        span += np.float32(radius * 0.2)
+        np.multiply(vx, span, out=px)
+        np.multiply(vy, span, out=py)
+        px += np.float32(x)
+        py += np.float32(y)
+        # Vida = tempo até a borda (para fora) ou até perto do centro (para dentro)
+        if outward:
+            np.subtract(np.float32(radius), span, out=span)
+        else:
+            span -= np.float32(radius * 0.15)
+            np.negative(vx, out=vx)
+            np.negative(vy, out=vy)
+        span /= speed
+        vx *= speed
+        vy *= speed
+        self.store(count, radius / speed, 1.0, color)
+
+    def events(self, sim):
+        # Cria as partículas dos eventos do último tick da simulação
+        if not self.enabled:
+            return
+        player = sim.player
+        radius = player.field_radius * GRID_SIZE
+        active = player.placed_charges.active
+        for enemy in sim.killed:
+            x, y = enemy.x * GRID_SIZE + HALF, enemy.y * GRID_SIZE + HALF
+            # Faíscas puxadas para a carga ativa mais próxima
+            pull = (0.0, 0.0)
+            if active:
+                charge = min(active, key=lambda c: abs(c.x - enemy.x) + abs(c.y - enemy.y))
+                pull = ((charge.x - enemy.x) * GRID_SIZE * SPARK_PULL,
+                        (charge.y - enemy.y) * GRID_SIZE * SPARK_PULL)
+            self.burst(x, y, SPARK_COUNT, SPARK_SPEED, SPARK_LIFE, CHARGE_COLORS[enemy.charge],
+                       SPARK_DRAG, pull)
+        for powerup in sim.picked:
+            self.burst(powerup.x * GRID_SIZE + HALF, powerup.y * GRID_SIZE + HALF, PICKUP_COUNT,
+                       SPARK_SPEED * 0.6, SPARK_LIFE, PICKUP_COLOR, SPARK_DRAG)
+        for charge in sim.activated:
+            self.pulse(charge.x * GRID_SIZE + HALF, charge.y * GRID_SIZE + HALF, radius,
+                       CHARGE_COLORS[charge.type])
+        for charge in active:
+            self.drift(charge.x * GRID_SIZE + HALF, charge.y * GRID_SIZE + HALF, radius,
+                       DRIFT_PER_TICK, charge.type == ChargeType.POSITIVE, CHARGE_COLORS[charge.type])
+
+    def update(self, dt):
+        if self.live_time <= 0:
+            return
+        self.live_time -= dt
+        dt = np.float32(dt)
+        work = self.work
+        np.subtract(self.life, dt, out=self.life)
+        np.maximum(self.life, 0, out=self.life)
+        np.multiply(self.vx, dt, out=work)
+        np.add(self.x, work, out=self.x)
+        np.multiply(self.vy, dt, out=work)
+        np.add(self.y, work, out=self.y)
+        np.power(self.drag, dt, out=work)
+        np.multiply(self.vx, work, out=self.vx)
+        np.multiply(self.vy, work, out=self.vy)
+
+    def draw(self, surface, camera_x=0, camera_y=0):
+        # Apaga a caixa do frame anterior no buffer
+        rect = self.rect
+        if rect:
+            self.rows[rect.top:rect.bottom, rect.left:rect.right] = 0
+            rect.size = (0, 0)
+        if not self.enabled or self.live_time <= 0:
+            return
+
+        width, height = self.width, self.height
+        work, ix, iy, visible, test = self.work, self.ix, self.iy, self.visible, self.test
+
+        # Pixel na tela de cada partícula
+        np.subtract(self.x, np.float32(camera_x), out=work)
+        np.floor(work, out=work)
+        np.copyto(ix, work, casting='unsafe')
+        np.subtract(self.y, np.float32(camera_y), out=work)
+        np.floor(work, out=work)
+        np.copyto(iy, work, casting='unsafe')
+
+        # Vivas e dentro da tela (o quadrado 2x2 inteiro)
+        np.greater(self.life, 0, out=visible)
+        for values, limit in ((ix, width - 1), (iy, height - 1)):
+            np.greater_equal(values, 0, out=test)
+            visible &= test
+            np.less(values, limit, out=test)
+            visible &= test
+        if not visible.any():
+            return
+        left = int(ix.min(where=visible, initial=width))
+        right = int(ix.max(where=visible, initial=0)) + 2
+        top = int(iy.min(where=visible, initial=height))
+        bottom = int(iy.max(where=visible, initial=0)) + 2
+
+        # Cor apagando com a vida restante, empacotada como BGRA
+        fade, channel, color = self.fade, self.channel, self.color
+        np.divide(self.life, self.span, out=fade)
+        color.fill(0)
+        for values, shift in ((self.red, 16), (self.green, 8), (self.blue, 0)):
+            np.multiply(values, fade, out=work)
+            np.copyto(channel, work, casting='unsafe')
+            np.left_shift(channel, shift, out=channel)
+            color |= channel
+
+        # Quatro pixels por partícula; as invisíveis vão para a linha extra
+        index = self.index
+        np.multiply(iy, width, out=index)
+        index += ix
+        np.logical_not(visible, out=test)
+        np.copyto(index, self.trash, where=test)
+        pixels = self.pixels
+        for step in (0, 1, width - 1, 1):
+            index += step
+            np.put(pixels, index, color)
+
+        rect.update(left, top, right - left, bottom - top)
+        surface.blit(self.surface, rect, rect, special_flags=pygame.BLEND_ADD)
+
+    def live(self):
+        return int(np.count_nonzero(self.life))
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import time
+    import tracemalloc
+
+    from simulacao import SCREEN_WIDTH, SCREEN_HEIGHT
+
+    parser = argparse.ArgumentParser(description="Custo por frame do sistema de partículas")
+    parser.add_argument("--particles", type=int, default=POOL_SIZE, help="partículas vivas")
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    effects = Effects(SCREEN_WIDTH, SCREEN_HEIGHT, max(args.particles, POOL_SIZE), seed=0)
+
+    # Faíscas espalhadas pela tela, renovadas para manter as vivas
+    def refill():
+        for _ in range(args.particles // EMIT_MAX):
+            x = effects.rng.uniform(0, SCREEN_WIDTH)
+            y = effects.rng.uniform(0, SCREEN_HEIGHT)
+            effects.burst(x, y, EMIT_MAX, SPARK_SPEED, 2.0, CHARGE_COLORS[ChargeType.POSITIVE], 0.5)
+
+    times = []
+    growth = 0
+    tracemalloc.start()
+    for frame in range(args.frames):
+        if frame % 60 == 0:
+            refill()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        effects.update(1 / 60)
+        effects.draw(screen)
+        times.append(time.perf_counter() - start)
+        if frame >= 60:
+            growth = max(growth, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    times.sort()
+    print(f"{effects.live()} partículas vivas: p50 {times[len(times) // 2] * 1000:.3f} ms, "
+          f"p99 {times[int(len(times) * 0.99)] * 1000:.3f} ms por frame (update + draw)")
+    print(f"Pico de memória alocada por frame: {growth:,} bytes")
@@ -0,0 +1,513 @@
+# Snapshots do estado da partida: salvamento rápido e volta no tempo
+#
+# snapshot(sim) grava o estado completo de uma Simulation em um formato
+# binário compacto e versionado (sem pickle dos objetos vivos):
+#
+#   cabeçalho  "EBSS", versão (u8)
+#   partida    semente, nível, ticks, estado, tabuleiro, backend, modo do
+#              motor de campo, IA e gerador de níveis (desde a versão 2)
+#   paredes    máscara do tabuleiro comprimida (zlib; comprimida uma vez
+#              por grid, já que as paredes não mudam durante o nível)
+#   geradores  estados dos geradores aleatórios do nível e dos inimigos
+#   jogador    posição, pontuação, vidas, power-ups, mensagem e cargas
+#              colocadas, na ordem em que foram colocadas
+#   inimigos   uma array por atributo (x, y, vida, atordoamento, contador
+#              de movimento, carga), no mesmo formato nos dois backends,
+#              mais o gerador do lote NumPy
+#   power-ups  posição, tipo e se ainda está ativo
+#   campo      versão das cargas do motor de campo (campo.py), quando
+#              ligado; as arrays do campo não são gravadas (até a versão 2
+#              eram): como o núcleo do motor é exato, restore() as refaz a
+#              partir das cargas ativas e dos inimigos, bit a bit iguais
+#
+# restore(sim, data) põe o estado de volta em uma Simulation existente,
+# reaproveitando o grid, o índice de campos e os mapas da IA quando o
+# tabuleiro é o mesmo (assim restaurar leva menos de 1 ms; no motor de
+# campo só as células em que a carga mudou são refeitas), e
+# load_simulation(data) cria uma nova, para continuar uma simulação sem
+# janela de qualquer ponto:
+#
+#     python estado.py --level 10 --ticks 3000 --save meio.ebs
+#     python estado.py --load meio.ebs --ticks 3000
+#
+# Rewind guarda os snapshots dos últimos segundos em um buffer circular. A
+# cada KEYFRAME_EVERY snapshots um é guardado inteiro; os outros guardam só
+# as seções (sections) que mudaram desde o anterior, como diferença (XOR)
+# quando o tamanho não mudou, comprimidas. As paredes e os power-ups quase
+# nunca entram, cada snapshot ocupa cerca de 1 KB no tabuleiro padrão, e os
+# grupos mais antigos são descartados inteiros, então a memória é limitada.
+
+import random
+import struct
+import time
+import weakref
+import zlib
+from array import array
+from collections import deque
+
+from grade import Grid
+from simulacao import (FPS, FIELD_MODES, GENERATORS, GameState, ChargeType, PowerUpType, Charge,
+                       ChargeStore, Player, Enemy, PowerUp, FieldIndex, Simulation)
+
+MAGIC = b"EBSS"
+VERSION = 3
+
+HEADER = struct.Struct("<4sB")
+GAME = struct.Struct("<QIIBHHBB?")
+GENERATOR = struct.Struct("<B")
+COUNT = struct.Struct("<I")
+RNG = struct.Struct("<B625I?d")
+NUMPY_RNG = struct.Struct("<16s16s?I")
+PLAYER = struct.Struct("<iiiddiiiiQH")
+CHARGE = struct.Struct("<iibii?")
+POWERUP = struct.Struct("<iib?")
+FIELD = struct.Struct("<Q")
+SECTION = struct.Struct("<HBI")
+BACKENDS = ['objects', 'numpy']
+
+# Versão de cargas do motor de campo antes da primeira sincronização
+NO_VERSION = 2**64 - 1
+
+# Paredes já comprimidas, por grid
+_packed_walls = weakref.WeakKeyDictionary()
+
+class SnapshotError(Exception):
+    pass
+
+def pack_walls(grid):
+    packed = _packed_walls.get(grid)
+    if packed is None:
+        packed = _packed_walls[grid] = zlib.compress(bytes(grid.walls), 1)
+    return packed
+
+def pack_rng(rng):
+    version, internal, gauss = rng.getstate()
+    return RNG.pack(version, *internal, gauss is not None, gauss or 0.0)
+
+def unpack_rng(values):
+    return (values[0], values[1:626], values[627] if values[626] else None)
+
+def sections(sim):
+    # O snapshot em seções: partida, paredes, geradores, jogador, cada
+    # atributo dos inimigos, power-ups e campo
+    player = sim.player
+    grid = sim.grid
+    if not 0 <= sim.seed < 2**64:
+        raise SnapshotError(f"semente fora do intervalo de 64 bits: {sim.seed}")
+    game = (HEADER.pack(MAGIC, VERSION) +
+            GAME.pack(sim.seed, sim.level, sim.ticks, sim.state.value, grid.width, grid.height,
+                      BACKENDS.index(sim.backend), FIELD_MODES.index(sim.field), sim.ai) +
+            GENERATOR.pack(GENERATORS.index(sim.generator)))
+    walls = pack_walls(grid)
+    rngs = pack_rng(sim.level_rng) + pack_rng(sim.enemy_rng)
+
+    message = player.message.encode()
+    charges = player.placed_charges
+    parts = [
+        PLAYER.pack(player.x, player.y, player.max_charges, player.field_strength,
+                    player.field_radius, player.score, player.lives, player.invincible,
+                    player.message_timer, charges.version, len(message)),
+        message,
+        COUNT.pack(len(charges)),
+    ]
+    for charge in charges:
+        parts.append(CHARGE.pack(charge.x, charge.y, charge.type.value, charge.timer,
+                                 charge.activation_timer, charge.active))
+    result = [game, COUNT.pack(len(walls)) + walls, rngs, b"".join(parts)]
+
+    # Inimigos: uma array (e uma seção) por atributo
+    swarm = sim.swarm
+    parts = [COUNT.pack(len(sim.enemies))]
+    if swarm is None:
+        enemies = sim.enemies
+        for name in ('x', 'y', 'health', 'stunned', 'move_counter'):
+            parts.append(array('i', [getattr(enemy, name) for enemy in enemies]).tobytes())
+        parts.append(array('b', [enemy.charge.value for enemy in enemies]).tobytes())
+    else:
+        for values in (swarm.x, swarm.y, swarm.health, swarm.stunned, swarm.move_counter):
+            parts.append(values.astype('<i4').tobytes())
+        parts.append(swarm.charge.astype('i1').tobytes())
+        state = swarm.rng.bit_generator.state
+        parts.append(NUMPY_RNG.pack(state['state']['state'].to_bytes(16, 'little'),
+                                    state['state']['inc'].to_bytes(16, 'little'),
+                                    bool(state['has_uint32']), state['uinteger']))
+    result += parts
+
+    parts = [COUNT.pack(len(sim.powerups))]
+    for powerup in sim.powerups:
+        parts.append(POWERUP.pack(powerup.x, powerup.y, powerup.type.value, powerup.active))
+    result.append(b"".join(parts))
+
+    efield = sim.efield
+    if efield is not None:
+        version = efield.charges_version
+        result.append(FIELD.pack(NO_VERSION if version is None else version))
+    return result
+
+def snapshot(sim):
+    return b"".join(sections(sim))
+
+def field_charge(sim):
+    # Carga somada no motor de campo em cada célula (índice y * largura + x):
+    # cargas ativas e, no modo 'all', as cargas dos inimigos. O campo é
+    # linear, então ele só depende disso.
+    import numpy as np
+    efield = sim.efield
+    width = efield.width
+    charge = np.zeros(width * efield.height, dtype=np.int64)
+    for x, y, q in efield.charges.values():
+        charge[y * width + x] += q
+    if efield.enemy_sources:
+        swarm = sim.swarm
+        if swarm is None:
+            enemies = sim.enemies
+            cells = np.array([enemy.y * width + enemy.x for enemy in enemies], dtype=np.int64)
+            qs = np.array([enemy.charge.value for enemy in enemies], dtype=np.int64)
+        else:
+            cells = swarm.y.astype(np.int64) * width + swarm.x
+            qs = swarm.charge.astype(np.int64)
+        np.add.at(charge, cells, qs)
+    return charge
+
+class Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, layout):
+        try:
+            values = layout.unpack_from(self.data, self.offset)
+        except struct.error:
+            raise SnapshotError("snapshot truncado") from None
+        self.offset += layout.size
+        return values
+
+    def take(self, size):
+        if self.offset + size > len(self.data):
+            raise SnapshotError("snapshot truncado")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+def restore(sim, data):
+    reader = Reader(data)
+    magic, version = reader.read(HEADER)
+    if magic != MAGIC:
+        raise SnapshotError("arquivo não é um snapshot do EletroBlast")
+    if not 1 <= version <= VERSION:
+        raise SnapshotError(f"versão de snapshot não suportada: {version}")
+    (seed, level, ticks, state, width, height, backend, field,
+     ai) = reader.read(GAME)
+    generator = GENERATORS[reader.read(GENERATOR)[0]] if version >= 2 else 'classic'
+    walls_size, = reader.read(COUNT)
+    packed = reader.take(walls_size)
+    walls = zlib.decompress(packed)
+    if len(walls) != width * height:
+        raise SnapshotError("máscara de paredes com tamanho errado")
+
+    sim.seed = seed
+    sim.level = level
+    sim.ticks = ticks
+    sim.state = GameState(state)
+    sim.board = (width, height)
+    sim.backend = BACKENDS[backend]
+    sim.field = FIELD_MODES[field]
+    sim.ai = ai
+    sim.generator = generator
+
+    # Mesmo tabuleiro: reaproveita o grid e o que foi calculado a partir dele
+    grid = getattr(sim, 'grid', None)
+    same = grid is not None and grid.width == width and grid.height == height and grid.walls == walls
+    if same:
+        grid.enemies.clear()
+        grid.powerups.clear()
+        sim.field_index.fields_version = None  # As cargas agora são outros objetos
+    else:
+        grid = Grid(width, height)
+        grid.walls[:] = walls
+        _packed_walls[grid] = bytes(packed)
+        sim.grid = grid
+        sim.field_index = FieldIndex(grid)
+
+    # Carga já somada no motor de campo atual: só as células em que ela
+    # mudou são refeitas
+    efield = getattr(sim, 'efield', None) if same else None
+    old_charge = field_charge(sim) if efield is not None else 0
+
+    for name in ('level_rng', 'enemy_rng'):
+        rng = getattr(sim, name, None)
+        if rng is None:
+            rng = random.Random()
+            setattr(sim, name, rng)
+        rng.setstate(unpack_rng(reader.read(RNG)))
+
+    # Jogador e cargas colocadas
+    (x, y, max_charges, field_strength, field_radius, score, lives, invincible,
+     message_timer, charges_version, message_size) = reader.read(PLAYER)
+    player = Player(x, y)
+    player.max_charges = max_charges
+    player.field_strength = field_strength
+    player.field_radius = field_radius
+    player.score = score
+    player.lives = lives
+    player.invincible = invincible
+    player.message = bytes(reader.take(message_size)).decode()
+    player.message_timer = message_timer
+    charges = ChargeStore()
+    count, = reader.read(COUNT)
+    for _ in range(count):
+        x, y, charge_type, timer, activation_timer, active = reader.read(CHARGE)
+        charge = Charge(x, y, ChargeType(charge_type))
+        charge.timer = timer
+        charge.activation_timer = activation_timer
+        charge.active = active
+        charges.append(charge)
+        if active:
+            charges.active.append(charge)
+    charges.version = charges_version
+    player.placed_charges = charges
+    sim.player = player
+
+    # Inimigos
+    count, = reader.read(COUNT)
+    columns = [reader.take(4 * count) for _ in range(5)]
+    enemy_charges = reader.take(count)
+    if sim.backend == 'numpy':
+        import numpy as np
+        from inimigos_vetorizados import EnemyArrays
+        swarm = sim.swarm if same and getattr(sim, 'swarm', None) is not None else EnemyArrays([], grid)
+        (swarm.x, swarm.y, swarm.health, swarm.stunned,
+         swarm.move_counter) = (np.frombuffer(column, dtype='<i4').astype(np.int32) for column in columns)
+        swarm.charge = np.frombuffer(enemy_charges, dtype=np.int8).copy()
+        state_bytes, inc, has_uint32, uinteger = reader.read(NUMPY_RNG)
+        swarm.rng.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {'state': int.from_bytes(state_bytes, 'little'),
+                      'inc': int.from_bytes(inc, 'little')},
+            'has_uint32': int(has_uint32),
+            'uinteger': uinteger,
+        }
+        sim.swarm = swarm
+        sim.enemies = swarm.views()
+    else:
+        xs, ys, health, stunned, move_counter = (array('i', bytes(column)) for column in columns)
+        types = array('b', bytes(enemy_charges))
+        enemies = []
+        for i in range(count):
+            enemy = Enemy(xs[i], ys[i], ChargeType(types[i]))
+            enemy.health = health[i]
+            enemy.stunned = stunned[i]
+            enemy.move_counter = move_counter[i]
+            grid.enemies.add(enemy)
+            enemies.append(enemy)
+        sim.swarm = None
+        sim.enemies = enemies
+
+    powerups = []
+    count, = reader.read(COUNT)
+    for _ in range(count):
+        x, y, powerup_type, active = reader.read(POWERUP)
+        powerup = PowerUp(x, y, PowerUpType(powerup_type))
+        powerup.active = active
+        grid.powerups.add(powerup)
+        powerups.append(powerup)
+    sim.powerups = powerups
+
+    # Motor de campo: refeito a partir das cargas ativas e dos inimigos
+    if sim.field:
+        import numpy as np
+        from campo import FieldEngine
+        if efield is None or efield.enemy_sources != (sim.field == 'all'):
+            efield = FieldEngine(width, height, enemy_sources=sim.field == 'all')
+            old_charge = 0
+        field_version, = reader.read(FIELD)
+        if version < 3:
+            reader.take(efield.padded.nbytes)  # Arrays gravadas até a versão 2
+        efield.charges = {charge: (charge.x, charge.y, charge.type.value) for charge in charges.active}
+        efield.charges_version = None if field_version == NO_VERSION else field_version
+        sim.efield = efield
+        change = field_charge(sim) - old_charge
+        cells = np.flatnonzero(change)
+        efield.add_many(cells % width, cells // width, change[cells])
+        efield.version += 1
+    else:
+        sim.efield = None
+
+    # Mapas da IA: refeitos no próximo tick a partir do jogador e das cargas
+    paths = None
+    if sim.ai:
+        from caminhos import DistanceMaps
+        paths = getattr(sim, 'paths', None)
+        if same and paths is not None:
+            paths.reset()
+        else:
+            paths = DistanceMaps(grid)
+    sim.paths = paths
+
+    # Eventos são só do último tick
+    sim.activated = player.activated
+    sim.killed = []
+    sim.picked = []
+    return sim
+
+def load_simulation(data):
+    # Cria uma Simulation direto de um snapshot, sem gerar um nível antes
+    return restore(Simulation.__new__(Simulation), data)
+
+def save(path, sim):
+    with open(path, "wb") as f:
+        f.write(snapshot(sim))
+
+def load(path, sim=None):
+    with open(path, "rb") as f:
+        data = f.read()
+    if sim is None:
+        return load_simulation(data)
+    return restore(sim, data)
+
+# Diferença entre duas seções do mesmo tamanho (aplicar de novo desfaz)
+def xor(a, b):
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+def pack_sections(current, previous=None):
+    # Só as seções que mudaram: índice, se é XOR com a anterior, tamanho e
+    # conteúdo; sem previous, todas vão inteiras
+    parts = [COUNT.pack(len(current))]
+    for i, section in enumerate(current):
+        old = previous[i] if previous else None
+        if section == old:
+            continue
+        if old is not None and len(old) == len(section):
+            parts += [SECTION.pack(i, True, len(section)), xor(old, section)]
+        else:
+            parts += [SECTION.pack(i, False, len(section)), section]
+    return zlib.compress(b"".join(parts), 1)
+
+def unpack_sections(entry, previous=None):
+    data = memoryview(zlib.decompress(entry))
+    count, = COUNT.unpack_from(data)
+    current = list(previous) if previous else [b""] * count
+    offset = COUNT.size
+    while offset < len(data):
+        i, delta, size = SECTION.unpack_from(data, offset)
+        offset += SECTION.size
+        section = bytes(data[offset:offset + size])
+        offset += size
+        current[i] = xor(current[i], section) if delta else section
+    return current
+
+# Snapshots guardados inteiros: um a cada KEYFRAME_EVERY
+KEYFRAME_EVERY = 30
+
+class Rewind:
+    def __init__(self, seconds=10, every=6):
+        self.every = every  # Ticks entre snapshots
+        self.capacity = max(1, seconds * FPS // every)
+        self.groups = deque()  # [quadro-chave, diferenças...], comprimidos
+        self.count = 0
+        self.size = 0  # Bytes guardados
+        self.previous = None  # Seções do último snapshot, base da próxima diferença
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.groups.clear()
+        self.count = 0
+        self.size = 0
+        self.previous = None
+
+    def push(self, sim):
+        # Chamado depois de cada tick; grava a cada `every` ticks
+        if sim.ticks % self.every:
+            return
+        current = sections(sim)
+        previous = self.previous
+        if previous is None or len(previous) != len(current) or len(self.groups[-1]) >= KEYFRAME_EVERY:
+            entry = pack_sections(current)
+            self.groups.append([entry])
+        else:
+            entry = pack_sections(current, previous)
+            self.groups[-1].append(entry)
+        self.previous = current
+        self.count += 1
+        self.size += len(entry)
+
+        # Descarta o grupo mais antigo quando os outros já cobrem o buffer
+        while self.count - len(self.groups[0]) >= self.capacity:
+            group = self.groups.popleft()
+            self.count -= len(group)
+            self.size -= sum(len(entry) for entry in group)
+
+    def back(self, sim, seconds):
+        # Volta a partida ~seconds segundos e esquece os snapshots seguintes
+        if not self.count:
+            return False
+        steps = min(self.count - 1, round(seconds * FPS / self.every))
+        group = self.groups[-1]
+        while steps >= len(group):
+            steps -= len(group)
+            self.count -= len(group)
+            self.size -= sum(len(entry) for entry in group)
+            self.groups.pop()
+            group = self.groups[-1]
+        keep = len(group) - steps
+        for entry in group[keep:]:
+            self.size -= len(entry)
+        del group[keep:]
+        self.count -= steps
+
+        current = None
+        for entry in group:
+            current = unpack_sections(entry, current)
+        restore(sim, b"".join(current))
+        self.previous = current
+        return True
+
+if __name__ == "__main__":
+    import argparse
+
+    from replay import state_hash
+    from simulacao import GRID_WIDTH, GRID_HEIGHT, new_simulation, parse_board, parse_seed
+
+    parser = argparse.ArgumentParser(description="Salva e continua simulações do EletroBlast sem janela")
+    parser.add_argument("--load", metavar="ARQUIVO", help="continua a partir de um snapshot")
+    parser.add_argument("--save", metavar="ARQUIVO", help="salva o estado ao final")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--level", type=int, default=10)
+    parser.add_argument("--seed", type=parse_seed)
+    parser.add_argument("--backend", choices=BACKENDS, default='objects')
+    parser.add_argument("--board", type=parse_board, default=(GRID_WIDTH, GRID_HEIGHT), metavar="LxA")
+    parser.add_argument("--field", choices=FIELD_MODES[1:])
+    parser.add_argument("--ai", action="store_true")
+    parser.add_argument("--generator", choices=GENERATORS, default='classic')
+    args = parser.parse_args()
+
+    if args.load:
+        sim = load(args.load)
+    else:
+        sim = new_simulation(args.level, args.backend, args.seed, board=args.board, field=args.field,
+                             ai=args.ai, generator=args.generator)
+    for _ in range(args.ticks):
+        if sim.step() != GameState.PLAYING:
+            break
+
+    # Mede snapshot e restauração e confere que a continuação é idêntica
+    start = time.perf_counter()
+    data = snapshot(sim)
+    saved = time.perf_counter() - start
+    copy = load_simulation(data)
+    start = time.perf_counter()
+    restore(copy, data)
+    restored = time.perf_counter() - start
+    for _ in range(600):
+        sim.step()
+        copy.step()
+    same = state_hash(sim) == state_hash(copy)
+
+    print(f"Nível {copy.level}, tick {copy.ticks - 600}: snapshot de {len(data):,} bytes")
+    print(f"snapshot em {saved * 1000:.3f} ms, restauração em {restored * 1000:.3f} ms")
+    print("Continuação idêntica" if same else "Continuação DIFERENTE")
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(data)
@@ -0,0 +1,73 @@
+# Cache de fontes e de textos renderizados
+#
+# pygame.font.SysFont faz uma busca nas fontes do sistema a cada chamada e
+# font.render cria uma Surface nova. Aqui cada tamanho de fonte é resolvido
+# uma única vez e cada texto renderizado fica guardado em um cache LRU de
+# tamanho limitado, então símbolos de cargas/power-ups e linhas do HUD só
+# são renderizados de novo quando o texto ou a cor mudam.
+
+from collections import OrderedDict
+
+import pygame
+
+# Símbolos desenhados em todo frame (cargas, dipolos e power-ups)
+GLYPHS = ('+', '-', 'r+', 'E+', '+1')
+GLYPH_SIZE = 30
+
+_fonts = {}
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = pygame.font.SysFont(None, size)
+        _fonts[size] = font
+    return font
+
+class TextCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, color):
+        key = (text, size, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = get_font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)  # Descarta o menos usado
+        return surface
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.surfaces),
+            'max_size': self.max_size,
+            'fonts': len(_fonts),
+        }
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+text_cache = TextCache()
+
+def render_text(text, size, color):
+    return text_cache.render(text, size, color)
+
+def prerender_glyphs(colors):
+    # Aquece o cache com os símbolos das entidades em cada cor usada
+    for color in colors:
+        for glyph in GLYPHS:
+            text_cache.render(glyph, GLYPH_SIZE, color)
@@ -0,0 +1,71 @@
+# Grid do nível com índice espacial de ocupação
+#
+# As paredes ficam em uma máscara plana (bytearray, uma posição por célula,
+# índice y * width + x) e as entidades ficam em mapas célula -> entidades,
+# atualizados quando um inimigo se move ou um power-up é pego. Assim
+# colisões, coleta de power-ups e procura de células livres são consultas
+# O(1), sem percorrer listas de entidades nem uma lista de listas de
+# caracteres.
+
+class CellMap:
+    def __init__(self, width):
+        self.width = width
+        self.cells = {}
+
+    def add(self, entity):
+        key = entity.y * self.width + entity.x
+        entities = self.cells.get(key)
+        if entities is None:
+            self.cells[key] = [entity]
+        else:
+            entities.append(entity)
+
+    def remove(self, entity, x=None, y=None):
+        # x e y permitem remover pela célula antiga, antes de um movimento
+        if x is None:
+            x, y = entity.x, entity.y
+        key = y * self.width + x
+        entities = self.cells[key]
+        entities.remove(entity)
+        if not entities:
+            del self.cells[key]
+
+    def move(self, entity, old_x, old_y):
+        self.remove(entity, old_x, old_y)
+        self.add(entity)
+
+    def at(self, x, y):
+        return self.cells.get(y * self.width + x, ())
+
+    def clear(self):
+        self.cells.clear()
+
+class Grid:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.walls = bytearray(width * height)
+        self.enemies = CellMap(width)
+        self.powerups = CellMap(width)
+
+    def is_wall(self, x, y):
+        # Fora do grid conta como parede
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.walls[y * self.width + x] != 0
+        return True
+
+    def set_wall(self, x, y, wall=True):
+        self.walls[y * self.width + x] = 1 if wall else 0
+
+    def set_border(self):
+        # Paredes em toda a borda, preenchidas por fatias do bytearray
+        width = self.width
+        walls = self.walls
+        walls[0:width] = b"\x01" * width
+        walls[(self.height - 1) * width:] = b"\x01" * width
+        walls[0::width] = b"\x01" * self.height
+        walls[width - 1::width] = b"\x01" * self.height
+
+    def free_cells(self):
+        width = self.width
+        return [(i % width, i // width) for i, wall in enumerate(self.walls) if not wall]
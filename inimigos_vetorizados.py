@@ -0,0 +1,253 @@
+# Backend vetorizado de inimigos (NumPy, estrutura de arrays)
+#
+# Guarda x, y, carga, vida, atordoamento e contador de movimento de todos os
+# inimigos em arrays NumPy e atualiza todos de uma vez por tick: movimento
+# aleatório, colisão com paredes, atração/repulsão pelos campos ativos e
+# colisão com o jogador viram operações em lote. Serve para "fases de
+# estresse" com milhares de cargas. O jogo continua vendo os inimigos pela
+# API de Enemy através de EnemyView, que só lê e escreve nos arrays.
+#
+# NumPy é opcional: só este módulo depende dele, e a simulação só o importa
+# quando o backend "numpy" é pedido.
+
+import random
+
+import numpy as np
+
+from caminhos import ALIGN_WEIGHT, DANGER_WEIGHT, STEP_LIST
+from simulacao import GRID_WIDTH, GRID_HEIGHT, ChargeType, Enemy, create_level
+
+# Direções do movimento aleatório, na mesma ordem de Enemy.update
+DIRECTIONS = np.array([(0, 1), (1, 0), (0, -1), (-1, 0)], dtype=np.int32)
+
+# Valores das cargas nos arrays (os mesmos de ChargeType)
+POSITIVE = ChargeType.POSITIVE.value
+NEGATIVE = ChargeType.NEGATIVE.value
+DIPOLE = ChargeType.DIPOLE.value
+
+# Ficar parado e depois os passos de caminhos.py, na ordem de DistanceMaps.step
+PATH_MOVES = ((0, 0),) + STEP_LIST
+UNREACHABLE = np.iinfo(np.int32).max
+
+# Visão de um inimigo do lote com a mesma interface de Enemy
+class EnemyView:
+    __slots__ = ('swarm', 'index')
+
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+
+    @property
+    def x(self):
+        return int(self.swarm.x[self.index])
+
+    @x.setter
+    def x(self, value):
+        self.swarm.x[self.index] = value
+
+    @property
+    def y(self):
+        return int(self.swarm.y[self.index])
+
+    @y.setter
+    def y(self, value):
+        self.swarm.y[self.index] = value
+
+    @property
+    def charge(self):
+        return ChargeType(int(self.swarm.charge[self.index]))
+
+    @charge.setter
+    def charge(self, value):
+        self.swarm.charge[self.index] = value.value
+
+    @property
+    def health(self):
+        return int(self.swarm.health[self.index])
+
+    @health.setter
+    def health(self, value):
+        self.swarm.health[self.index] = value
+
+    @property
+    def stunned(self):
+        return int(self.swarm.stunned[self.index])
+
+    @stunned.setter
+    def stunned(self, value):
+        self.swarm.stunned[self.index] = value
+
+    @property
+    def move_counter(self):
+        return int(self.swarm.move_counter[self.index])
+
+    @move_counter.setter
+    def move_counter(self, value):
+        self.swarm.move_counter[self.index] = value
+
+class EnemyArrays:
+    def __init__(self, enemies, grid, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.x = np.array([e.x for e in enemies], dtype=np.int32)
+        self.y = np.array([e.y for e in enemies], dtype=np.int32)
+        self.charge = np.array([e.charge.value for e in enemies], dtype=np.int8)
+        self.health = np.array([e.health for e in enemies], dtype=np.int32)
+        self.stunned = np.array([e.stunned for e in enemies], dtype=np.int32)
+        self.move_counter = np.array([e.move_counter for e in enemies], dtype=np.int32)
+
+        # Máscara de paredes com uma borda extra de paredes, assim um passo
+        # para fora do grid cai sempre em parede e não precisa de teste de limite
+        self.width = grid.width
+        self.height = grid.height
+        self.walls = np.ones((grid.height + 2, grid.width + 2), dtype=bool)
+        self.walls[1:-1, 1:-1] = np.frombuffer(grid.walls, dtype=np.uint8).reshape(
+            grid.height, grid.width) != 0
+
+        # Máscaras planas (y * width + x) das células afetadas por campo
+        self.field_masks = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def views(self):
+        return [EnemyView(self, i) for i in range(len(self.x))]
+
+    def views_in(self, x0, y0, x1, y1):
+        # Só os inimigos dentro do retângulo de células [x0, x1) x [y0, y1)
+        inside = (self.x >= x0) & (self.x < x1) & (self.y >= y0) & (self.y < y1)
+        return [EnemyView(self, i) for i in np.flatnonzero(inside)]
+
+    def field_mask(self, cells):
+        mask = self.field_masks.get(cells)
+        if mask is None:
+            mask = np.zeros(self.width * self.height, dtype=bool)
+            mask[list(cells)] = True
+            self.field_masks[cells] = mask
+        return mask
+
+    def try_move(self, movers, dx, dy):
+        # Move os inimigos selecionados onde o destino não for parede
+        new_x = self.x[movers] + dx
+        new_y = self.y[movers] + dy
+        free = ~self.walls[new_y + 1, new_x + 1]
+        idx = movers[free]
+        self.x[idx] = new_x[free]
+        self.y[idx] = new_y[free]
+
+    def path_steps(self, paths, movers):
+        # Versão em lote de DistanceMaps.step, lendo os mapas sem cópia:
+        # devolve (dx, dy, máscara de quem está no alcance do mapa)
+        width = self.width
+        cells = self.y[movers] * width + self.x[movers]
+        charge = self.charge[movers]
+        distance = np.frombuffer(paths.distance, dtype=np.intc)
+        danger = {q: np.frombuffer(paths.danger[q], dtype=np.intc) for q in (POSITIVE, NEGATIVE, DIPOLE)}
+        weight = np.where(charge == DIPOLE, -ALIGN_WEIGHT, DANGER_WEIGHT)
+        positive = charge == POSITIVE
+        negative = charge == NEGATIVE
+
+        costs = []
+        for dx, dy in PATH_MOVES:
+            cell = cells + dy * width + dx
+            near = np.where(positive, danger[POSITIVE][cell],
+                            np.where(negative, danger[NEGATIVE][cell], danger[DIPOLE][cell]))
+            steps = distance[cell].astype(np.int64)
+            costs.append(np.where(steps >= 0, steps + weight * near, UNREACHABLE))
+        # argmin fica com o primeiro mínimo: parado no empate, como em step
+        best = np.argmin(np.stack(costs), axis=0)
+        moves = np.array(PATH_MOVES, dtype=np.int32)[best]
+        return moves[:, 0], moves[:, 1], distance[cells] >= 0
+
+    def update(self, player, fields, efield=None, paths=None):
+        # Inimigos atordoados só descontam o atordoamento
+        stunned = self.stunned > 0
+        self.stunned[stunned] -= 1
+
+        # Os demais só se movem a cada 30 ticks
+        active = ~stunned
+        self.move_counter[active] += 1
+        movers = np.flatnonzero(active & (self.move_counter >= 30))
+        self.move_counter[movers] = 0
+
+        sources = efield is not None and efield.enemy_sources and len(movers)
+        if sources:
+            old = (self.x[movers], self.y[movers], self.charge[movers])
+
+        if len(movers):
+            # Movimento aleatório (ou pelos mapas da IA e pela força do campo
+            # resultante, com o motor de campo)
+            direction = DIRECTIONS[self.rng.integers(0, 4, size=len(movers))]
+            if paths is not None:
+                dx, dy, follow = self.path_steps(paths, movers)
+                direction[follow, 0] = dx[follow]
+                direction[follow, 1] = dy[follow]
+            if efield is not None:
+                dx, dy, follow = efield.steps(self.x[movers], self.y[movers], self.charge[movers])
+                direction[follow, 0] = dx[follow]
+                direction[follow, 1] = dy[follow]
+            self.try_move(movers, direction[:, 0], direction[:, 1])
+
+            # Interação com cada campo ativo, na ordem em que as cargas foram colocadas
+            for charge, cells in fields:
+                mask = self.field_mask(cells)
+                inside = movers[mask[self.y[movers] * self.width + self.x[movers]]]
+                if not len(inside):
+                    continue
+                charge_value = charge.type.value
+                enemy_charge = self.charge[inside]
+
+                # Dipolo vira carga do mesmo sinal do campo
+                dipoles = enemy_charge == DIPOLE
+                self.charge[inside[dipoles]] = charge_value
+
+                # Atração - inimigo é eliminado
+                normal = inside[~dipoles]
+                attracted = self.charge[normal] != charge_value
+                self.health[normal[attracted]] = 0
+
+                # Repulsão - inimigo é empurrado para longe da carga
+                repelled = normal[~attracted]
+                if len(repelled):
+                    dx = np.sign(self.x[repelled] - charge.x)
+                    dy = np.sign(self.y[repelled] - charge.y)
+                    self.try_move(repelled, dx, dy)
+
+        # Atualiza as cargas dos inimigos no campo (eliminados saem com q = 0)
+        if sources:
+            charge = np.where(self.health[movers] > 0, self.charge[movers], 0)
+            efield.move_sources(*old, self.x[movers], self.y[movers], charge)
+
+        # Colisão com o jogador (inclusive de inimigos eliminados neste tick)
+        hit = bool(np.any((self.x == player.x) & (self.y == player.y)))
+
+        # Remove os eliminados, devolvendo cópias como Enemy para eventos
+        dead = self.health <= 0
+        killed = []
+        if dead.any():
+            for i in np.flatnonzero(dead):
+                enemy = Enemy(int(self.x[i]), int(self.y[i]), ChargeType(int(self.charge[i])))
+                enemy.health = 0
+                killed.append(enemy)
+            keep = ~dead
+            self.x = self.x[keep]
+            self.y = self.y[keep]
+            self.charge = self.charge[keep]
+            self.health = self.health[keep]
+            self.stunned = self.stunned[keep]
+            self.move_counter = self.move_counter[keep]
+
+        return killed, hit
+
+# Fase de estresse: um nível normal com num_enemies cargas em células livres
+def create_stress_level(num_enemies, level_num=1, rng=random, board=(GRID_WIDTH, GRID_HEIGHT)):
+    grid, player_x, player_y, enemies, powerups = create_level(level_num, rng, *board)
+    free = [cell for cell in grid.free_cells() if cell != (player_x, player_y)]
+    enemies = []
+    for _ in range(num_enemies):
+        x, y = rng.choice(free)
+        charge_type = rng.choices(
+            [ChargeType.POSITIVE, ChargeType.NEGATIVE, ChargeType.DIPOLE],
+            weights=[5, 3, 2]
+        )[0]
+        enemies.append(Enemy(x, y, charge_type))
+    return grid, player_x, player_y, enemies, powerups
@@ -1,22 +1,29 @@
+import time
+START_TIME = time.perf_counter()  # Início do jogo, para medir o tempo até o menu
+
 import pygame
+import queue
+import socket
 import sys
-import math
-from enum import Enum
-import random
-import os
+import threading
 
+from fontes import get_font, render_text, prerender_glyphs
+from perfil import profiler
+from recursos import assets
+from superficies import Atlas, SurfaceCache, field_surface
+from som import AudioManager
+from simulacao import (SCREEN_WIDTH, SCREEN_HEIGHT, GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, FPS,
+                       GENERATORS, GameState, ChargeType, PowerUpType, Action, new_simulation,
+                       parse_board, parse_seed)
 
-# Inicialização do Pygame
-pygame.init()
-pygame.mixer.init()
 
-# Constantes do jogo
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-GRID_SIZE = 50
-GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
-GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
-FPS = 60
+# Inicialização do Pygame: só vídeo (com eventos) e fontes, o que o menu
+# precisa. O mixer é aberto por som.py quando o áudio começa, e com --mute ou
+# o driver dummy nunca é aberto. replay.py, estado.py e servidor.py também
+# ficam fora do caminho até o menu: são importados quando a primeira partida
+# começa, no primeiro save/load/gravação ou só com --connect.
+pygame.display.init()
+pygame.font.init()
 
 # Cores
 WHITE = (255, 255, 255)
@@ -30,422 +37,592 @@ GRAY = (128, 128, 128)
 ORANGE = (255, 165, 0)
 PINK = (255, 192, 203)
 
-# Estados do jogo
-class GameState(Enum):
-    MENU = 0
-    PLAYING = 1
-    LEVEL_COMPLETE = 2
-    GAME_OVER = 3
-
-# Tipos de carga
-class ChargeType(Enum):
-    POSITIVE = 1
-    NEGATIVE = -1
-    DIPOLE = 0  # Dipolo tem ambas as cargas
-
-# Tipos de power-up
-class PowerUpType(Enum):
-    FIELD_STRENGTH = 1
-    EXTRA_CHARGE = 2
-    EXTRA_LIFE = 3
+# Renderização por dirty rects (ativada com --dirty-rects)
+DIRTY_RECTS = False
+
+# Teclas mapeadas para ações do jogador
+KEY_ACTIONS = {
+    pygame.K_LEFT: Action.LEFT,
+    pygame.K_a: Action.LEFT,
+    pygame.K_RIGHT: Action.RIGHT,
+    pygame.K_d: Action.RIGHT,
+    pygame.K_UP: Action.UP,
+    pygame.K_w: Action.UP,
+    pygame.K_DOWN: Action.DOWN,
+    pygame.K_s: Action.DOWN,
+    pygame.K_p: Action.PLACE_POSITIVE,
+    pygame.K_n: Action.PLACE_NEGATIVE,
+}
 
 # Configuração da tela
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("EletroBlast")
 clock = pygame.time.Clock()
 
-# Carregar recursos
-def load_image(name, scale=1):
-    try:
-        image = pygame.image.load(name)
-        if scale != 1:
-            size = image.get_size()
-            image = pygame.transform.scale(image, (int(size[0] * scale), int(size[1] * scale)))
-        return image
-    except:
-        # Fallback se a imagem não carregar
-        surf = pygame.Surface((100, 100))
-        surf.fill(PURPLE)
-        return surf
-
-def load_sound(name):
-    try:
-        return pygame.mixer.Sound(name)
-    except:
-        # Fallback silencioso se o áudio não carregar
-        return pygame.mixer.Sound(buffer=bytearray(0))
-
-# Carregar imagens e sons
-menu_image = load_image("menu_background.png")  # Substitua pelo seu arquivo
-menu_image = pygame.transform.scale(menu_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-menu_music = load_sound("menu_music.mp3")  # Substitua pelo seu arquivo
-game_music = load_sound("game_music.mp3")  # Substitua pelo seu arquivo
-charge_sound = load_sound("charge.mp3")  # Substitua pelo seu arquivo
-
-# Classes do jogo
-class Player:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.max_charges = 1  # Começa colocando apenas 1 campo por vez
-        self.placed_charges = []
-        self.field_strength = 1.0  # Intensidade do campo
-        self.field_radius = 2  # Raio do campo em células
-        self.score = 0
-        self.lives = 3
-        self.invincible = 0
-        self.message = ""
-        self.message_timer = 0
-    
-    def move(self, dx, dy, grid):
-        new_x = self.x + dx
-        new_y = self.y + dy
-        
-        # Verifica se a nova posição está dentro dos limites e não é uma parede
-        if (0 <= new_x < GRID_WIDTH and 0 <= new_y < GRID_HEIGHT and 
-            grid[new_y][new_x] != 'W'):
-            self.x = new_x
-            self.y = new_y
-            
-    def place_charge(self, charge_type):
-        if len(self.placed_charges) < self.max_charges:
-            self.placed_charges.append({
-                'x': self.x,
-                'y': self.y,
-                'type': charge_type,
-                'timer': 180,
-                'active': False,
-                'activation_timer': 0
-            })
-            return True
-        return False
+# Símbolos das entidades já renderizados em todas as cores usadas
+prerender_glyphs([WHITE, BLACK, (200, 200, 200)])
+
+# Câmera: deslocamento em pixels do canto da tela dentro do tabuleiro.
+# Em tabuleiros que cabem na tela ela fica parada em (0, 0).
+class Camera:
+    def __init__(self):
+        self.x = 0
+        self.y = 0
     
-    def update(self):
-        # Atualiza temporizador de invencibilidade
-        if self.invincible > 0:
-            self.invincible -= 1
-            
-        # Atualiza mensagem
-        if self.message_timer > 0:
-            self.message_timer -= 1
-            
-        # Atualiza cargas colocadas
-        for charge in self.placed_charges[:]:
-            charge['timer'] -= 1
-            
-            # Ativa automaticamente após 3 segundos
-            if charge['timer'] <= 0 and not charge['active']:
-                charge['active'] = True
-                charge_sound.play()  # Tocar som ao colocar carga
-                charge['activation_timer'] = 60  # Campo fica ativo por 1 segundo
-            
-            # Desativa após o tempo de ativação
-            if charge['active']:
-                charge['activation_timer'] -= 1
-                if charge['activation_timer'] <= 0:
-                    self.placed_charges.remove(charge)
-    
-    def show_message(self, message):
-        self.message = message
-        self.message_timer = 60  # Mostra por 1 segundo
-    
-    def draw(self, screen):
-        # Desenha o jogador (verde e neutro)
-        pygame.draw.circle(screen, GREEN, 
-                         (self.x * GRID_SIZE + GRID_SIZE//2, self.y * GRID_SIZE + GRID_SIZE//2), 
-                         GRID_SIZE//2 - 5)
-        
-        # Desenha cargas colocadas
-        for charge in self.placed_charges:
-            color = RED if charge['type'] == ChargeType.POSITIVE else BLUE
-            alpha = 128 if not charge['active'] else 255
-            s = pygame.Surface((GRID_SIZE-10, GRID_SIZE-10), pygame.SRCALPHA)
-            s.fill((color[0], color[1], color[2], alpha))
-            screen.blit(s, (charge['x'] * GRID_SIZE + 5, charge['y'] * GRID_SIZE + 5))
-            
-            # Desenha símbolo da carga
-            charge_symbol = '+' if charge['type'] == ChargeType.POSITIVE else '-'
-            font = pygame.font.SysFont(None, 30)
-            text = font.render(charge_symbol, True, WHITE if charge['active'] else (200, 200, 200))
-            screen.blit(text, (charge['x'] * GRID_SIZE + GRID_SIZE//2 - 5, 
-                              charge['y'] * GRID_SIZE + GRID_SIZE//2 - 10))
-            
-            # Se estiver ativa, desenha o campo elétrico
-            if charge['active']:
-                radius = int(GRID_SIZE * self.field_radius)
-                alpha = max(0, min(255, charge['activation_timer'] * 4))
-                s = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-                pygame.draw.circle(s, (color[0], color[1], color[2], alpha//3), 
-                                 (radius, radius), radius)
-                screen.blit(s, (charge['x'] * GRID_SIZE + GRID_SIZE//2 - radius, 
-                                  charge['y'] * GRID_SIZE + GRID_SIZE//2 - radius))
-        
-        # Desenha mensagem se houver
-        if self.message_timer > 0:
-            font = pygame.font.SysFont(None, 36)
-            text = font.render(self.message, True, WHITE)
-            text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 30))
-            screen.blit(text, text_rect)
+    def scrolls(self, grid):
+        return grid.width * GRID_SIZE > SCREEN_WIDTH or grid.height * GRID_SIZE > SCREEN_HEIGHT
+    
+    def follow(self, player, grid, pos=None):
+        # Centraliza o jogador sem mostrar nada além das bordas do tabuleiro;
+        # pos é a posição do jogador em pixels no tabuleiro, se interpolada
+        px, py = pos or (player.x * GRID_SIZE, player.y * GRID_SIZE)
+        max_x = max(0, grid.width * GRID_SIZE - SCREEN_WIDTH)
+        max_y = max(0, grid.height * GRID_SIZE - SCREEN_HEIGHT)
+        self.x = min(max(px + GRID_SIZE//2 - SCREEN_WIDTH//2, 0), max_x)
+        self.y = min(max(py + GRID_SIZE//2 - SCREEN_HEIGHT//2, 0), max_y)
+    
+    def visible_cells(self, grid):
+        # Retângulo de células [x0, x1) x [y0, y1) que aparece na tela
+        x0 = self.x // GRID_SIZE
+        y0 = self.y // GRID_SIZE
+        x1 = min(grid.width, (self.x + SCREEN_WIDTH - 1) // GRID_SIZE + 1)
+        y1 = min(grid.height, (self.y + SCREEN_HEIGHT - 1) // GRID_SIZE + 1)
+        return x0, y0, x1, y1
 
-class Enemy:
-    def __init__(self, x, y, charge_type=ChargeType.POSITIVE):
-        self.x = x
-        self.y = y
-        self.charge = charge_type
-        self.health = 100
-        self.stunned = 0
-        self.move_counter = 0
-        
-    def update(self, player, grid):
-        if self.stunned > 0:
-            self.stunned -= 1
-            return
-            
-        self.move_counter += 1
-        if self.move_counter < 30:  # Move a cada 0.5 segundos
-            return
-        self.move_counter = 0
-        
-        # Movimento aleatório
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        direction = random.choice(directions)
-        
-        new_x = self.x + direction[0]
-        new_y = self.y + direction[1]
-        
-        # Verifica colisão com paredes
-        if (0 <= new_x < GRID_WIDTH and 0 <= new_y < GRID_HEIGHT and 
-            grid[new_y][new_x] != 'W'):
-            self.x = new_x
-            self.y = new_y
-            
-        # Verifica interação com campos elétricos ativos
-        for charge in [c for c in player.placed_charges if c['active']]:
-            dx = self.x - charge['x']
-            dy = self.y - charge['y']
-            distance = math.sqrt(dx*dx + dy*dy)
-            
-            # Verifica se está no raio do campo e sem paredes no caminho
-            if distance <= player.field_radius and not self.has_wall_between(charge['x'], charge['y'], grid):
-                # Dipolo tem comportamento especial
-                if self.charge == ChargeType.DIPOLE:
-                    if charge['type'] == ChargeType.POSITIVE:
-                        # Parte negativa do dipolo é atraída
-                        self.charge = ChargeType.POSITIVE  # Transforma em carga positiva
-                    else:
-                        # Parte positiva do dipolo é atraída
-                        self.charge = ChargeType.NEGATIVE  # Transforma em carga negativa
-                    continue
-                
-                # Cargas normais
-                if self.charge != charge['type']:
-                    # Atração - inimigo é eliminado
-                    self.health = 0
-                else:
-                    # Repulsão - inimigo é empurrado
-                    force_dir = (int(dx / max(1, abs(dx))), int(dy / max(1, abs(dy))))
-                    new_x = self.x + force_dir[0]
-                    new_y = self.y + force_dir[1]
-                    
-                    if (0 <= new_x < GRID_WIDTH and 0 <= new_y < GRID_HEIGHT and 
-                        grid[new_y][new_x] != 'W'):
-                        self.x = new_x
-                        self.y = new_y
-    
-    def has_wall_between(self, x1, y1, grid):
-        # Bresenham's line algorithm para verificar paredes no caminho
-        dx = abs(self.x - x1)
-        dy = abs(self.y - y1)
-        x, y = x1, y1
-        sx = -1 if x1 > self.x else 1
-        sy = -1 if y1 > self.y else 1
-        err = dx - dy
-        
-        while x != self.x or y != self.y:
-            if grid[y][x] == 'W':
-                return True
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x += sx
-            if e2 < dx:
-                err += dx
-                y += sy
-        return False
+camera = Camera()
+
+# Posições do último tick, para desenhar as entidades entre dois ticks.
+# A simulação anda em passos fixos e a tela pode ser desenhada várias vezes
+# (ou nenhuma) por tick; alpha é a fração já decorrida do próximo tick.
+# Só os inimigos perto da tela são guardados, e só passos de uma célula são
+# interpolados (teleportes e trocas de nível são desenhados direto).
+class Interpolation:
+    def __init__(self):
+        self.alpha = 1.0
+        self.grid = None
+        self.count = 0
+        self.player = None
+        self.enemies = {}
+        self.swarm_xy = None
     
-    def draw(self, screen):
-        if self.charge == ChargeType.DIPOLE:
-            # Desenha dipolo (roxo)
-            pygame.draw.circle(screen, PURPLE, 
-                             (self.x * GRID_SIZE + GRID_SIZE//2, self.y * GRID_SIZE + GRID_SIZE//2), 
-                             GRID_SIZE//2 - 5)
-            
-            # Desenha ambas as cargas
-            font = pygame.font.SysFont(None, 30)
-            text_pos = font.render('+', True, WHITE)
-            text_neg = font.render('-', True, WHITE)
-            screen.blit(text_pos, (self.x * GRID_SIZE + GRID_SIZE//2 - 15, self.y * GRID_SIZE + GRID_SIZE//2 - 10))
-            screen.blit(text_neg, (self.x * GRID_SIZE + GRID_SIZE//2 + 5, self.y * GRID_SIZE + GRID_SIZE//2 - 10))
-        else:
-            # Desenha carga normal
-            color = RED if self.charge == ChargeType.POSITIVE else BLUE
-            pygame.draw.circle(screen, color, 
-                             (self.x * GRID_SIZE + GRID_SIZE//2, self.y * GRID_SIZE + GRID_SIZE//2), 
-                             GRID_SIZE//2 - 5)
-            
-            # Desenha símbolo da carga
-            charge_symbol = '+' if self.charge == ChargeType.POSITIVE else '-'
-            font = pygame.font.SysFont(None, 30)
-            text = font.render(charge_symbol, True, WHITE)
-            screen.blit(text, (self.x * GRID_SIZE + GRID_SIZE//2 - 5, 
-                              self.y * GRID_SIZE + GRID_SIZE//2 - 10))
-
-class PowerUp:
-    def __init__(self, x, y, type):
-        self.x = x
-        self.y = y
-        self.type = type
-        self.active = True
-        
-    def apply(self, player):
-        if self.type == PowerUpType.FIELD_STRENGTH:
-            player.field_strength += 0.5
-            player.field_radius += 0.5
-            return "Raio do Campo +"
-        elif self.type == PowerUpType.EXTRA_CHARGE:
-            player.max_charges += 1
-            return "Campo Extra +"
-        else:  # EXTRA_LIFE
-            player.lives += 1
-            return "Vida Extra +"
-        
-    def draw(self, screen):
-        if not self.active:
+    def snapshot(self, sim):
+        # Chamado antes do último tick de cada frame
+        grid = sim.grid
+        self.grid = grid
+        self.count = len(sim.enemies)
+        self.player = (sim.player.x, sim.player.y)
+        if sim.swarm is not None:
+            self.swarm_xy = (sim.swarm.x.copy(), sim.swarm.y.copy())
             return
-            
-        if self.type == PowerUpType.FIELD_STRENGTH:
-            color = YELLOW
-            symbol = 'r+'
-        elif self.type == PowerUpType.EXTRA_CHARGE:
-            color = ORANGE
-            symbol = 'E+'
-        else:  # EXTRA_LIFE
-            color = PINK
-            symbol = '+1'
-            
-        pygame.draw.rect(screen, color, 
-                        (self.x * GRID_SIZE + 5, self.y * GRID_SIZE + 5, 
-                         GRID_SIZE - 10, GRID_SIZE - 10))
+        self.swarm_xy = None
+        self.enemies.clear()
+        x0, y0, x1, y1 = camera.visible_cells(grid)
+        for y in range(max(0, y0 - 1), min(grid.height, y1 + 1)):
+            for x in range(max(0, x0 - 1), min(grid.width, x1 + 1)):
+                for enemy in grid.enemies.at(x, y):
+                    self.enemies[enemy] = (x, y)
+    
+    def reset(self):
+        self.alpha = 1.0
+        self.grid = None
+    
+    def board_pos(self, entity, previous):
+        # Canto da célula em pixels no tabuleiro
+        x, y = entity.x, entity.y
+        if previous is None or abs(previous[0] - x) + abs(previous[1] - y) != 1:
+            return x * GRID_SIZE, y * GRID_SIZE
+        t = self.alpha
+        return (round((previous[0] + (x - previous[0]) * t) * GRID_SIZE), 
+                round((previous[1] + (y - previous[1]) * t) * GRID_SIZE))
+    
+    def player_pos(self, sim):
+        return self.board_pos(sim.player, self.player if sim.grid is self.grid else None)
+    
+    def enemy_pos(self, sim, enemy):
+        previous = None
+        # Com mortes no último tick o backend NumPy reindexa os inimigos
+        if sim.grid is self.grid and len(sim.enemies) == self.count:
+            if self.swarm_xy is not None:
+                xs, ys = self.swarm_xy
+                previous = (int(xs[enemy.index]), int(ys[enemy.index]))
+            else:
+                previous = self.enemies.get(enemy)
+        x, y = self.board_pos(enemy, previous)
+        return x - camera.x, y - camera.y
+
+interpolation = Interpolation()
+
+# Recursos: nada é decodificado aqui. A imagem do menu é carregada em uma
+# thread de fundo enquanto o menu já aparece; sons e músicas passam pelo
+# AudioManager (som.py), que em main() escolhe entre o mixer e o backend
+# mudo (--mute ou driver de áudio dummy).
+MENU_IMAGE = "menu_background.png"  # Substitua pelo seu arquivo
+MENU_MUSIC = "menu_music.mp3"  # Substitua pelo seu arquivo
+GAME_MUSIC = "game_music.mp3"  # Substitua pelo seu arquivo
+CHARGE_SOUND = "charge.mp3"  # Substitua pelo seu arquivo
+MENU_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
+
+assets.load_in_background(images=[(MENU_IMAGE, MENU_SIZE)])
+
+# O som das cargas usa os canais do grupo 'charges' e não se repete em menos
+# de 50 ms; ativações do mesmo frame viram uma voz só
+audio = AudioManager()
+audio.register(CHARGE_SOUND, 'charges', volume=0.6, interval=0.05)
+
+# Desenho de cada sprite, usado só para montar o atlas. Cada função desenha
+# a entidade no canto (0, 0) de uma superfície GRID_SIZE x GRID_SIZE.
+POWERUP_LOOKS = {
+    PowerUpType.FIELD_STRENGTH: (YELLOW, 'r+'),
+    PowerUpType.EXTRA_CHARGE: (ORANGE, 'E+'),
+    PowerUpType.EXTRA_LIFE: (PINK, '+1'),
+}
+
+def paint_player(surface):
+    # Jogador (verde e neutro)
+    pygame.draw.circle(surface, GREEN, (GRID_SIZE//2, GRID_SIZE//2), GRID_SIZE//2 - 5)
+
+def paint_enemy(surface, charge):
+    if charge == ChargeType.DIPOLE:
+        # Dipolo (roxo) com ambas as cargas
+        pygame.draw.circle(surface, PURPLE, (GRID_SIZE//2, GRID_SIZE//2), GRID_SIZE//2 - 5)
+        surface.blit(render_text('+', 30, WHITE), (GRID_SIZE//2 - 15, GRID_SIZE//2 - 10))
+        surface.blit(render_text('-', 30, WHITE), (GRID_SIZE//2 + 5, GRID_SIZE//2 - 10))
+    else:
+        # Carga normal com seu símbolo
+        color = RED if charge == ChargeType.POSITIVE else BLUE
+        pygame.draw.circle(surface, color, (GRID_SIZE//2, GRID_SIZE//2), GRID_SIZE//2 - 5)
+        charge_symbol = '+' if charge == ChargeType.POSITIVE else '-'
+        surface.blit(render_text(charge_symbol, 30, WHITE), (GRID_SIZE//2 - 5, GRID_SIZE//2 - 10))
+
+def paint_powerup(surface, powerup_type):
+    color, symbol = POWERUP_LOOKS[powerup_type]
+    pygame.draw.rect(surface, color, (5, 5, GRID_SIZE - 10, GRID_SIZE - 10))
+    surface.blit(render_text(symbol, 30, BLACK), (GRID_SIZE//2 - 10, GRID_SIZE//2 - 10))
+
+def paint_charge(surface, charge_type, active):
+    # Carga colocada: quadrado translúcido (opaco depois de ativar) e símbolo
+    # fill grava o alfa direto; um blit sobre o atlas transparente escureceria a cor
+    color = RED if charge_type == ChargeType.POSITIVE else BLUE
+    surface.fill((*color, 255 if active else 128), (5, 5, GRID_SIZE - 10, GRID_SIZE - 10))
+    charge_symbol = '+' if charge_type == ChargeType.POSITIVE else '-'
+    text = render_text(charge_symbol, 30, WHITE if active else (200, 200, 200))
+    surface.blit(text, (GRID_SIZE//2 - 5, GRID_SIZE//2 - 10))
+
+# Nomes dos sprites no atlas
+ENEMY_SPRITES = {charge: f"enemy_{charge.name.lower()}" for charge in ChargeType}
+POWERUP_SPRITES = {kind: f"powerup_{kind.name.lower()}" for kind in PowerUpType}
+CHARGE_SPRITES = {(charge, active): f"charge_{charge.name.lower()}_{int(active)}" 
+                  for charge in (ChargeType.POSITIVE, ChargeType.NEGATIVE) for active in (False, True)}
+
+# Mude ao alterar o desenho dos sprites, para invalidar o atlas em disco
+ATLAS_VERSION = 1
+
+def build_atlases():
+    # Entidades opacas em um atlas com cor chave; cargas colocadas (translúcidas) em outro
+    sprites = [('player', paint_player)]
+    sprites += [(name, lambda s, c=charge: paint_enemy(s, c)) for charge, name in ENEMY_SPRITES.items()]
+    sprites += [(name, lambda s, k=kind: paint_powerup(s, k)) for kind, name in POWERUP_SPRITES.items()]
+    charges = [(name, lambda s, c=key: paint_charge(s, *c)) for key, name in CHARGE_SPRITES.items()]
+    key = (ATLAS_VERSION, GRID_SIZE, pygame.version.ver, pygame.font.get_default_font())
+    return Atlas(GRID_SIZE, sprites, key, alpha=False), Atlas(GRID_SIZE, charges, key)
+
+# Montados no primeiro desenho, depois que a janela já existe
+atlas_cache = {'sprites': None, 'charges': None}
+
+def get_atlas(name='sprites'):
+    atlas = atlas_cache[name]
+    if atlas is None:
+        atlas_cache['sprites'], atlas_cache['charges'] = build_atlases()
+        atlas = atlas_cache[name]
+    return atlas
+
+# Funções de desenho das entidades da simulação
+# pos é o canto da célula na tela (interpolado entre dois ticks); sem ele,
+# a entidade é desenhada na célula atual
+def draw_player(screen, player, pos=None):
+    get_atlas().blit(screen, 'player', 
+                     pos or (player.x * GRID_SIZE - camera.x, player.y * GRID_SIZE - camera.y))
+    
+    # Desenha cargas colocadas
+    atlas = get_atlas('charges')
+    for charge in player.placed_charges:
+        left = charge.x * GRID_SIZE - camera.x
+        top = charge.y * GRID_SIZE - camera.y
+        atlas.blit(screen, CHARGE_SPRITES[charge.type, charge.active], (left, top))
         
-        font = pygame.font.SysFont(None, 30)
-        text = font.render(symbol, True, BLACK)
-        screen.blit(text, (self.x * GRID_SIZE + GRID_SIZE//2 - 10, 
-                          self.y * GRID_SIZE + GRID_SIZE//2 - 10))
-
-# Função para criar um nível
-def create_level(level_num):
-    grid = [[' ' for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-    enemies = []
-    powerups = []
+        # Se estiver ativa, desenha o campo elétrico
+        if charge.active:
+            color = RED if charge.type == ChargeType.POSITIVE else BLUE
+            radius = int(GRID_SIZE * player.field_radius)
+            alpha = max(0, min(255, charge.activation_timer * 4))
+            s = field_surface(color, radius, alpha//3)
+            screen.blit(s, (left + GRID_SIZE//2 - radius, top + GRID_SIZE//2 - radius))
     
-    # Parede externa
-    for x in range(GRID_WIDTH):
-        grid[0][x] = 'W'
-        grid[GRID_HEIGHT-1][x] = 'W'
-    for y in range(GRID_HEIGHT):
-        grid[y][0] = 'W'
-        grid[y][GRID_WIDTH-1] = 'W'
-    
-    # Adiciona algumas paredes internas
-    for _ in range(5 + level_num):
-        x = random.randint(1, GRID_WIDTH-2)
-        y = random.randint(1, GRID_HEIGHT-2)
-        grid[y][x] = 'W'
-    
-    # Adiciona inimigos
-    for _ in range(2 + level_num * 2):
-        x = random.randint(1, GRID_WIDTH-2)
-        y = random.randint(1, GRID_HEIGHT-2)
-        if grid[y][x] == ' ':
-            # 50% chance de carga positiva, 30% negativa, 20% dipolo
-            charge_type = random.choices(
-                [ChargeType.POSITIVE, ChargeType.NEGATIVE, ChargeType.DIPOLE],
-                weights=[5, 3, 2]
-            )[0]
-            enemies.append(Enemy(x, y, charge_type))
-    
-    # Adiciona power-ups (apenas um de campo ou carga extra, e raramente vida extra)
-    powerup_types = []
-    
-    # Escolhe entre intensidade de campo ou carga extra
-    main_powerup = random.choice([PowerUpType.FIELD_STRENGTH, PowerUpType.EXTRA_CHARGE])
-    powerup_types.append(main_powerup)
-    
-    # 20% chance de aparecer uma vida extra
-    if random.random() < 0.2:
-        powerup_types.append(PowerUpType.EXTRA_LIFE)
-    
-    for powerup_type in powerup_types:
-        placed = False
-        attempts = 0
-        while not placed and attempts < 100:
-            x = random.randint(1, GRID_WIDTH-2)
-            y = random.randint(1, GRID_HEIGHT-2)
-            if grid[y][x] == ' ':
-                powerups.append(PowerUp(x, y, powerup_type))
-                placed = True
-            attempts += 1
-    
-    # Posição inicial do jogador
-    player_x, player_y = 1, 1
-    while grid[player_y][player_x] != ' ':
-        player_x += 1
-        if player_x >= GRID_WIDTH-1:
-            player_x = 1
-            player_y += 1
-    
-    return grid, player_x, player_y, enemies, powerups
+    # Desenha mensagem se houver
+    if player.message_timer > 0:
+        text = render_text(player.message, 36, WHITE)
+        text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 30))
+        screen.blit(text, text_rect)
+
+def draw_enemy(screen, enemy, pos=None):
+    get_atlas().blit(screen, ENEMY_SPRITES[enemy.charge], 
+                     pos or (enemy.x * GRID_SIZE - camera.x, enemy.y * GRID_SIZE - camera.y))
+
+def draw_powerup(screen, powerup):
+    if not powerup.active:
+        return
+    get_atlas().blit(screen, POWERUP_SPRITES[powerup.type], 
+                     (powerup.x * GRID_SIZE - camera.x, powerup.y * GRID_SIZE - camera.y))
 
 # Função para desenhar o grid
-def draw_grid(grid):
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
+def draw_grid(grid, surface=None):
+    if surface is None:
+        surface = screen
+    if camera.scrolls(grid):
+        draw_grid_chunks(grid, surface)
+        return
+    for y in range(grid.height):
+        for x in range(grid.width):
             rect = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            pygame.draw.rect(screen, WHITE, rect, 1)
+            pygame.draw.rect(surface, WHITE, rect, 1)
             
-            if grid[y][x] == 'W':  # Parede
-                pygame.draw.rect(screen, GRAY, rect)
+            if grid.walls[y * grid.width + x]:  # Parede
+                pygame.draw.rect(surface, GRAY, rect)
+
+# Fundo de tabuleiros maiores que a tela, em blocos de CHUNK_CELLS x
+# CHUNK_CELLS células desenhados quando aparecem na tela pela primeira vez.
+# Só os blocos visíveis são desenhados a cada frame, então o custo depende
+# do tamanho da tela e não do tabuleiro.
+CHUNK_CELLS = 8
+CHUNK_PIXELS = CHUNK_CELLS * GRID_SIZE
+chunk_cache = SurfaceCache(max_bytes=64 * CHUNK_PIXELS * CHUNK_PIXELS * 4, alpha=False)
+
+def grid_chunk(grid, cx, cy):
+    def build():
+        chunk = pygame.Surface((CHUNK_PIXELS, CHUNK_PIXELS))
+        chunk.fill(BLACK)
+        for y in range(cy * CHUNK_CELLS, min(grid.height, (cy + 1) * CHUNK_CELLS)):
+            row = y * grid.width
+            for x in range(cx * CHUNK_CELLS, min(grid.width, (cx + 1) * CHUNK_CELLS)):
+                rect = pygame.Rect((x - cx * CHUNK_CELLS) * GRID_SIZE, 
+                                   (y - cy * CHUNK_CELLS) * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+                pygame.draw.rect(chunk, WHITE, rect, 1)
+                if grid.walls[row + x]:  # Parede
+                    pygame.draw.rect(chunk, GRAY, rect)
+        return chunk
+    return chunk_cache.get((grid, cx, cy), build)
+
+def draw_grid_chunks(grid, surface):
+    x0, y0, x1, y1 = camera.visible_cells(grid)
+    for cy in range(y0 // CHUNK_CELLS, (y1 - 1) // CHUNK_CELLS + 1):
+        for cx in range(x0 // CHUNK_CELLS, (x1 - 1) // CHUNK_CELLS + 1):
+            surface.blit(grid_chunk(grid, cx, cy), 
+                         (cx * CHUNK_PIXELS - camera.x, cy * CHUNK_PIXELS - camera.y))
+
+# Inimigos e power-ups dentro da tela, consultados pelo índice de ocupação
+# (ou pelas arrays do backend NumPy) em vez de percorrer todas as entidades
+def visible_entities(sim):
+    grid = sim.grid
+    if not camera.scrolls(grid):
+        return sim.powerups, sim.enemies
+    x0, y0, x1, y1 = camera.visible_cells(grid)
+    powerups = []
+    enemies = []
+    for y in range(y0, y1):
+        for x in range(x0, x1):
+            powerups.extend(grid.powerups.at(x, y))
+            if sim.swarm is None:
+                enemies.extend(grid.enemies.at(x, y))
+    if sim.swarm is not None:
+        enemies = sim.swarm.views_in(x0, y0, x1, y1)
+    return powerups, enemies
+
+# Linhas de campo e equipotenciais das cargas colocadas (tecla F2). A
+# geometria (linhas_campo.py) só é refeita quando as cargas mudam; ela é
+# desenhada em blocos transparentes do tabuleiro, como o fundo em
+# grid_chunk, que só são refeitos quando a geometria muda. Rolar a câmera
+# só muda onde os blocos visíveis são copiados.
+FIELD_LINE_COLOR = (255, 255, 255, 140)
+EQUIPOTENTIAL_COLORS = {True: (255, 90, 90, 160), False: (90, 140, 255, 160)}  # V > 0, V < 0
+ARROW_SIZE = 5
+
+# Borda desenhada em volta de cada bloco das linhas de campo. Nenhum traço
+# da geometria passa de uma célula, então todo traço que toca o bloco cabe
+# inteiro na borda e o pygame não precisa recortá-lo: recortar muda os
+# pixels da reta e deixaria degraus na emenda entre blocos.
+FIELD_LINE_MARGIN = GRID_SIZE
+
+class FieldLines:
+    def __init__(self):
+        self.enabled = False
+        self.geometry = None
+        self.version = None
+        self.contours = []  # (cor, segmentos, cantos mínimos, cantos máximos) em pixels do tabuleiro
+        self.lines = []  # (pontos, seta, canto mínimo, canto máximo)
+        self.chunks = SurfaceCache(max_bytes=64 * CHUNK_PIXELS * CHUNK_PIXELS * 4)
+        self.scratch = None  # Bloco com a borda, onde os traços são desenhados
+
+    def toggle(self):
+        if not self.enabled:
+            try:
+                import linhas_campo
+            except ImportError:
+                print("As linhas de campo precisam de NumPy")
+                return
+        self.enabled = not self.enabled
+
+    def draw(self, sim, surface=None):
+        if not self.enabled:
+            return
+        if surface is None:
+            surface = screen
+        grid = sim.grid
+        with profiler.span('field_lines'):
+            geometry = self.geometry
+            if geometry is None or (geometry.engine.width, geometry.engine.height) != (grid.width, grid.height):
+                from linhas_campo import FieldGeometry
+                geometry = self.geometry = FieldGeometry(grid.width, grid.height)
+                self.version = None
+            geometry.update(sim.player.placed_charges)
+            if geometry.version != self.version:
+                self.version = geometry.version
+                self.prepare(geometry)
+                self.chunks.clear()
+            x0, y0, x1, y1 = camera.visible_cells(grid)
+            for cy in range(y0 // CHUNK_CELLS, (y1 - 1) // CHUNK_CELLS + 1):
+                for cx in range(x0 // CHUNK_CELLS, (x1 - 1) // CHUNK_CELLS + 1):
+                    chunk = self.chunks.get((cx, cy), lambda: self.render(cx, cy))
+                    surface.blit(chunk, (cx * CHUNK_PIXELS - camera.x, cy * CHUNK_PIXELS - camera.y))
+
+    def prepare(self, geometry):
+        # Coordenadas de célula (centro da célula) para pixels do tabuleiro,
+        # com a caixa de cada traço para escolher o que cai em cada bloco.
+        # Tudo é arredondado para baixo aqui: o pygame trunca coordenadas
+        # fracionárias, e truncar depois de descontar a origem do bloco
+        # deslocaria um pixel os pontos à esquerda ou acima dele.
+        center = GRID_SIZE // 2
+        self.contours = []
+        for level, segments in geometry.contours:
+            points = (segments * GRID_SIZE + center) // 1
+            self.contours.append((EQUIPOTENTIAL_COLORS[level > 0], points,
+                                  points.min(axis=1), points.max(axis=1)))
+
+        self.lines = []
+        for line in geometry.lines:
+            if len(line) < 3:
+                continue
+            points = line * GRID_SIZE + center
+
+            # Seta no meio da linha, no sentido do campo
+            middle = len(points) // 2
+            (x, y), (nx, ny) = points[middle].tolist(), points[middle + 1].tolist()
+            dx, dy = nx - x, ny - y
+            norm = max((dx * dx + dy * dy) ** 0.5, 1e-6)
+            dx, dy = dx / norm * ARROW_SIZE, dy / norm * ARROW_SIZE
+            arrow = [(nx + dx, ny + dy), (nx - dx - dy, ny - dy + dx), (nx - dx + dy, ny - dy - dx)]
+            arrow = [(x // 1, y // 1) for x, y in arrow]
+            points //= 1
+
+            low, high = points.min(axis=0).tolist(), points.max(axis=0).tolist()
+            low = [min([low[i]] + [p[i] for p in arrow]) for i in (0, 1)]
+            high = [max([high[i]] + [p[i] for p in arrow]) for i in (0, 1)]
+            self.lines.append((points, arrow, low, high))
+
+    def render(self, cx, cy):
+        size = CHUNK_PIXELS + 2 * FIELD_LINE_MARGIN
+        if self.scratch is None:
+            self.scratch = pygame.Surface((size, size), pygame.SRCALPHA)
+        scratch = self.scratch
+        scratch.fill((0, 0, 0, 0))
+        left = cx * CHUNK_PIXELS - FIELD_LINE_MARGIN
+        top = cy * CHUNK_PIXELS - FIELD_LINE_MARGIN
+        # Traços que tocam o bloco, com um pixel de folga
+        low = (left + FIELD_LINE_MARGIN - 1, top + FIELD_LINE_MARGIN - 1)
+        high = (left + FIELD_LINE_MARGIN + CHUNK_PIXELS + 1, top + FIELD_LINE_MARGIN + CHUNK_PIXELS + 1)
+
+        for color, points, starts, ends in self.contours:
+            inside = ((ends >= low) & (starts < high)).all(axis=1)
+            for start, end in (points[inside] - (left, top)).tolist():
+                pygame.draw.line(scratch, color, start, end)
+
+        for points, arrow, start, end in self.lines:
+            if end[0] < low[0] or end[1] < low[1] or start[0] >= high[0] or start[1] >= high[1]:
+                continue
+            pygame.draw.lines(scratch, FIELD_LINE_COLOR, False, (points - (left, top)).tolist())
+            pygame.draw.polygon(scratch, FIELD_LINE_COLOR, [(x - left, y - top) for x, y in arrow])
+        return scratch.subsurface((FIELD_LINE_MARGIN, FIELD_LINE_MARGIN, CHUNK_PIXELS, CHUNK_PIXELS)).copy()
+
+field_lines = FieldLines()
+
+# Partículas dos eventos da partida (efeitos.py, precisa de NumPy), criadas
+# quando a primeira partida começa para o menu não esperar o NumPy. Sem
+# NumPy o jogo segue sem elas; F4 liga/desliga.
+effects = None
+
+def load_effects():
+    global effects
+    if effects is None:
+        try:
+            from efeitos import Effects
+        except ImportError:
+            return None
+        effects = Effects(SCREEN_WIDTH, SCREEN_HEIGHT)
+    effects.clear()
+    return effects
+
+# Linhas do HUD já renderizadas, refeitas só quando algum valor muda
+hud_cache = {'key': None, 'lines': []}
 
 # Função para mostrar HUD
 def draw_hud(player, level):
-    font = pygame.font.SysFont(None, 36)
+    charges_left = player.max_charges - len(player.placed_charges)
+    key = (player.score, player.lives, level, charges_left, player.max_charges, player.field_radius)
+    
+    if key != hud_cache['key']:
+        hud_cache['key'] = key
+        hud_cache['lines'] = [
+            # Pontuação
+            (render_text(f"Pontos: {player.score}", 36, WHITE), (10, 10)),
+            # Vidas
+            (render_text(f"Vidas: {player.lives}", 36, WHITE), (10, 50)),
+            # Nível
+            (render_text(f"Nível: {level}", 36, WHITE), (10, 90)),
+            # Cargas disponíveis
+            (render_text(f"Cargas: {charges_left}/{player.max_charges}", 36, WHITE), 
+             (SCREEN_WIDTH - 200, 10)),
+            # Força do campo
+            (render_text(f"Raio: {player.field_radius:.1f}", 36, WHITE), (SCREEN_WIDTH - 200, 50)),
+        ]
+    
+    for text, pos in hud_cache['lines']:
+        screen.blit(text, pos)
+
+# Painel do profiler, refeito a cada OVERLAY_REFRESH frames
+OVERLAY_REFRESH = 15
+OVERLAY_POS = (250, 10)
+overlay_cache = {'surface': None, 'age': 0}
+
+def draw_profiler_overlay():
+    record = profiler.last()
+    if record is None:
+        return
+    
+    overlay_cache['age'] -= 1
+    if overlay_cache['surface'] is None or overlay_cache['age'] <= 0:
+        overlay_cache['age'] = OVERLAY_REFRESH
+        font = get_font(20)
+        lines = [f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}" 
+                 for name, value in record.items()]
+        lines.append(f"fps: {clock.get_fps():.0f}")
+        surface = pygame.Surface((220, 16 * len(lines) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            surface.blit(font.render(line, True, YELLOW), (6, 4 + 16 * i))
+        overlay_cache['surface'] = surface
+    
+    screen.blit(overlay_cache['surface'], OVERLAY_POS)
+
+# Desenha todas as entidades da partida e o HUD
+def draw_entities(sim):
+    with profiler.span('draw_entities'):
+        powerups, enemies = visible_entities(sim)
+        for powerup in powerups:
+            draw_powerup(screen, powerup)
+        for enemy in enemies:
+            draw_enemy(screen, enemy, interpolation.enemy_pos(sim, enemy))
+        x, y = interpolation.player_pos(sim)
+        draw_player(screen, sim.player, (x - camera.x, y - camera.y))
+    if effects:
+        with profiler.span('effects'):
+            effects.draw(screen, camera.x, camera.y)
+    with profiler.span('draw_hud'):
+        draw_hud(sim.player, sim.level)
+    if profiler.enabled:
+        draw_profiler_overlay()
+    else:
+        overlay_cache['surface'] = None
+
+# Renderização completa: limpa a tela e redesenha tudo a cada frame
+def render_full(sim):
+    with profiler.span('draw_grid'):
+        screen.fill(BLACK)
+        draw_grid(sim.grid)
+    field_lines.draw(sim)
+    draw_entities(sim)
+    with profiler.span('flip'):
+        pygame.display.flip()
+
+# Áreas da tela tocadas pelas entidades e pelo HUD no frame atual
+def collect_dirty_rects(sim):
+    player = sim.player
+    x, y = interpolation.player_pos(sim)
+    rects = [pygame.Rect(x - camera.x, y - camera.y, GRID_SIZE, GRID_SIZE)]
+    for entity in sim.enemies:
+        rects.append(pygame.Rect(interpolation.enemy_pos(sim, entity), (GRID_SIZE, GRID_SIZE)))
+    for entity in sim.powerups:
+        rects.append(pygame.Rect(entity.x * GRID_SIZE - camera.x, entity.y * GRID_SIZE - camera.y, GRID_SIZE, GRID_SIZE))
     
-    # Pontuação
-    score_text = font.render(f"Pontos: {player.score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
+    # Cargas colocadas e seus campos elétricos ativos
+    radius = int(GRID_SIZE * player.field_radius)
+    for charge in player.placed_charges:
+        rects.append(pygame.Rect(charge.x * GRID_SIZE - camera.x, charge.y * GRID_SIZE - camera.y, GRID_SIZE, GRID_SIZE))
+        if charge.active:
+            rects.append(pygame.Rect(charge.x * GRID_SIZE - camera.x + GRID_SIZE//2 - radius, 
+                                     charge.y * GRID_SIZE - camera.y + GRID_SIZE//2 - radius, 
+                                     radius*2, radius*2))
     
-    # Vidas
-    lives_text = font.render(f"Vidas: {player.lives}", True, WHITE)
-    screen.blit(lives_text, (10, 50))
+    # Partículas (cópia: a caixa delas muda no próximo frame)
+    if effects and effects.rect:
+        rects.append(effects.rect.copy())
     
-    # Nível
-    level_text = font.render(f"Nível: {level}", True, WHITE)
-    screen.blit(level_text, (10, 90))
+    # Mensagem e HUD
+    if player.message_timer > 0:
+        text = render_text(player.message, 36, WHITE)
+        rects.append(text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 30)))
+    for text, pos in hud_cache['lines']:
+        rects.append(text.get_rect(topleft=pos))
+    if overlay_cache['surface'] is not None:
+        rects.append(overlay_cache['surface'].get_rect(topleft=OVERLAY_POS))
     
-    # Cargas disponíveis
-    charges_text = font.render(
-        f"Cargas: {player.max_charges - len(player.placed_charges)}/{player.max_charges}", 
-        True, WHITE)
-    screen.blit(charges_text, (SCREEN_WIDTH - 200, 10))
+    screen_rect = screen.get_rect()
+    return [rect.clip(screen_rect) for rect in rects]
+
+# Renderização por dirty rects: o grid e as paredes ficam pré-desenhados em
+# uma superfície de fundo (refeita só quando o nível muda) e a cada frame só
+# as áreas tocadas no frame anterior e no atual são restauradas e enviadas
+class DirtyRenderer:
+    def __init__(self):
+        self.background = None
+        self.grid = None
+        self.previous = []
     
-    # Força do campo
-    strength_text = font.render(f"Raio: {player.field_radius:.1f}", True, WHITE)
-    screen.blit(strength_text, (SCREEN_WIDTH - 200, 50))
+    def render(self, sim):
+        if sim.grid is not self.grid:
+            # Novo nível: refaz o fundo e redesenha a tela inteira
+            self.grid = sim.grid
+            self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.background.fill(BLACK)
+            draw_grid(sim.grid, self.background)
+            screen.blit(self.background, (0, 0))
+            draw_entities(sim)
+            self.previous = collect_dirty_rects(sim)
+            pygame.display.flip()
+            return
+        
+        # Apaga o que foi desenhado no frame anterior
+        with profiler.span('draw_grid'):
+            for rect in self.previous:
+                screen.blit(self.background, rect, rect)
+        
+        draw_entities(sim)
+        current = collect_dirty_rects(sim)
+        with profiler.span('flip'):
+            pygame.display.update(self.previous + current)
+        self.previous = current
 
 # Função para criar menu
-def show_menu():
-    menu_music.play(-1)  # Tocar em loop
+def show_menu(startup_time=False):
+    audio.play_music(MENU_MUSIC)  # Tocar em loop
     blink_timer = 0
     waiting = True
     
@@ -461,28 +638,36 @@ def show_menu():
                     pygame.quit()
                     sys.exit()
         
-        # Desenhar menu
-        screen.blit(menu_image, (0, 0))
+        # Desenhar menu (fundo preto até a imagem terminar de carregar)
+        menu_image = assets.display_image(MENU_IMAGE, MENU_SIZE, wait=False)
+        if menu_image is None:
+            screen.fill(BLACK)
+        else:
+            screen.blit(menu_image, (0, 0))
         
         # Texto piscante
         blink_timer += 1
         if blink_timer < 30:
-            font = pygame.font.SysFont(None, 72)
-            text = font.render("Pressione ENTER", True, WHITE)
+            text = render_text("Pressione ENTER", 72, WHITE)
             text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100))
             screen.blit(text, text_rect)
         elif blink_timer > 60:
             blink_timer = 0
         
         pygame.display.flip()
+        if startup_time:
+            # Mede só a partida a frio: sai logo após o primeiro frame do menu
+            print(f"Primeiro frame do menu em {(time.perf_counter() - START_TIME) * 1000:.1f} ms")
+            pygame.quit()
+            sys.exit()
         clock.tick(FPS)
     
-    menu_music.stop()
+    audio.stop_music()
     return GameState.PLAYING
 
 # Função para mostrar nível completo
 def show_level_complete(level, score):
-    game_music.stop()
+    audio.pause_music()
     blink_timer = 0
     waiting = True
     
@@ -499,18 +684,16 @@ def show_level_complete(level, score):
                     sys.exit()
         
         screen.fill(BLACK)
-        font = pygame.font.SysFont(None, 72)
-        title = font.render(f"Fase {level} Completa!", True, GREEN)
+        title = render_text(f"Fase {level} Completa!", 72, GREEN)
         screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, SCREEN_HEIGHT//2 - 50))
         
-        font = pygame.font.SysFont(None, 48)
-        points = font.render(f"Pontuação: {score}", True, WHITE)
+        points = render_text(f"Pontuação: {score}", 48, WHITE)
         screen.blit(points, (SCREEN_WIDTH//2 - points.get_width()//2, SCREEN_HEIGHT//2 + 20))
         
         # Texto piscante
         blink_timer += 1
         if blink_timer < 30:
-            text = font.render("Pressione ENTER para continuar", True, YELLOW)
+            text = render_text("Pressione ENTER para continuar", 48, YELLOW)
             text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100))
             screen.blit(text, text_rect)
         elif blink_timer > 60:
@@ -519,12 +702,12 @@ def show_level_complete(level, score):
         pygame.display.flip()
         clock.tick(FPS)
     
-    game_music.play(-1)  # Retomar música do jogo
+    audio.play_music(GAME_MUSIC)  # Retomar música do jogo de onde parou
     return GameState.PLAYING
 
 # Função para mostrar game over
 def show_game_over(score):
-    game_music.stop()
+    audio.stop_music()
     blink_timer = 0
     waiting = True
     
@@ -541,18 +724,16 @@ def show_game_over(score):
                     sys.exit()
         
         screen.fill(BLACK)
-        font = pygame.font.SysFont(None, 72)
-        title = font.render("GAME OVER", True, RED)
+        title = render_text("GAME OVER", 72, RED)
         screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, SCREEN_HEIGHT//2 - 50))
         
-        font = pygame.font.SysFont(None, 48)
-        points = font.render(f"Pontuação Final: {score}", True, WHITE)
+        points = render_text(f"Pontuação Final: {score}", 48, WHITE)
         screen.blit(points, (SCREEN_WIDTH//2 - points.get_width()//2, SCREEN_HEIGHT//2 + 20))
         
         # Texto piscante
         blink_timer += 1
         if blink_timer < 30:
-            text = font.render("Pressione ENTER para recomeçar", True, YELLOW)
+            text = render_text("Pressione ENTER para recomeçar", 48, YELLOW)
             text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100))
             screen.blit(text, text_rect)
         elif blink_timer > 60:
@@ -564,118 +745,382 @@ def show_game_over(score):
     return GameState.MENU
 
 
-def main():
+# Laço de passo fixo: cada tick da simulação vale sempre TICK_SECONDS, não
+# importa quantos frames a máquina consiga desenhar. Os timers da simulação
+# contam ticks, então a velocidade do jogo é a mesma em qualquer PC.
+TICK_SECONDS = 1 / FPS
+
+# Ticks no máximo por frame; em um frame mais lento que isso o atraso que
+# sobra é descartado, para o jogo não entrar em espiral tentando alcançá-lo
+MAX_CATCH_UP = 5
+
+# Salvamento rápido (F5 salva, F9 carrega) e volta no tempo (Backspace volta
+# REWIND_STEP segundos, até REWIND_SECONDS atrás); veja estado.py
+QUICKSAVE_PATH = "quicksave.ebs"
+REWIND_SECONDS = 10
+REWIND_STEP = 1
+
+def quickload(sim):
+    from estado import SnapshotError, load_simulation, restore
+    try:
+        with open(QUICKSAVE_PATH, "rb") as f:
+            data = f.read()
+        load_simulation(data)  # Confere o arquivo inteiro antes de mexer na partida
+    except (OSError, SnapshotError):
+        sim.player.show_message("Nenhum jogo salvo")
+        return False
+    restore(sim, data)
+    sim.player.show_message("Jogo carregado")
+    return True
+
+# Recria a janela com VSync (no pygame 2 ele exige o modo SCALED)
+def set_vsync():
+    global screen
+    try:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+    except pygame.error:
+        print("VSync não suportado neste sistema; usando o limite de FPS")
+        return False
+    return True
+
+def main(dirty_rects=DIRTY_RECTS, backend='objects', stress=0, seed=None, record=None, 
+         profile=None, board=(GRID_WIDTH, GRID_HEIGHT), max_fps=FPS, vsync=False, 
+         startup_time=False, field=None, show_field_lines=False, ai=False, generator='classic', 
+         mute=False):
     # Estado inicial do jogo
     game_state = GameState.MENU
-    current_level = 1
-    player = None
-    grid, enemies, powerups = [], [], []
+    sim = None
+    renderer = DirtyRenderer() if dirty_rects else None
+    recorder = None
+    rewind = None  # Criado na primeira partida, com estado.py
+    games = 0
+    frames = 0
+    if profile:
+        profiler.enable()
+    if vsync and set_vsync():
+        max_fps = 0  # O flip já espera o monitor
+    if show_field_lines:
+        field_lines.toggle()
+    audio.start(mute)
+    
+    # Tempo ainda não simulado e ações esperando o próximo tick
+    accumulator = 0.0
+    last_time = time.perf_counter()
+    pending = []
     
     # Loop principal do jogo
     running = True
-    while running:
-        # 1. Estado: MENU
-        if game_state == GameState.MENU:
-            # Mostra o menu e espera input
-            game_state = show_menu()
-            
-            # Prepara novo jogo
-            current_level = 1
-            grid, player_x, player_y, enemies, powerups = create_level(current_level)
-            player = Player(player_x, player_y)
-            game_music.play(-1)  # Inicia música do jogo em loop
-        
-        # 2. Estado: JOGO EM ANDAMENTO
-        elif game_state == GameState.PLAYING:
-            # Processa eventos
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+    try:
+        while running:
+            # 1. Estado: MENU
+            if game_state == GameState.MENU:
+                # Mostra o menu e espera input
+                game_state = show_menu(startup_time)
                 
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        game_state = GameState.MENU
-                        game_music.stop()
-                    
-                    # Movimento e ações do jogador
-                    if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        player.move(-1, 0, grid)
-                    elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        player.move(1, 0, grid)
-                    elif event.key == pygame.K_UP or event.key == pygame.K_w:
-                        player.move(0, -1, grid)
-                    elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        player.move(0, 1, grid)
-                    elif event.key == pygame.K_p:
-                        player.place_charge(ChargeType.POSITIVE)
-                    elif event.key == pygame.K_n:
-                        player.place_charge(ChargeType.NEGATIVE)
-            
-            # Atualiza lógica do jogo
-            player.update()
-            
-            # Atualiza inimigos
-            for enemy in enemies[:]:
-                enemy.update(player, grid)
-                if enemy.health <= 0:
-                    player.score += 100 if enemy.charge != ChargeType.DIPOLE else 150
-                    enemies.remove(enemy)
+                # Prepara novo jogo
+                sim = new_simulation(1, backend, seed, stress, board, field, ai, generator)
+                sim.prefetch_next_level()
+                if record:
+                    from replay import ReplayWriter, numbered_path
+                    games += 1
+                    recorder = ReplayWriter(numbered_path(record, games), sim, stress)
+                audio.play_music(GAME_MUSIC)  # Inicia música do jogo em loop
+                if rewind is None:
+                    from estado import Rewind
+                    rewind = Rewind(REWIND_SECONDS)
+                rewind.clear()
+                load_effects()
                 
-                # Verifica colisão com jogador
-                if (enemy.x == player.x and enemy.y == player.y and player.invincible == 0):
-                    player.lives -= 1
-                    player.invincible = 60
-                    if player.lives <= 0:
-                        game_state = GameState.GAME_OVER
-            
-            # Verifica power-ups
-            for powerup in powerups[:]:
-                if powerup.active and powerup.x == player.x and powerup.y == player.y:
-                    powerup.active = False
-                    message = powerup.apply(player)
-                    player.show_message(message + "1")
-                    player.score += 50
-                    powerups.remove(powerup)
+                # O tempo passado no menu não conta para a simulação
+                accumulator = 0.0
+                last_time = time.perf_counter()
+                pending = []
+                interpolation.reset()
             
-            # Verifica se completou o nível
-            if len(enemies) == 0:
-                player.score += 500 * current_level
-                game_state = GameState.LEVEL_COMPLETE
+            # 2. Estado: JOGO EM ANDAMENTO
+            elif game_state == GameState.PLAYING:
+                profiler.begin_frame()
+                
+                now = time.perf_counter()
+                frame_time = min(now - last_time, MAX_CATCH_UP * TICK_SECONDS)
+                accumulator = min(accumulator + now - last_time, MAX_CATCH_UP * TICK_SECONDS)
+                last_time = now
+                
+                # Processa eventos
+                with profiler.span('events'):
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            running = False
+                        
+                        if event.type == pygame.KEYDOWN:
+                            if event.key == pygame.K_ESCAPE:
+                                game_state = GameState.MENU
+                                audio.stop_music()
+                            
+                            # F3 liga/desliga o profiler e seu painel
+                            if event.key == pygame.K_F3:
+                                profiler.toggle()
+                            
+                            # F2 liga/desliga as linhas de campo e equipotenciais
+                            if event.key == pygame.K_F2:
+                                field_lines.toggle()
+                                if renderer:
+                                    renderer.grid = None  # Redesenha a tela inteira
+                            
+                            # F4 liga/desliga as partículas
+                            if event.key == pygame.K_F4 and effects:
+                                effects.toggle()
+                            
+                            # F5 salva, F9 carrega e Backspace volta no tempo
+                            # (não durante a gravação de um replay, que só guarda ações)
+                            if event.key in (pygame.K_F5, pygame.K_F9, pygame.K_BACKSPACE):
+                                if recorder:
+                                    sim.player.show_message("Indisponível gravando replay")
+                                elif event.key == pygame.K_F5:
+                                    from estado import save
+                                    save(QUICKSAVE_PATH, sim)
+                                    sim.player.show_message("Jogo salvo")
+                                else:
+                                    if event.key == pygame.K_F9:
+                                        restored = quickload(sim)
+                                        rewind.clear()
+                                    else:
+                                        restored = rewind.back(sim, REWIND_STEP)
+                                    if restored:
+                                        sim.prefetch_next_level()
+                                        pending = []
+                                        accumulator = 0.0
+                                        interpolation.reset()
+                                        if effects:
+                                            effects.clear()
+                            
+                            # Movimento e ações do jogador
+                            if event.key in KEY_ACTIONS:
+                                pending.append(KEY_ACTIONS[event.key])
+                
+                # Atualiza lógica do jogo: quantos ticks couberem no tempo
+                # acumulado (nenhum se o frame foi mais rápido que um tick)
+                ticks = int(accumulator / TICK_SECONDS)
+                for tick in range(ticks):
+                    if tick == ticks - 1:
+                        interpolation.snapshot(sim)
+                    accumulator -= TICK_SECONDS
+                    actions, pending = pending, []
+                    if recorder:
+                        recorder.record(actions)
+                    state = sim.step(actions)
+                    for _ in sim.activated:
+                        audio.play(CHARGE_SOUND)  # Tocar som ao ativar carga
+                    if effects:
+                        effects.events(sim)
+                    if state != GameState.PLAYING:
+                        game_state = state
+                        break
+                    rewind.push(sim)
+                interpolation.alpha = min(1.0, accumulator / TICK_SECONDS)
+                audio.flush()
+                if effects:
+                    effects.update(frame_time)
+                
+                # Partida terminou: fecha o replay
+                if recorder and game_state in (GameState.MENU, GameState.GAME_OVER):
+                    recorder.close(sim)
+                    recorder = None
+                
+                # Renderização (tabuleiros com rolagem e as linhas de campo
+                # redesenham a tela toda)
+                camera.follow(sim.player, sim.grid, interpolation.player_pos(sim))
+                if renderer and not camera.scrolls(sim.grid) and not field_lines.enabled:
+                    renderer.render(sim)
+                else:
+                    render_full(sim)
+                
+                profiler.end_frame()
+                frames += 1
+                if profile and frames % profiler.frames.maxlen == 0:
+                    profiler.dump(profile)  # Salva os últimos frames periodicamente
+                clock.tick(max_fps)  # 0 = sem limite
             
-            # Renderização
-            screen.fill(BLACK)
-            draw_grid(grid)
-            for powerup in powerups:
-                powerup.draw(screen)
-            for enemy in enemies:
-                enemy.draw(screen)
-            player.draw(screen)
-            draw_hud(player, current_level)
+            # 3. Estado: NÍVEL COMPLETO
+            elif game_state == GameState.LEVEL_COMPLETE:
+                # Mostra tela de nível completo
+                game_state = show_level_complete(sim.level, sim.player.score)
+                
+                # Prepara próxima fase
+                sim.next_level()
+                sim.prefetch_next_level()
+                rewind.clear()
+                if effects:
+                    effects.clear()
+                accumulator = 0.0
+                last_time = time.perf_counter()
+                pending = []
+                interpolation.reset()
             
-            pygame.display.flip()
-            clock.tick(FPS)
+            # 4. Estado: GAME OVER
+            elif game_state == GameState.GAME_OVER:
+                # Mostra tela de game over
+                game_state = show_game_over(sim.player.score)
+                
+                # Volta para o menu (o loop recomeça)
+    finally:
+        # Fecha o replay mesmo se o jogo for encerrado no meio da partida
+        if recorder:
+            recorder.close(sim)
+        if profile:
+            profiler.dump(profile)
+
+    pygame.quit()
+    sys.exit()
+
+# Partida em rede (servidor.py): o jogo só desenha o estado que chega do
+# servidor e manda as teclas do jogador. Uma thread lê os quadros do socket
+# e os entrega por uma fila; o laço principal os aplica no espelho da
+# partida e desenha com as mesmas funções do jogo local.
+def receive_frames(sock, frames):
+    from servidor import FRAME
+    stream = sock.makefile("rb")
+    try:
+        while True:
+            header = stream.read(FRAME.size)
+            if len(header) < FRAME.size:
+                break
+            size, = FRAME.unpack(header)
+            payload = stream.read(size)
+            if len(payload) < size:
+                break
+            frames.put(payload)
+    except OSError:
+        pass
+    frames.put(None)  # Conexão encerrada
+
+def render_online(mirror):
+    screen.fill(BLACK)
+    draw_grid(mirror.grid)
+    field_lines.draw(mirror)
+    draw_entities(mirror)
+    
+    # Fim de fase e de partida aparecem por cima do tabuleiro
+    if mirror.state == GameState.LEVEL_COMPLETE:
+        title = render_text(f"Fase {mirror.level} Completa!", 72, GREEN)
+    elif mirror.state == GameState.GAME_OVER:
+        title = render_text("GAME OVER", 72, RED)
+    else:
+        title = None
+    if title:
+        screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, SCREEN_HEIGHT//2 - 50))
+    if not mirror.controls:
+        text = render_text("Assistindo", 36, YELLOW)
+        screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 10))
+    pygame.display.flip()
+
+def play_online(address, spectate=False, max_fps=FPS, mute=False):
+    from servidor import PLAY, SPECTATE, Mirror
+    host, _, port = address.rpartition(":")
+    try:
+        sock = socket.create_connection((host or "127.0.0.1", int(port)))
+    except (OSError, ValueError) as error:
+        print(f"Não foi possível conectar a {address}: {error}")
+        pygame.quit()
+        sys.exit(1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(bytes((SPECTATE if spectate else PLAY,)))
+    frames = queue.Queue()
+    threading.Thread(target=receive_frames, args=(sock, frames), daemon=True).start()
+    
+    mirror = Mirror()
+    interpolation.reset()
+    audio.start(mute)
+    audio.play_music(GAME_MUSIC)
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                if event.key == pygame.K_F2:
+                    field_lines.toggle()
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                if event.key in KEY_ACTIONS and mirror.controls:
+                    sock.sendall(bytes((KEY_ACTIONS[event.key].value,)))
         
-        # 3. Estado: NÍVEL COMPLETO
-        elif game_state == GameState.LEVEL_COMPLETE:
-            # Mostra tela de nível completo
-            game_state = show_level_complete(current_level, player.score)
-            
-            # Prepara próxima fase
-            current_level += 1
-            grid, player_x, player_y, enemies, powerups = create_level(current_level)
-            player.x = player_x
-            player.y = player_y
-            player.placed_charges = []
+        # Aplica tudo o que chegou desde o último frame
+        while True:
+            try:
+                payload = frames.get_nowait()
+            except queue.Empty:
+                break
+            if payload is None:
+                running = False
+                break
+            mirror.apply(payload)
+        for _ in mirror.activated:
+            audio.play(CHARGE_SOUND)
+        mirror.activated.clear()
+        audio.flush()
         
-        # 4. Estado: GAME OVER
-        elif game_state == GameState.GAME_OVER:
-            # Mostra tela de game over
-            game_state = show_game_over(player.score)
-            
-            # Volta para o menu (o loop recomeça)
-
+        if mirror.grid is not None:
+            profiler.begin_frame()
+            camera.follow(mirror.player, mirror.grid)
+            render_online(mirror)
+            profiler.end_frame()
+        clock.tick(max_fps)
+    
+    sock.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="EletroBlast")
+    parser.add_argument("--dirty-rects", action="store_true", 
+                        help="pré-desenha o grid e atualiza só as áreas alteradas da tela")
+    parser.add_argument("--backend", choices=['objects', 'numpy'], default='objects', 
+                        help="backend dos inimigos (numpy atualiza todos em lote)")
+    parser.add_argument("--stress", type=int, default=0, metavar="N", 
+                        help="começa em uma fase de estresse com N inimigos")
+    parser.add_argument("--seed", type=parse_seed, 
+                        help="semente da partida (a mesma semente gera os mesmos níveis)")
+    parser.add_argument("--record", metavar="ARQUIVO", 
+                        help="grava cada partida em um replay (veja replay.py)")
+    parser.add_argument("--profile", metavar="ARQUIVO", 
+                        help="liga o profiler e salva os últimos frames em CSV ou JSON")
+    parser.add_argument("--fps", type=int, default=FPS, 
+                        help="limite de frames desenhados por segundo (0 = sem limite); "
+                             f"a simulação roda sempre a {FPS} ticks/s")
+    parser.add_argument("--vsync", action="store_true", 
+                        help="sincroniza os frames com o monitor")
+    parser.add_argument("--field", choices=['charges', 'all'], 
+                        help="inimigos andam pelo campo elétrico resultante das cargas "
+                             "colocadas (charges) ou também dos inimigos (all); precisa de NumPy")
+    parser.add_argument("--ai", action="store_true", 
+                        help="inimigos perseguem o jogador e fogem dos campos de sinal oposto")
+    parser.add_argument("--generator", choices=GENERATORS, default='classic', 
+                        help="gerador de níveis: checked garante que tudo é alcançável, segue um "
+                             "orçamento de dificuldade e gera a próxima fase em segundo plano")
+    parser.add_argument("--field-lines", action="store_true", 
+                        help="começa mostrando as linhas de campo e equipotenciais (F2); precisa de NumPy")
+    parser.add_argument("--startup-time", action="store_true", 
+                        help="mostra o tempo até o primeiro frame do menu e sai")
+    parser.add_argument("--board", type=parse_board, default=(GRID_WIDTH, GRID_HEIGHT), metavar="LxA", 
+                        help="tamanho do tabuleiro em células (ex.: 512x512); a câmera segue o jogador")
+    parser.add_argument("--connect", metavar="HOST:PORTA", 
+                        help="joga (ou assiste) uma partida de servidor.py")
+    parser.add_argument("--spectate", action="store_true", 
+                        help="com --connect, só assiste à partida")
+    parser.add_argument("--mute", action="store_true", 
+                        help="sem som: o mixer não é aberto")
+    args = parser.parse_args()
+    
+    if args.connect:
+        play_online(args.connect, args.spectate, args.fps, args.mute)
+    
+    main(dirty_rects=args.dirty_rects, backend=args.backend, stress=args.stress, 
+         seed=args.seed, record=args.record, profile=args.profile, board=args.board, 
+         max_fps=args.fps, vsync=args.vsync, startup_time=args.startup_time, 
+         field=args.field, show_field_lines=args.field_lines, ai=args.ai, 
+         generator=args.generator, mute=args.mute)
\ No newline at end of file
@@ -0,0 +1,229 @@
+# Linhas de campo e equipotenciais das cargas colocadas (NumPy)
+#
+# FieldGeometry mantém um FieldEngine (campo.py) só com as cargas colocadas
+# pelo jogador e, quando o conjunto de cargas muda, refaz:
+#
+# - as linhas de campo, integradas (Runge-Kutta de 2ª ordem) a partir de
+#   pontos em volta de cada carga, todas ao mesmo tempo em arrays: saem das
+#   positivas no sentido de E e das negativas no sentido contrário, e param
+#   ao chegar perto de outra carga, sair do tabuleiro ou o campo sumir;
+# - as curvas equipotenciais, por marching squares vetorizado sobre o
+#   potencial V, só na região em volta das cargas (além do raio de corte
+#   do motor o potencial é zero).
+#
+# Enquanto as cargas não mudam, a geometria (em coordenadas de célula,
+# com o centro da célula (x, y) em (x, y)) é reaproveitada.
+
+import time
+
+import numpy as np
+
+from campo import FieldEngine
+
+LINES_PER_CHARGE = 12
+LINE_STEP = 0.4  # Passo da integração, em células
+LINE_MAX_STEPS = 100
+LINE_START = 0.3  # Distância da carga onde a linha começa
+LINE_STOP = 0.4  # Distância de outra carga onde a linha termina
+
+# Níveis de potencial das curvas (V = 1/r - 1/R de uma carga unitária)
+EQUIPOTENTIALS = (0.05, 0.1, 0.2, 0.35, 0.6)
+
+def sample(engine, pos):
+    # Interpolação bilinear de (Ex, Ey) em posições (n, 2) fracionárias de célula
+    c = engine.cutoff
+    pos = np.clip(pos, -1, (engine.width, engine.height)) + c
+    cell = pos.astype(np.intp)
+    t = pos - cell
+    tx = t[:, :1]
+    ty = t[:, 1:]
+    stride = engine.padded.shape[1]
+    index = cell[:, 1] * stride + cell[:, 0]
+    corners = engine.padded.reshape(-1, 3)[np.stack([index, index + 1, index + stride,
+                                                     index + stride + 1]), :2]
+    top = corners[0] + (corners[1] - corners[0]) * tx
+    bottom = corners[2] + (corners[3] - corners[2]) * tx
+    return top + (bottom - top) * ty
+
+def trace_field_lines(engine, sources):
+    # Gerador: avança um passo da integração por iteração e, no fim, devolve
+    # (pelo return) uma lista de arrays (n, 2) de pontos, uma por linha, na
+    # ordem do sentido do campo.
+    # sources: lista de (x, y, q) das cargas.
+    sources = [source for source in sources if source[2]]
+    if not sources:
+        return []
+    sources = np.array(sources, dtype=np.float64)
+    centers = sources[:, :2]
+    angles = np.arange(LINES_PER_CHARGE) * (2 * np.pi / LINES_PER_CHARGE)
+    ring = np.stack([np.cos(angles), np.sin(angles)], axis=1) * LINE_START
+    start = (centers[:, None, :] + ring).reshape(-1, 2)
+    sign = np.repeat(np.sign(sources[:, 2]), LINES_PER_CHARGE)[:, None] * LINE_STEP
+
+    n = len(start)
+    paths = np.empty((LINE_MAX_STEPS + 1, n, 2))
+    paths[0] = start
+    length = np.ones(n, dtype=np.int32)
+    alive = np.arange(n)
+    limit = np.array([engine.width - 0.5, engine.height - 0.5])
+
+    for step in range(1, LINE_MAX_STEPS + 1):
+        pos = paths[step - 1, alive]
+        s = sign[alive]
+
+        # Ponto médio (RK2), andando sempre LINE_STEP ao longo da direção de E
+        field = sample(engine, pos)
+        norm = np.hypot(field[:, 0], field[:, 1])[:, None]
+        weak = norm[:, 0] < 1e-6
+        mid = pos + 0.5 * s * field / np.maximum(norm, 1e-6)
+        field = sample(engine, mid)
+        norm = np.hypot(field[:, 0], field[:, 1])[:, None]
+        weak |= norm[:, 0] < 1e-6
+        pos = pos + s * field / np.maximum(norm, 1e-6)
+
+        paths[step, alive] = pos
+        length[alive] += 1
+
+        # Termina perto de outra carga, fora do tabuleiro ou onde o campo some
+        offset = pos[:, None, :] - centers
+        near = ((offset ** 2).sum(axis=2) < LINE_STOP ** 2).any(axis=1)
+        outside = ((pos < -0.5) | (pos > limit)).any(axis=1)
+        alive = alive[~(near | outside | weak)]
+        if not len(alive):
+            break
+        yield
+
+    # Linhas das cargas negativas foram traçadas contra o campo: inverte,
+    # para todas seguirem o sentido de E
+    return [paths[:length[i], i] if sign[i, 0] > 0 else paths[length[i] - 1::-1, i]
+            for i in range(n)]
+
+# Arestas de um quadrado: índices dos dois cantos (0 = sup. esq., 1 = sup.
+# dir., 2 = inf. dir., 3 = inf. esq.) e a posição deles no quadrado
+EDGES = ((0, 1), (1, 2), (3, 2), (0, 3))
+CORNERS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float64)
+
+# Pares de arestas ligados por um segmento: quadrados com duas arestas
+# cruzadas ligam as duas; as selas (quatro cruzadas) separam os cantos de
+# cima dos de baixo
+PAIRS = ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3))
+SADDLE_PAIRS = ((3, 0), (1, 2))
+
+def contour_segments(values, levels):
+    # Marching squares: devolve [(nível, segmentos (k, 2, 2))], com os pontos
+    # em coordenadas [x, y] de índice da array. Primeiro cada valor vira a
+    # faixa entre dois níveis; só os quadrados cujos cantos caem em faixas
+    # diferentes têm alguma curva, e só eles são processados.
+    levels = np.sort(np.asarray(levels, dtype=np.float64))
+    band = np.searchsorted(levels, values).astype(np.int8)
+    corners = (band[:-1, :-1], band[:-1, 1:], band[1:, 1:], band[1:, :-1])
+    low = np.minimum(np.minimum(corners[0], corners[1]), np.minimum(corners[2], corners[3]))
+    high = np.maximum(np.maximum(corners[0], corners[1]), np.maximum(corners[2], corners[3]))
+    ys, xs = np.nonzero(low != high)
+    if not len(ys):
+        return []
+    low = low[ys, xs]
+    high = high[ys, xs]
+    corner_values = np.stack([values[ys, xs], values[ys, xs + 1],
+                              values[ys + 1, xs + 1], values[ys + 1, xs]], axis=1)
+    origin = np.stack([xs, ys], axis=1).astype(np.float64)
+
+    result = []
+    for i, level in enumerate(levels):
+        # Quadrados que o nível i atravessa (faixa > i quer dizer valor > nível)
+        inside = np.flatnonzero((low <= i) & (high > i))
+        if not len(inside):
+            continue
+        v = corner_values[inside]
+        above = v > level
+        points = []
+        crossed = []
+        for p, q in EDGES:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = np.nan_to_num((level - v[:, p]) / (v[:, q] - v[:, p]))[:, None]
+            points.append(origin[inside] + CORNERS[p] + t * (CORNERS[q] - CORNERS[p]))
+            crossed.append(above[:, p] != above[:, q])
+        count = sum(edge.astype(np.int8) for edge in crossed)
+
+        segments = []
+        for first, second in PAIRS:
+            mask = (count == 2) & crossed[first] & crossed[second]
+            segments.append(np.stack([points[first][mask], points[second][mask]], axis=1))
+        saddle = count == 4
+        for first, second in SADDLE_PAIRS:
+            segments.append(np.stack([points[first][saddle], points[second][saddle]], axis=1))
+        result.append((float(level), np.concatenate(segments)))
+    return result
+
+# Recalcula a geometria em pedaços: cada chamada de update gasta no máximo
+# budget segundos e o quadro segue com a geometria anterior até a nova ficar
+# pronta, então mudar as cargas nunca trava um quadro inteiro
+TRACE_BUDGET = 0.004
+
+class FieldGeometry:
+    def __init__(self, width, height):
+        self.engine = FieldEngine(width, height)
+        self.sources = {}  # (x, y, q) -> quantas cargas nessa célula com esse sinal
+        self.key = None
+        self.work = None  # Gerador do cálculo em andamento
+        self.lines = []
+        self.contours = []  # Lista de (nível, segmentos)
+        self.version = 0  # Muda quando lines e contours são trocadas
+
+    def update(self, charges, budget=TRACE_BUDGET):
+        # charges: cargas colocadas do jogador. Devolve True quando uma
+        # geometria nova fica pronta.
+        key = sorted((charge.x, charge.y, charge.type.value) for charge in charges)
+        if key != self.key:
+            self.key = key
+            self.sync(key)
+            self.work = self.build()
+        if self.work is None:
+            return False
+        deadline = time.perf_counter() + budget
+        for _ in self.work:
+            if time.perf_counter() >= deadline:
+                return False
+        self.work = None
+        return True
+
+    def sync(self, key):
+        # Atualiza o campo só com as cargas que entraram ou saíram
+        wanted = {}
+        for source in key:
+            wanted[source] = wanted.get(source, 0) + 1
+        for source, count in self.sources.items():
+            extra = count - wanted.get(source, 0)
+            if extra > 0:
+                self.engine.add(source[0], source[1], -source[2] * extra)
+        for source, count in wanted.items():
+            extra = count - self.sources.get(source, 0)
+            if extra > 0:
+                self.engine.add(source[0], source[1], source[2] * extra)
+        self.sources = wanted
+
+    def build(self):
+        lines = yield from trace_field_lines(self.engine, list(self.sources))
+        self.lines = lines
+        self.contours = self.trace_contours()
+        self.version += 1
+
+    def trace_contours(self):
+        sources = self.sources
+        if not sources:
+            return []
+        engine = self.engine
+        reach = engine.cutoff
+        x0 = max(0, min(x for x, y, q in sources) - reach)
+        y0 = max(0, min(y for x, y, q in sources) - reach)
+        x1 = min(engine.width, max(x for x, y, q in sources) + reach + 1)
+        y1 = min(engine.height, max(y for x, y, q in sources) + reach + 1)
+        values = engine.potential[y0:y1, x0:x1]
+        if values.shape[0] < 2 or values.shape[1] < 2:
+            return []
+
+        levels = EQUIPOTENTIALS + tuple(-level for level in EQUIPOTENTIALS)
+        contours = contour_segments(values, levels)
+        for level, segments in contours:
+            segments += (x0, y0)
+        return contours
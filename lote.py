@@ -0,0 +1,291 @@
+# Simulação em lote de níveis com um robô, para balancear a dificuldade
+#
+# Cada tarefa é um par (semente, nível): uma Simulation nova é criada nesse
+# nível e jogada por um robô roteirizado até o nível ser limpo, o robô perder
+# todas as vidas ou o tempo limite acabar. As tarefas são espalhadas por um
+# pool de processos (um por núcleo) e cada resultado é gravado assim que
+# chega, em JSONL ou em CSV (pela extensão do arquivo). No fim, as
+# estatísticas por nível são juntadas em um resumo JSON:
+#
+#     python lote.py --levels 1-20 --seeds 500 --output niveis.jsonl
+#
+# Os processos só trocam a tarefa e um dicionário pequeno com o resultado,
+# então a vazão cresce quase linearmente com o número de núcleos.
+
+import csv
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from simulacao import (FPS, MAX_TICKS, FIELD_MODES, GENERATORS, GameState, ChargeType, Action,
+                       Simulation)
+
+# Movimentos considerados pelo robô, com "ficar parado" por último
+MOVES = [(Action.LEFT, -1, 0), (Action.RIGHT, 1, 0), (Action.UP, 0, -1),
+         (Action.DOWN, 0, 1), (Action.NONE, 0, 0)]
+
+CHARGE_NAMES = {ChargeType.POSITIVE: 'positive', ChargeType.NEGATIVE: 'negative',
+                ChargeType.DIPOLE: 'dipole'}
+
+# Robô roteirizado: age a cada think_every ticks (mais ou menos a cadência
+# de um aluno apertando teclas). Vai atrás do power-up ou inimigo mais
+# próximo sem encostar em inimigos, e coloca uma carga de sinal oposto
+# quando o inimigo mais próximo estaria dentro do campo dela. Dipolos
+# recebem primeiro uma carga positiva, que os transforma em carga positiva.
+class Bot:
+    def __init__(self, rng, think_every=6, wander=0.1):
+        self.rng = rng
+        self.think_every = think_every
+        self.wander = wander  # Chance de um passo aleatório, para sair de cantos
+
+    def act(self, sim):
+        if sim.ticks % self.think_every:
+            return ()
+        player = sim.player
+        enemies = sim.enemies
+        if not enemies:
+            return ()
+
+        nearest = min(enemies, key=lambda e: abs(e.x - player.x) + abs(e.y - player.y))
+        if len(player.placed_charges) < player.max_charges:
+            cells = sim.field_index.affected(player.x, player.y, player.field_radius)
+            if nearest.y * sim.grid.width + nearest.x in cells and not any(
+                    c.x == player.x and c.y == player.y for c in player.placed_charges):
+                if nearest.charge == ChargeType.POSITIVE:
+                    return (Action.PLACE_NEGATIVE,)
+                return (Action.PLACE_POSITIVE,)
+
+        return (self.move(sim, nearest),)
+
+    def move(self, sim, nearest):
+        player = sim.player
+        grid = sim.grid
+        moves = [m for m in MOVES if not grid.is_wall(player.x + m[1], player.y + m[2])]
+        if self.rng.random() < self.wander:
+            return self.rng.choice(moves)[0]
+
+        # Alvo: power-up ativo mais próximo (encostar) ou o inimigo (ficar a 2)
+        target, keep = (nearest.x, nearest.y), 2
+        for powerup in sim.powerups:
+            d = abs(powerup.x - player.x) + abs(powerup.y - player.y)
+            if powerup.active and d < abs(target[0] - player.x) + abs(target[1] - player.y):
+                target, keep = (powerup.x, powerup.y), 0
+
+        occupancy = grid.enemies if sim.swarm is None else None
+        best = None
+        for action, dx, dy in moves:
+            x, y = player.x + dx, player.y + dy
+            danger = 0
+            for enemy in (sim.enemies if occupancy is None else self.near(occupancy, x, y)):
+                d = abs(enemy.x - x) + abs(enemy.y - y)
+                if d == 0:
+                    danger += 100
+                elif d == 1:
+                    danger += 10
+            cost = danger + abs(abs(target[0] - x) + abs(target[1] - y) - keep) + self.rng.random()
+            if best is None or cost < best[0]:
+                best = (cost, action)
+        return best[1]
+
+    def near(self, occupancy, x, y):
+        # Inimigos na célula e nas quatro vizinhas, pelo índice de ocupação
+        for cx, cy in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            yield from occupancy.at(cx, cy)
+
+def count_charges(enemies):
+    counts = {name: 0 for name in CHARGE_NAMES.values()}
+    for enemy in enemies:
+        counts[CHARGE_NAMES[enemy.charge]] += 1
+    return counts
+
+# Joga um nível com o robô e devolve o resultado (roda nos processos do pool)
+def play_level(task):
+    seed, level, backend, max_ticks, field, ai, generator = task
+    sim = Simulation(level, backend, seed, field=field, ai=ai, generator=generator)
+    bot = Bot(random.Random(f"{seed}:{level}:bot"))
+    lives = sim.player.lives
+    enemies = count_charges(sim.enemies)
+    killed = {name: 0 for name in CHARGE_NAMES.values()}
+
+    start = time.perf_counter()
+    while sim.ticks < max_ticks:
+        state = sim.step(bot.act(sim))
+        for enemy in sim.killed:
+            killed[CHARGE_NAMES[enemy.charge]] += 1
+        if state != GameState.PLAYING:
+            break
+    elapsed = time.perf_counter() - start
+
+    cleared = sim.state == GameState.LEVEL_COMPLETE
+    return {
+        'seed': seed,
+        'level': level,
+        'cleared': cleared,
+        'ticks': sim.ticks,
+        'clear_time': sim.ticks / FPS if cleared else None,
+        'score': sim.player.score,
+        'lives_lost': max(0, lives - sim.player.lives),
+        'walls': sum(sim.grid.walls),
+        'enemies': enemies,
+        'killed': killed,
+        'cpu_seconds': elapsed,
+    }
+
+# Grava cada resultado assim que chega; CSV achata os dicionários em colunas
+class ResultWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.endswith(".csv"):
+            columns = ['seed', 'level', 'cleared', 'ticks', 'clear_time', 'score', 'lives_lost',
+                       'walls', 'cpu_seconds']
+            for group in ('enemies', 'killed'):
+                columns += [f"{group}_{name}" for name in CHARGE_NAMES.values()]
+            self.csv = csv.DictWriter(self.file, fieldnames=columns)
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is None:
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            row = {key: value for key, value in record.items() if not isinstance(value, dict)}
+            for group in ('enemies', 'killed'):
+                for name, count in record[group].items():
+                    row[f"{group}_{name}"] = count
+            self.csv.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# Estatísticas por nível, acumuladas à medida que os resultados chegam
+class Summary:
+    def __init__(self):
+        self.levels = {}
+
+    def add(self, record):
+        stats = self.levels.get(record['level'])
+        if stats is None:
+            stats = self.levels[record['level']] = {
+                'runs': 0, 'cleared': 0, 'clear_times': [], 'score': 0, 'lives_lost': 0,
+                'enemies': {name: 0 for name in CHARGE_NAMES.values()},
+            }
+        stats['runs'] += 1
+        stats['score'] += record['score']
+        stats['lives_lost'] += record['lives_lost']
+        if record['cleared']:
+            stats['cleared'] += 1
+            stats['clear_times'].append(record['clear_time'])
+        for name, count in record['enemies'].items():
+            stats['enemies'][name] += count
+
+    def result(self):
+        result = {}
+        for level in sorted(self.levels):
+            stats = self.levels[level]
+            runs = stats['runs']
+            times = sorted(stats['clear_times'])
+
+            def pick(p):
+                return times[min(len(times) - 1, int(p * len(times)))] if times else None
+
+            result[level] = {
+                'runs': runs,
+                'clear_rate': stats['cleared'] / runs,
+                'clear_time_mean': sum(times) / len(times) if times else None,
+                'clear_time_p50': pick(0.50),
+                'clear_time_p90': pick(0.90),
+                'score_mean': stats['score'] / runs,
+                'lives_lost_mean': stats['lives_lost'] / runs,
+                'enemies_mean': {name: count / runs for name, count in stats['enemies'].items()},
+            }
+        return result
+
+def run(levels, seeds, jobs=None, backend='objects', max_ticks=MAX_TICKS, output=None,
+        chunksize=4, field=None, ai=False, generator='classic'):
+    tasks = [(seed, level, backend, max_ticks, field, ai, generator)
+             for seed in seeds for level in levels]
+    writer = ResultWriter(output) if output else None
+    summary = Summary()
+    jobs = jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    pool = None
+    try:
+        if jobs == 1:
+            results = map(play_level, tasks)  # Sem pool: mais fácil de depurar
+        else:
+            pool = Pool(jobs)
+            results = pool.imap_unordered(play_level, tasks, chunksize)
+        for record in results:
+            summary.add(record)
+            if writer:
+                writer.write(record)
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        if pool:
+            pool.terminate()  # Com erro ou Ctrl+C no meio, não deixa processos para trás
+        if writer:
+            writer.close()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'meta': {
+            'tasks': len(tasks),
+            'jobs': jobs,
+            'backend': backend,
+            'field': field,
+            'ai': ai,
+            'generator': generator,
+            'max_ticks': max_ticks,
+            'seconds': elapsed,
+            'levels_per_second': len(tasks) / elapsed if elapsed else 0.0,
+        },
+        'levels': summary.result(),
+    }
+
+# Lê um intervalo de níveis: "5" ou "1-20"
+def parse_levels(text):
+    first, _, last = text.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simula níveis do EletroBlast em lote com um robô")
+    parser.add_argument("--levels", type=parse_levels, default=parse_levels("1-10"), metavar="A-B")
+    parser.add_argument("--seeds", type=int, default=100, help="quantas sementes por nível")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, help="processos (padrão: um por núcleo)")
+    parser.add_argument("--backend", choices=['objects', 'numpy'], default='objects')
+    parser.add_argument("--field", choices=FIELD_MODES[1:],
+                        help="inimigos andam pelo campo resultante (precisa de NumPy)")
+    parser.add_argument("--ai", action="store_true",
+                        help="inimigos perseguem o jogador e fogem dos campos opostos")
+    parser.add_argument("--generator", choices=GENERATORS, default='classic',
+                        help="gerador de níveis (checked: área conectada e orçamento)")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS,
+                        help="tempo limite por nível, em ticks")
+    parser.add_argument("--output", metavar="ARQUIVO",
+                        help="resultados por nível, em JSONL (ou CSV, pela extensão)")
+    parser.add_argument("--summary", metavar="ARQUIVO", help="resumo JSON (padrão: stdout)")
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    report = run(args.levels, seeds, args.jobs, args.backend, args.max_ticks, args.output,
+                 field=args.field, ai=args.ai, generator=args.generator)
+    meta = report['meta']
+    print(f"{meta['tasks']} níveis em {meta['seconds']:.1f}s com {meta['jobs']} processos "
+          f"({meta['levels_per_second']:.1f} níveis/s)", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,257 @@
+# Gerador de níveis com checagem de conectividade e cache de níveis prontos
+#
+# create_level (simulacao.py) sorteia paredes, inimigos e power-ups sem
+# conferir nada: inimigos que caem em uma parede somem em silêncio, os
+# power-ups tentam até 100 posições e uma parede pode fechar um inimigo (ou
+# o jogador) em um bolsão que ninguém alcança. generate_level devolve um
+# nível no mesmo formato, mas:
+#
+# - as células livres viram um bitset (um int, bit y * width + x) e a área
+#   alcançável é achada por flood fill com deslocamentos do int inteiro,
+#   sem visitar célula por célula; bolsões fora da maior área viram parede;
+# - inimigos e power-ups são sorteados só entre as células alcançáveis, sem
+#   repetição e a mais de SAFE_DISTANCE passos do jogador;
+# - a quantidade de inimigos vem de um orçamento de dificuldade por nível
+#   (cada tipo custa ENEMY_COST), em vez de um número de tentativas.
+#
+# Cada nível é sorteado por um gerador próprio, semeado pela semente da
+# partida e pelo número do nível, então o mesmo nível sai igual não importa
+# quando nem em que thread é gerado. LevelCache usa isso para gerar o
+# próximo nível em uma thread de fundo enquanto o atual é jogado: na troca
+# de nível (LEVEL_COMPLETE -> next_level) ele já está pronto, mesmo em
+# tabuleiros grandes. Para comparar com create_level:
+#
+#     python niveis.py --board 512x512 --levels 5
+
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import compress
+
+from grade import Grid
+from simulacao import (GRID_WIDTH, GRID_HEIGHT, ChargeType, PowerUpType, Enemy, PowerUp,
+                       create_level)
+
+# Passos mínimos entre o jogador e os inimigos no começo do nível
+SAFE_DISTANCE = 3
+
+# Custo de cada tipo de inimigo no orçamento; o orçamento do nível dá o
+# mesmo número de inimigos de create_level se todos fossem cargas simples
+ENEMY_COST = {ChargeType.POSITIVE: 2, ChargeType.NEGATIVE: 2, ChargeType.DIPOLE: 3}
+ENEMY_TYPES = [ChargeType.POSITIVE, ChargeType.NEGATIVE, ChargeType.DIPOLE]
+ENEMY_WEIGHTS = [5, 3, 2]
+
+# Passos do flood fill entre uma comparação e outra
+FLOOD_STEPS = 8
+
+# Níveis prontos guardados no cache (os mais antigos saem primeiro)
+CACHE_SIZE = 8
+
+# Células livres (0) viram "1" e paredes (1) viram "0" no texto binário
+FREE_BITS = bytes.maketrans(b"\x00\x01", b"10")
+SET_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+def free_bits(walls):
+    # Bit i ligado quando a célula i está livre
+    return int(bytes(walls).translate(FREE_BITS)[::-1], 2)
+
+def cells(bits):
+    # Índices dos bits ligados, em ordem crescente (ordem de varredura)
+    text = format(bits, 'b').encode()[::-1].translate(SET_BITS)
+    return list(compress(range(len(text)), text))
+
+def grow(bits, free, width, steps):
+    for _ in range(steps):
+        bits = (bits | bits << 1 | bits >> 1 | bits << width | bits >> width) & free
+    return bits
+
+def flood(start, free, width):
+    # Área livre alcançável a partir de start; como a borda é toda parede,
+    # os deslocamentos de 1 bit nunca ligam uma linha à seguinte
+    reach = start & free
+    while True:
+        grown = grow(reach, free, width, FLOOD_STEPS)
+        if grown == reach:
+            return reach
+        reach = grown
+
+def components(free, width):
+    rest = free
+    while rest:
+        part = flood(rest & -rest, free, width)
+        yield part
+        rest &= ~part
+
+def difficulty_budget(level_num, scale=1):
+    return (2 + level_num * 2) * ENEMY_COST[ChargeType.POSITIVE] * scale
+
+def difficulty(enemies):
+    return sum(ENEMY_COST[enemy.charge] for enemy in enemies)
+
+def enemy_types(budget, rng):
+    # Sorteia tipos na proporção de create_level até gastar o orçamento
+    types = []
+    cheapest = min(ENEMY_COST.values())
+    draws = iter(rng.choices(ENEMY_TYPES, weights=ENEMY_WEIGHTS, k=budget // cheapest))
+    while budget >= cheapest:
+        charge_type = next(draws)
+        if ENEMY_COST[charge_type] > budget:
+            charge_type = ChargeType.POSITIVE
+        types.append(charge_type)
+        budget -= ENEMY_COST[charge_type]
+    return types
+
+def generate_level(level_num, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    grid = Grid(width, height)
+    scale = max(1, (width * height) // (GRID_WIDTH * GRID_HEIGHT))
+    grid.set_border()
+
+    # Paredes internas como em create_level, no máximo metade do interior
+    interior = (width - 2) * (height - 2)
+    for _ in range(min((5 + level_num) * scale, interior // 2)):
+        grid.set_wall(rng.randint(1, width-2), rng.randint(1, height-2))
+
+    # Só a maior área conectada fica livre; os bolsões viram parede
+    free = free_bits(grid.walls)
+    area = max(components(free, width), key=int.bit_count, default=0)
+    walls = grid.walls
+    for i in cells(free & ~area):
+        walls[i] = 1
+
+    # Jogador na primeira célula livre, na mesma varredura de create_level
+    start = area & -area
+    player = start.bit_length() - 1
+    near = grow(start, area, width, SAFE_DISTANCE)
+    spots = cells(area & ~near)
+
+    powerup_types = [rng.choice([PowerUpType.FIELD_STRENGTH, PowerUpType.EXTRA_CHARGE])]
+    if rng.random() < 0.2:
+        powerup_types.append(PowerUpType.EXTRA_LIFE)
+    types = enemy_types(difficulty_budget(level_num, scale), rng)
+
+    # Células distintas para todos; se faltar espaço, sobram menos inimigos
+    count = min(len(spots), len(types) + len(powerup_types))
+    chosen = rng.sample(spots, count)
+    powerups = [PowerUp(i % width, i // width, powerup_type)
+                for i, powerup_type in zip(chosen, powerup_types)]
+    enemies = [Enemy(i % width, i // width, charge_type)
+               for i, charge_type in zip(chosen[len(powerups):], types)]
+
+    return grid, player % width, player // width, enemies, powerups
+
+# Níveis gerados em uma thread de fundo, por (semente, nível, tabuleiro)
+class LevelCache:
+    def __init__(self, size=CACHE_SIZE, ahead=1):
+        self.size = size
+        self.ahead = ahead  # Quantos níveis à frente prefetch() pede
+        self.ready = OrderedDict()
+        self.pending = deque()
+        self.working = None
+        self.condition = threading.Condition()
+        self.worker = None
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, key):
+        seed, level_num, (width, height) = key
+        return generate_level(level_num, random.Random(f"{seed}:level:{level_num}"), width, height)
+
+    def prefetch(self, seed, level_num, board):
+        # Pede os próximos níveis à thread de fundo, sem esperar
+        with self.condition:
+            for ahead in range(1, self.ahead + 1):
+                key = (seed, level_num + ahead, board)
+                if key in self.ready or key == self.working or key in self.pending:
+                    continue
+                self.pending.append(key)
+            if self.pending and self.worker is None:
+                self.worker = threading.Thread(target=self.run, name="niveis", daemon=True)
+                self.worker.start()
+            self.condition.notify_all()
+
+    def get(self, seed, level_num, board):
+        # Nível pronto do cache; se ninguém o gerou ainda, gera aqui mesmo.
+        # Cada nível sai do cache ao ser usado, já que o jogo o modifica.
+        key = (seed, level_num, board)
+        with self.condition:
+            while key == self.working:
+                self.condition.wait()
+            level = self.ready.pop(key, None)
+            if level is not None:
+                self.hits += 1
+                return level
+            if key in self.pending:
+                self.pending.remove(key)
+            self.misses += 1
+        return self.build(key)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                key = self.working = self.pending.popleft()
+            level = self.build(key)
+            with self.condition:
+                self.ready[key] = level
+                while len(self.ready) > self.size:
+                    self.ready.popitem(last=False)
+                self.working = None
+                self.condition.notify_all()
+
+level_cache = LevelCache()
+
+# Inimigos e power-ups que o jogador não alcança em um nível já gerado
+def unreachable(grid, player_x, player_y, enemies, powerups):
+    width = grid.width
+    area = flood(1 << (player_y * width + player_x), free_bits(grid.walls), width)
+    return (sum(1 for enemy in enemies if not area >> (enemy.y * width + enemy.x) & 1),
+            sum(1 for powerup in powerups if not area >> (powerup.y * width + powerup.x) & 1))
+
+if __name__ == "__main__":
+    import argparse
+
+    from simulacao import parse_board
+
+    parser = argparse.ArgumentParser(description="Compara generate_level com create_level")
+    parser.add_argument("--board", type=parse_board, default=(GRID_WIDTH, GRID_HEIGHT), metavar="LxA")
+    parser.add_argument("--level", type=int, default=1, help="primeiro nível")
+    parser.add_argument("--levels", type=int, default=20, help="quantos níveis seguidos")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = args.board
+    scale = max(1, (width * height) // (GRID_WIDTH * GRID_HEIGHT))
+    numbers = range(args.level, args.level + args.levels)
+    for name, generator in (("create_level", create_level), ("generate_level", generate_level)):
+        lost = trapped_enemies = trapped_powerups = budget_gap = 0
+        elapsed = 0.0
+        for level_num in numbers:
+            start = time.perf_counter()
+            rng = random.Random(f"{args.seed}:level:{level_num}")
+            level = generator(level_num, rng, width, height)
+            elapsed += time.perf_counter() - start
+            enemies, powerups = level[3], level[4]
+            lost += (2 + level_num * 2) * scale - len(enemies) if generator is create_level else 0
+            trapped = unreachable(*level)
+            trapped_enemies += trapped[0]
+            trapped_powerups += trapped[1]
+            budget_gap += abs(difficulty_budget(level_num, scale) - difficulty(enemies))
+        elapsed /= args.levels
+        print(f"{name}: {elapsed * 1000:.2f} ms/nível, {lost} inimigos perdidos em paredes, "
+              f"{trapped_enemies} inimigos e {trapped_powerups} power-ups inalcançáveis, "
+              f"desvio médio do orçamento {budget_gap / args.levels:.1f}")
+
+    # Troca de nível: com o próximo nível pedido antes, get() só tira do cache
+    cache = LevelCache()
+    stalls = []
+    for level_num in numbers:
+        start = time.perf_counter()
+        cache.get(args.seed, level_num, args.board)
+        stalls.append(time.perf_counter() - start)
+        cache.prefetch(args.seed, level_num, args.board)
+        time.sleep(elapsed * 2 + 0.01)  # O nível atual sendo jogado
+    print(f"Troca de nível com cache: primeira {stalls[0] * 1000:.2f} ms, "
+          f"demais até {max(stalls[1:], default=0) * 1000:.3f} ms "
+          f"({cache.hits} prontos, {cache.misses} gerados na hora)")
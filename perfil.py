@@ -0,0 +1,132 @@
+# Profiler de frames e ganchos de instrumentação do laço principal
+#
+# O código do jogo marca trechos com `with profiler.span("nome"):`. Com o
+# profiler desligado, span() devolve sempre o mesmo gerenciador de contexto
+# vazio, então o custo é só o de uma chamada. Ligado, cada frame guarda o
+# tempo de cada trecho, o total do frame, quantas Surfaces foram criadas e a
+# variação de blocos de memória alocados; os últimos frames ficam em um
+# buffer circular que pode ser salvo em CSV ou JSON.
+#
+# Este módulo não importa pygame no topo para poder ser usado pela
+# simulação sem janela; a contagem de Surfaces só é instalada ao ligar.
+
+import csv
+import gc
+import json
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext
+
+NULL_SPAN = nullcontext()
+
+class Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.profiler.spans
+        spans[self.name] = spans.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000
+
+class Profiler:
+    def __init__(self, history=600):
+        self.enabled = False
+        self.frames = deque(maxlen=history)
+        self.spans = {}
+        self.surfaces = 0
+        self.frame_start = 0.0
+        self.blocks_start = 0
+        self.gc_start = 0
+        self.original_surface = None
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.install_surface_counter()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.uninstall_surface_counter()
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def install_surface_counter(self):
+        # Troca pygame.Surface por uma subclasse que conta as criações
+        pygame = sys.modules.get("pygame")
+        if pygame is None or self.original_surface is not None:
+            return
+        profiler = self
+        original = pygame.Surface
+
+        class CountingSurface(original):
+            def __init__(self, *args, **kwargs):
+                profiler.surfaces += 1
+                super().__init__(*args, **kwargs)
+
+        self.original_surface = original
+        pygame.Surface = CountingSurface
+
+    def uninstall_surface_counter(self):
+        if self.original_surface is not None:
+            sys.modules["pygame"].Surface = self.original_surface
+            self.original_surface = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.spans = {}
+        self.surfaces = 0
+        self.blocks_start = sys.getallocatedblocks()
+        self.gc_start = sum(stat['collections'] for stat in gc.get_stats())
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_start:
+            return
+        record = {'frame_ms': (time.perf_counter() - self.frame_start) * 1000}
+        record.update(self.spans)
+        record['surfaces'] = self.surfaces
+        record['alloc_blocks'] = sys.getallocatedblocks() - self.blocks_start
+        record['gc_collections'] = sum(stat['collections'] for stat in gc.get_stats()) - self.gc_start
+        self.frames.append(record)
+
+    def last(self):
+        return self.frames[-1] if self.frames else None
+
+    def dump(self, path):
+        # Salva os últimos frames; o formato vem da extensão (.json ou CSV)
+        frames = list(self.frames)
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(frames, f, indent=1)
+            return
+        columns = []
+        for record in frames:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(frames)
+
+profiler = Profiler()
@@ -0,0 +1,106 @@
+# Carregamento preguiçoso de imagens e sons
+#
+# Antes, importar jogo.py decodificava o PNG do menu e os MP3 inteiros
+# (inclusive a música do jogo, de 2,3 MB) antes de a janela mostrar qualquer
+# coisa. Aqui nada é carregado na importação:
+#
+# - imagens e efeitos sonoros são decodificados sob demanda, ou antes em
+#   uma thread de fundo (load_in_background) enquanto o menu já aparece;
+# - músicas longas não passam por aqui: tocam em fluxo pelo AudioManager
+#   (som.py), sem decodificar o arquivo inteiro em um Sound;
+# - imagens escaladas ficam no cache em disco (superficies.save_cached),
+#   identificadas pelo hash do arquivo e pelo tamanho, e são convertidas
+#   para o formato da tela uma vez só (display_image);
+# - arquivos que faltam viram um substituto (imagem roxa ou som mudo)
+#   guardado no cache, então a falha acontece uma vez só.
+
+import threading
+
+import pygame
+
+from superficies import cache_key, load_cached, save_cached
+
+# Cor da imagem substituta, a mesma do fallback antigo de load_image
+MISSING_COLOR = (128, 0, 128)
+
+class Assets:
+    def __init__(self):
+        self.images = {}  # (nome, tamanho) -> Surface
+        self.display_images = {}  # (nome, tamanho) -> Surface no formato da tela
+        self.sounds = {}  # nome -> Sound
+        self.missing = set()
+        self.lock = threading.Lock()
+        self.loader = None
+
+    def load_in_background(self, images=(), sounds=()):
+        # Decodifica em uma thread daemon; image(..., wait=False) diz se já terminou
+        def load():
+            for name, size in images:
+                self.image(name, size)
+            for name in sounds:
+                self.sound(name)
+        self.loader = threading.Thread(target=load, name="assets", daemon=True)
+        self.loader.start()
+
+    def image(self, name, size=None, wait=True):
+        # Imagem escalada para size; com wait=False devolve None se ainda não carregou
+        key = (name, size)
+        surface = self.images.get(key)
+        if surface is not None or not wait:
+            return surface
+        with self.lock:
+            surface = self.images.get(key)
+            if surface is None:
+                surface = self.load_image(name, size)
+                self.images[key] = surface
+        return surface
+
+    def display_image(self, name, size=None, wait=True):
+        # Como image(), já convertida para o formato da tela (só na thread principal)
+        key = (name, size)
+        surface = self.display_images.get(key)
+        if surface is None:
+            surface = self.image(name, size, wait)
+            if surface is None:
+                return None
+            surface = surface.convert()
+            self.display_images[key] = surface
+        return surface
+
+    def load_image(self, name, size):
+        if name not in self.missing:
+            try:
+                with open(name, "rb") as f:
+                    data = f.read()
+                key = cache_key("image", data, size)
+                image = load_cached(key)
+                if image is None:
+                    image = pygame.image.load(name)
+                    if size:
+                        image = pygame.transform.scale(image, size)
+                    save_cached(key, image, "RGB")
+                return image
+            except (pygame.error, OSError):
+                self.missing.add(name)
+        # Fallback se a imagem não carregar
+        surface = pygame.Surface(size or (100, 100))
+        surface.fill(MISSING_COLOR)
+        return surface
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            return sound
+        with self.lock:
+            sound = self.sounds.get(name)
+            if sound is None:
+                try:
+                    sound = pygame.mixer.Sound(name)
+                except (pygame.error, OSError):
+                    # Fallback silencioso se o áudio não carregar
+                    self.missing.add(name)
+                    sound = pygame.mixer.Sound(buffer=bytearray(0))
+                self.sounds[name] = sound
+        return sound
+
+assets = Assets()
@@ -0,0 +1,223 @@
+# Gravação e reprodução de partidas (replays)
+#
+# Uma partida é totalmente determinada pela semente da Simulation e pelas
+# ações de cada tick, então o replay guarda só isso, em um formato binário
+# compacto gravado em fluxo (nada fica acumulado em memória):
+#
+#   cabeçalho  "EBRP", versão (u8), semente (u64), nível inicial (u16),
+#              backend (u8), inimigos da fase de estresse (u32),
+#              largura e altura do tabuleiro (u16 cada, desde a versão 2),
+#              modo do motor de campo (u8, desde a versão 3),
+#              IA dos inimigos ligada (u8, desde a versão 4),
+#              gerador de níveis (u8, desde a versão 5)
+#   eventos    ticks desde o evento anterior (varint) + ação (u8);
+#              várias ações no mesmo tick usam distância 0
+#   rodapé     ticks restantes (varint), marcador 0xFF, total de ticks (u64),
+#              pontuação final (u32) e hash do estado final (16 bytes)
+#
+# A reprodução roda sem janela e na velocidade máxima e confere a pontuação
+# e o hash do estado final:
+#
+#     python replay.py partida.ebr
+
+import hashlib
+import os
+import struct
+import time
+
+from simulacao import (GRID_WIDTH, GRID_HEIGHT, FIELD_MODES, GENERATORS, GameState, Action,
+                       new_simulation)
+
+MAGIC = b"EBRP"
+VERSION = 5
+END_MARKER = 0xFF
+
+HEADER = struct.Struct("<4sBQHBI")
+BOARD = struct.Struct("<HH")
+FIELD = struct.Struct("<B")
+AI = struct.Struct("<?")
+GENERATOR = struct.Struct("<B")
+FOOTER = struct.Struct("<QI16s")
+BACKENDS = ['objects', 'numpy']
+
+# Um objeto bytes por código de ação, para não alocar a cada evento gravado
+BYTES = [bytes((i,)) for i in range(256)]
+
+class ReplayError(Exception):
+    pass
+
+def write_varint(file, value):
+    while value >= 0x80:
+        file.write(BYTES[value & 0x7F | 0x80])
+        value >>= 7
+    file.write(BYTES[value])
+
+def read_varint(file):
+    value = 0
+    shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            raise ReplayError("replay truncado")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+# Caminho do n-ésimo replay de uma sessão: partida.ebr, partida-2.ebr, ...
+def numbered_path(path, n):
+    if n == 1:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}-{n}{ext}"
+
+# Hash do estado da partida, usado para conferir a reprodução
+def state_hash(sim):
+    player = sim.player
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack("<IIiiiiiq", sim.level, sim.ticks, player.x, player.y,
+                              player.score, player.lives, player.max_charges,
+                              int(player.field_radius * 2)))
+    for enemy in sim.enemies:
+        digest.update(struct.pack("<iib", enemy.x, enemy.y, enemy.charge.value))
+    for powerup in sim.powerups:
+        digest.update(struct.pack("<iib", powerup.x, powerup.y, powerup.type.value))
+    for charge in player.placed_charges:
+        digest.update(struct.pack("<iibii", charge.x, charge.y, charge.type.value,
+                                  charge.timer, charge.activation_timer))
+    return digest.digest()
+
+class ReplayWriter:
+    def __init__(self, path, sim, stress=0):
+        if not 0 <= sim.seed < 2**64:
+            raise ReplayError(f"semente fora do intervalo de 64 bits: {sim.seed}")
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, sim.seed, sim.level,
+                                    BACKENDS.index(sim.backend), stress))
+        self.file.write(BOARD.pack(*sim.board))
+        self.file.write(FIELD.pack(FIELD_MODES.index(sim.field)))
+        self.file.write(AI.pack(sim.ai))
+        self.file.write(GENERATOR.pack(GENERATORS.index(sim.generator)))
+        self.ticks = 0
+        self.last_event = 0
+
+    def record(self, actions):
+        # Chamado uma vez por tick com as ações passadas para Simulation.step
+        self.ticks += 1
+        for action in actions:
+            write_varint(self.file, self.ticks - self.last_event)
+            self.file.write(BYTES[action.value])
+            self.last_event = self.ticks
+
+    def close(self, sim):
+        write_varint(self.file, self.ticks - self.last_event)
+        self.file.write(BYTES[END_MARKER])
+        self.file.write(FOOTER.pack(self.ticks, sim.player.score, state_hash(sim)))
+        self.file.close()
+
+class ReplayReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ReplayError("replay truncado")
+        magic, version, self.seed, self.level, backend, self.stress = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ReplayError("arquivo não é um replay do EletroBlast")
+        if not 1 <= version <= VERSION:
+            raise ReplayError(f"versão de replay não suportada: {version}")
+        self.backend = BACKENDS[backend]
+        self.board = (GRID_WIDTH, GRID_HEIGHT)
+        if version >= 2:
+            board = self.file.read(BOARD.size)
+            if len(board) < BOARD.size:
+                raise ReplayError("replay truncado")
+            self.board = BOARD.unpack(board)
+        self.field = None
+        if version >= 3:
+            field = self.file.read(FIELD.size)
+            if len(field) < FIELD.size:
+                raise ReplayError("replay truncado")
+            self.field = FIELD_MODES[FIELD.unpack(field)[0]]
+        self.ai = False
+        if version >= 4:
+            ai = self.file.read(AI.size)
+            if len(ai) < AI.size:
+                raise ReplayError("replay truncado")
+            self.ai = AI.unpack(ai)[0]
+        self.generator = 'classic'
+        if version >= 5:
+            generator = self.file.read(GENERATOR.size)
+            if len(generator) < GENERATOR.size:
+                raise ReplayError("replay truncado")
+            self.generator = GENERATORS[GENERATOR.unpack(generator)[0]]
+        self.total_ticks = None
+        self.score = None
+        self.hash = None
+
+    def ticks(self):
+        # Gera as ações de cada tick; ao final, lê o rodapé
+        no_actions = ()
+        pending = []
+        pending_tick = 0
+        event_tick = 0
+        tick = 0
+        while True:
+            event_tick += read_varint(self.file)
+            byte = self.file.read(1)
+            if not byte:
+                raise ReplayError("replay truncado")
+            code = byte[0]
+
+            # Um tick com ações termina quando aparece um evento de outro tick
+            if pending and (code == END_MARKER or event_tick != pending_tick):
+                while tick < pending_tick - 1:
+                    tick += 1
+                    yield no_actions
+                tick += 1
+                yield pending
+                pending.clear()
+
+            if code == END_MARKER:
+                while tick < event_tick:
+                    tick += 1
+                    yield no_actions
+                break
+            pending.append(Action(code))
+            pending_tick = event_tick
+
+        footer = self.file.read(FOOTER.size)
+        if len(footer) < FOOTER.size:
+            raise ReplayError("replay truncado")
+        self.total_ticks, self.score, self.hash = FOOTER.unpack(footer)
+        self.file.close()
+
+# Reproduz um replay sem janela, na velocidade máxima, e confere o resultado
+def play(path):
+    reader = ReplayReader(path)
+    sim = new_simulation(reader.level, reader.backend, reader.seed, reader.stress, reader.board,
+                         reader.field, reader.ai, reader.generator)
+    start = time.perf_counter()
+    for actions in reader.ticks():
+        if sim.state == GameState.LEVEL_COMPLETE:
+            sim.next_level()
+        sim.step(actions)
+    elapsed = time.perf_counter() - start
+
+    ok = sim.player.score == reader.score and state_hash(sim) == reader.hash
+    return sim, reader, ok, elapsed
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Reproduz um replay do EletroBlast sem janela")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    sim, reader, ok, elapsed = play(args.path)
+    print(f"{reader.total_ticks} ticks em {elapsed:.3f}s "
+          f"({reader.total_ticks / max(elapsed, 1e-9):,.0f} ticks/s)")
+    print(f"Pontuação: {sim.player.score} (gravada: {reader.score})")
+    print("Estado final confere" if ok else "Estado final DIFERENTE do gravado")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,703 @@
+# Servidor de partidas em rede: jogadores e espectadores na rede local
+#
+# O servidor roda a partida de verdade (uma Simulation a 60 ticks/s) em um
+# laço asyncio e aceita conexões TCP. Cada cliente manda um byte dizendo se
+# quer jogar ou só assistir; o primeiro jogador controla a carga neutra e os
+# outros assistem até ele sair. O controlador manda as ações como bytes
+# (o valor de Action), e o servidor as aplica no próximo tick.
+#
+# Do servidor para os clientes vão quadros com o tamanho na frente (u32):
+#
+#   quadro-chave  'K', tick, nível, tabuleiro, estado, paredes (zlib), HUD,
+#                 mensagem e todos os inimigos, power-ups e cargas, com ids
+#   delta         'D', tick e um byte de seções: HUD (posição do jogador,
+#                 pontos, vidas, cargas, raio e estado), mensagem nova,
+#                 inimigos que andaram ou mudaram de carga, inimigos
+#                 eliminados, power-ups pegos, cargas colocadas, ativadas e
+#                 sumidas; só as seções que mudaram no tick vão no quadro
+#   controle      'C' e se o cliente passou a controlar o jogador
+#
+# O delta de cada tick é montado uma vez só e o mesmo objeto bytes vai para
+# todos os clientes. Cada cliente tem sua fila de envio, esvaziada por uma
+# tarefa própria; o tick só põe o quadro na fila e nunca espera um cliente.
+# Se um cliente lento acumula QUEUE_FRAMES quadros sem conseguir enviá-los,
+# os quadros de estado da fila são descartados e trocados por um
+# quadro-chave do tick atual (os de controle e de fim de partida ficam, logo
+# depois dele), então a memória por cliente é limitada e quem atrasa pula
+# direto para o presente.
+#
+#     python servidor.py --port 5050
+#     python jogo.py --connect 127.0.0.1:5050
+#     python jogo.py --connect 127.0.0.1:5050 --spectate
+#
+# Teste de carga na própria máquina, com espectadores em outro processo
+# (alguns deles lentos, que param de ler e só voltam no fim do teste):
+#
+#     python servidor.py --load-test 50 --slow 2 --seconds 10
+
+import asyncio
+import hashlib
+import random
+import socket
+import struct
+import time
+import zlib
+from array import array
+from collections import deque
+
+from estado import Reader, pack_walls
+from grade import Grid
+from niveis import level_cache
+from simulacao import (GRID_WIDTH, GRID_HEIGHT, FPS, FIELD_MODES, GENERATORS, GameState,
+                       ChargeType, PowerUpType, Action, Charge, Player, Enemy, PowerUp, Simulation,
+                       parse_board)
+
+PORT = 5050
+
+# Primeiro byte do cliente
+SPECTATE = 0
+PLAY = 1
+
+FRAME = struct.Struct("<I")
+KEYFRAME = struct.Struct("<cIHHHB")
+DELTA = struct.Struct("<cIB")
+CONTROL = struct.Struct("<c?")
+END = struct.Struct("<cI")
+HUD = struct.Struct("<HHIhBBB")
+COUNT = struct.Struct("<I")
+TEXT = struct.Struct("<B")
+ENEMY = struct.Struct("<IHHb")
+POWERUP = struct.Struct("<IHHB")
+CHARGE = struct.Struct("<IHHbB?")
+
+# Seções de um delta
+HUD_CHANGED = 1
+MESSAGE = 2
+ENEMIES_MOVED = 4
+ENEMIES_REMOVED = 8
+POWERUPS_REMOVED = 16
+CHARGES_PLACED = 32
+CHARGES_ACTIVATED = 64
+CHARGES_REMOVED = 128
+
+ACTIONS = list(Action)
+TICK_SECONDS = 1 / FPS
+
+# Quadros na fila de um cliente antes de trocá-los por um quadro-chave (1 s)
+QUEUE_FRAMES = FPS
+
+# Quadros que um quadro-chave não substitui: controle e fim de partida
+EVENT_FRAMES = (b"C", b"E")
+
+# Bytes ainda não enviados que o kernel guarda por cliente (TCP_NOTSENT_LOWAT
+# onde existir, senão o buffer de envio inteiro); o asyncio não guarda nada
+# além disso. Os quadros do tick têm poucas dezenas de bytes, então buffers
+# maiores esconderiam muitos segundos de atraso antes da fila acima encher.
+SEND_BUFFER = 512
+
+# Buffer de recepção dos espectadores lentos do teste de carga
+SLOW_BUFFER = 256
+
+# Ticks parados mostrando "nível completo" ou "game over" antes de seguir
+PAUSE_TICKS = 2 * FPS
+
+# Atraso máximo do laço de ticks; além disso o servidor desiste de alcançar
+MAX_LAG = 0.25
+
+def hud_values(sim):
+    player = sim.player
+    return (player.x, player.y, player.score, player.lives, player.max_charges,
+            int(player.field_radius * 2), sim.state.value)
+
+def pack_ids(ids):
+    return COUNT.pack(len(ids)) + array('I', ids).tobytes()
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+# Numera as entidades do nível e monta os quadros a partir da Simulation.
+# Os ids se apoiam na identidade dos objetos, que o backend de objetos
+# mantém durante todo o nível.
+class StateEncoder:
+    def __init__(self):
+        self.grid = None
+
+    def track(self, sim):
+        # Nível novo: numera tudo de novo
+        self.grid = sim.grid
+        self.enemy_ids = {enemy: i for i, enemy in enumerate(sim.enemies)}
+        self.enemies = {i: (enemy.x, enemy.y, enemy.charge.value)
+                        for enemy, i in self.enemy_ids.items()}
+        self.powerup_ids = {powerup: i for i, powerup in enumerate(sim.powerups)}
+        self.charge_ids = {}
+        self.next_charge = 0
+        for charge in sim.player.placed_charges:
+            self.charge_id(charge)
+        self.hud = hud_values(sim)
+
+    def charge_id(self, charge):
+        i = self.charge_ids[charge] = self.next_charge
+        self.next_charge += 1
+        return i
+
+    def keyframe(self, sim):
+        grid = sim.grid
+        player = sim.player
+        walls = pack_walls(grid)
+        message = player.message.encode()[:255] if player.message_timer > 0 else b""
+        parts = [
+            KEYFRAME.pack(b"K", sim.ticks, sim.level, grid.width, grid.height, sim.state.value),
+            COUNT.pack(len(walls)), walls,
+            HUD.pack(*self.hud),
+            TEXT.pack(len(message)), message,
+            COUNT.pack(len(sim.enemies)),
+        ]
+        ids = self.enemy_ids
+        parts += [ENEMY.pack(ids[enemy], enemy.x, enemy.y, enemy.charge.value) for enemy in sim.enemies]
+        parts.append(COUNT.pack(len(sim.powerups)))
+        parts += [POWERUP.pack(self.powerup_ids[powerup], powerup.x, powerup.y, powerup.type.value)
+                  for powerup in sim.powerups]
+        parts.append(COUNT.pack(len(player.placed_charges)))
+        parts += [CHARGE.pack(self.charge_ids[charge], charge.x, charge.y, charge.type.value,
+                              max(0, charge.activation_timer), charge.active)
+                  for charge in player.placed_charges]
+        return frame(b"".join(parts))
+
+    def delta(self, sim):
+        # Só o que mudou desde o tick anterior
+        flags = 0
+        parts = []
+        player = sim.player
+
+        hud = hud_values(sim)
+        if hud != self.hud:
+            self.hud = hud
+            flags |= HUD_CHANGED
+            parts.append(HUD.pack(*hud))
+
+        if player.message_timer == 60:  # Mensagem mostrada neste tick
+            message = player.message.encode()[:255]
+            flags |= MESSAGE
+            parts += [TEXT.pack(len(message)), message]
+
+        ids = self.enemy_ids
+        last = self.enemies
+        moved = []
+        for enemy in sim.enemies:
+            i = ids[enemy]
+            state = (enemy.x, enemy.y, enemy.charge.value)
+            if last[i] != state:
+                last[i] = state
+                moved.append(ENEMY.pack(i, *state))
+        if moved:
+            flags |= ENEMIES_MOVED
+            parts.append(COUNT.pack(len(moved)))
+            parts += moved
+        if sim.killed:
+            removed = [ids.pop(enemy) for enemy in sim.killed]
+            for i in removed:
+                del last[i]
+            flags |= ENEMIES_REMOVED
+            parts.append(pack_ids(removed))
+
+        if sim.picked:
+            flags |= POWERUPS_REMOVED
+            parts.append(pack_ids([self.powerup_ids.pop(powerup) for powerup in sim.picked]))
+
+        charges = self.charge_ids
+        placed = player.placed_charges
+        if len(placed) != len(charges) or not all(charge in charges for charge in placed):
+            current = set(placed)
+            gone = [charge for charge in charges if charge not in current]
+            new = [charge for charge in placed if charge not in charges]
+            if new:
+                flags |= CHARGES_PLACED
+                parts.append(COUNT.pack(len(new)))
+                parts += [CHARGE.pack(self.charge_id(charge), charge.x, charge.y, charge.type.value,
+                                      max(0, charge.activation_timer), charge.active) for charge in new]
+            if gone:
+                flags |= CHARGES_REMOVED
+                parts.append(pack_ids([charges.pop(charge) for charge in gone]))
+        activated = [charges[charge] for charge in sim.activated if charge in charges]
+        if activated:
+            flags |= CHARGES_ACTIVATED
+            parts.append(pack_ids(activated))
+        return frame(DELTA.pack(b"D", sim.ticks, flags) + b"".join(parts))
+
+# Estado da partida do lado do cliente, montado pelos quadros, com a mesma
+# cara de Simulation (grid, inimigos, power-ups, jogador, nível) para o jogo
+# desenhar com as mesmas funções
+class Mirror:
+    def __init__(self):
+        self.grid = None
+        self.enemies = []
+        self.powerups = []
+        self.player = Player(0, 0)
+        self.level = 0
+        self.ticks = 0
+        self.state = GameState.PLAYING
+        self.swarm = None
+        self.activated = []  # Cargas ativadas desde a última vez que o jogo olhou
+        self.controls = False
+        self.finished = False
+        self.enemy_ids = {}
+        self.powerup_ids = {}
+        self.charge_ids = {}
+
+    def apply(self, payload):
+        kind = payload[:1]
+        reader = Reader(payload)
+        if kind == b"D":
+            self.apply_delta(reader)
+        elif kind == b"K":
+            self.apply_keyframe(reader)
+        elif kind == b"C":
+            self.controls = reader.read(CONTROL)[1]
+        elif kind == b"E":
+            self.finished = True
+
+    def apply_keyframe(self, reader):
+        _, self.ticks, self.level, width, height, state = reader.read(KEYFRAME)
+        grid = self.grid = Grid(width, height)
+        size, = reader.read(COUNT)
+        grid.walls[:] = zlib.decompress(reader.take(size))
+        self.set_hud(reader.read(HUD))
+        self.set_message(reader)
+
+        self.enemy_ids = {}
+        for _ in range(reader.read(COUNT)[0]):
+            i, x, y, q = reader.read(ENEMY)
+            enemy = self.enemy_ids[i] = Enemy(x, y, ChargeType(q))
+            grid.enemies.add(enemy)
+        self.enemies = list(self.enemy_ids.values())
+
+        self.powerup_ids = {}
+        for _ in range(reader.read(COUNT)[0]):
+            i, x, y, kind = reader.read(POWERUP)
+            powerup = self.powerup_ids[i] = PowerUp(x, y, PowerUpType(kind))
+            grid.powerups.add(powerup)
+        self.powerups = list(self.powerup_ids.values())
+
+        charges = self.player.placed_charges
+        charges.clear()
+        self.charge_ids = {}
+        for _ in range(reader.read(COUNT)[0]):
+            self.add_charge(reader.read(CHARGE))
+
+    def apply_delta(self, reader):
+        _, ticks, flags = reader.read(DELTA)
+        elapsed = ticks - self.ticks
+        self.ticks = ticks
+        player = self.player
+        player.message_timer = max(0, player.message_timer - elapsed)
+        for charge in player.placed_charges.active:
+            charge.activation_timer -= elapsed
+
+        if flags & HUD_CHANGED:
+            self.set_hud(reader.read(HUD))
+        if flags & MESSAGE:
+            self.set_message(reader)
+
+        grid = self.grid
+        if flags & ENEMIES_MOVED:
+            for _ in range(reader.read(COUNT)[0]):
+                i, x, y, q = reader.read(ENEMY)
+                enemy = self.enemy_ids[i]
+                old_x, old_y = enemy.x, enemy.y
+                enemy.x, enemy.y, enemy.charge = x, y, ChargeType(q)
+                if (x, y) != (old_x, old_y):
+                    grid.enemies.move(enemy, old_x, old_y)
+        if flags & ENEMIES_REMOVED:
+            for i in self.read_ids(reader):
+                enemy = self.enemy_ids.pop(i)
+                grid.enemies.remove(enemy)
+            self.enemies = list(self.enemy_ids.values())
+        if flags & POWERUPS_REMOVED:
+            for i in self.read_ids(reader):
+                powerup = self.powerup_ids.pop(i)
+                grid.powerups.remove(powerup)
+            self.powerups = list(self.powerup_ids.values())
+
+        charges = player.placed_charges
+        if flags & CHARGES_PLACED:
+            for _ in range(reader.read(COUNT)[0]):
+                self.add_charge(reader.read(CHARGE))
+        if flags & CHARGES_REMOVED:
+            for i in self.read_ids(reader):
+                charge = self.charge_ids.pop(i)
+                charges.charges.remove(charge)
+                if charge.active:
+                    charges.active.remove(charge)
+            charges.version += 1
+        if flags & CHARGES_ACTIVATED:
+            for i in self.read_ids(reader):
+                charge = self.charge_ids[i]
+                charge.active = True
+                charge.activation_timer = 59  # Já descontado o tick da ativação
+                charges.active.append(charge)
+                self.activated.append(charge)
+            charges.version += 1
+
+    def set_hud(self, values):
+        player = self.player
+        (player.x, player.y, player.score, player.lives, player.max_charges,
+         radius, state) = values
+        player.field_radius = radius / 2
+        self.state = GameState(state)
+
+    def set_message(self, reader):
+        size, = reader.read(TEXT)
+        if size:
+            self.player.show_message(bytes(reader.take(size)).decode(errors="replace"))
+
+    def add_charge(self, values):
+        i, x, y, q, timer, active = values
+        charge = self.charge_ids[i] = Charge(x, y, ChargeType(q))
+        charge.active = active
+        charge.activation_timer = timer
+        charges = self.player.placed_charges
+        charges.append(charge)
+        if active:
+            charges.active.append(charge)
+        charges.version += 1
+
+    def read_ids(self, reader):
+        count, = reader.read(COUNT)
+        ids = array('I')
+        ids.frombytes(reader.take(4 * count))
+        return ids
+
+# Resumo do que um cliente vê: o mesmo na Simulation do servidor e no espelho
+def view_digest(game):
+    player = game.player
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((
+        game.level, player.x, player.y, player.score, player.lives, player.max_charges,
+        float(player.field_radius), game.state.value,
+        sorted((enemy.x, enemy.y, enemy.charge.value) for enemy in game.enemies),
+        sorted((powerup.x, powerup.y, powerup.type.value) for powerup in game.powerups),
+        [(charge.x, charge.y, charge.type.value, charge.active) for charge in player.placed_charges],
+    )).encode())
+    return digest.hexdigest()
+
+class Client:
+    def __init__(self, writer, plays):
+        self.writer = writer
+        self.plays = plays
+        self.frames = deque()
+        self.ready = asyncio.Event()
+        self.closing = False
+
+    def send(self, data, server):
+        frames = self.frames
+        if len(frames) >= QUEUE_FRAMES:
+            # Cliente atrasado: descarta os quadros de estado e recomeça de um
+            # quadro-chave, seguido dos eventos que estavam na fila
+            events = [queued for queued in frames if queued[FRAME.size:FRAME.size + 1] in EVENT_FRAMES]
+            frames.clear()
+            frames.append(server.keyframe())
+            frames.extend(events)
+            server.resyncs += 1
+            if data[FRAME.size:FRAME.size + 1] not in EVENT_FRAMES:
+                data = None  # O quadro-chave já traz este tick
+        if data is not None:
+            frames.append(data)
+        self.ready.set()
+
+    def close(self):
+        # Fecha depois de enviar o que já está na fila
+        self.closing = True
+        self.ready.set()
+
+    async def pump(self):
+        writer = self.writer
+        frames = self.frames
+        try:
+            while True:
+                if not frames:
+                    if self.closing:
+                        break
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                # Tudo o que está na fila vai em uma escrita só
+                data = b"".join(frames)
+                frames.clear()
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+class GameServer:
+    def __init__(self, level=1, seed=None, board=(GRID_WIDTH, GRID_HEIGHT), field=None, ai=False,
+                 bot=False, generator='classic'):
+        self.options = (board, field, ai, generator)
+        self.sim = Simulation(level, 'objects', seed, board, field, ai, generator)
+        self.sim.prefetch_next_level()
+        self.next_seed = None
+        self.encoder = StateEncoder()
+        self.encoder.track(self.sim)
+        self.clients = []
+        self.controller = None
+        self.pending = []
+        self.pause = 0
+        self.cached = (None, None)
+        self.bot = None
+        if bot:
+            # Sem ninguém jogando, o robô de lote.py joga
+            from lote import Bot
+            self.bot = Bot(random.Random(f"{self.sim.seed}:bot"))
+
+        # Estatísticas do laço de ticks
+        self.ticks = 0
+        self.late = 0
+        self.resyncs = 0
+        self.tick_times = deque(maxlen=10 * FPS)
+
+    def keyframe(self):
+        # Um quadro-chave por tick no máximo, dividido entre os clientes atrasados
+        key = (self.ticks, self.sim.grid)
+        if self.cached[0] != key:
+            self.cached = (key, self.encoder.keyframe(self.sim))
+        return self.cached[1]
+
+    def broadcast(self, data):
+        for client in self.clients:
+            client.send(data, self)
+
+    def assign_controller(self):
+        if self.controller is not None:
+            return
+        for client in self.clients:
+            if client.plays:
+                self.controller = client
+                client.send(frame(CONTROL.pack(b"C", True)), self)
+                return
+
+    async def handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            if hasattr(socket, "TCP_NOTSENT_LOWAT"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, SEND_BUFFER)
+            else:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # drain() espera sempre que o kernel não aceita tudo: o atraso fica na fila do cliente
+        writer.transport.set_write_buffer_limits(0)
+        try:
+            hello = await reader.readexactly(1)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        client = Client(writer, hello[0] == PLAY)
+        client.send(self.keyframe(), self)
+        self.clients.append(client)
+        self.assign_controller()
+        pump = asyncio.create_task(client.pump())
+        try:
+            while True:
+                data = await reader.read(256)
+                if not data:
+                    break
+                if client is self.controller:
+                    self.pending.extend(ACTIONS[code] for code in data if code < len(ACTIONS))
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.remove(client)
+            if client is self.controller:
+                self.controller = None
+                self.assign_controller()
+            client.close()
+            await pump
+
+    def tick(self):
+        sim = self.sim
+        self.ticks += 1
+        if self.pause:
+            # Tela de nível completo ou game over; depois segue o jogo
+            self.pause -= 1
+            if not self.pause:
+                if sim.state == GameState.LEVEL_COMPLETE:
+                    sim.next_level()
+                else:
+                    board, field, ai, generator = self.options
+                    sim = self.sim = Simulation(1, 'objects', self.next_seed, board, field, ai,
+                                                generator)
+                sim.prefetch_next_level()
+                self.encoder.track(sim)
+                self.broadcast(self.keyframe())
+            return
+
+        actions, self.pending = self.pending, []
+        if self.controller is None and self.bot is not None:
+            actions = self.bot.act(sim)
+        state = sim.step(actions)
+        self.broadcast(self.encoder.delta(sim))
+        if state != GameState.PLAYING:
+            self.pause = PAUSE_TICKS
+            if state == GameState.GAME_OVER:
+                # A semente da próxima partida sai já, para o primeiro nível
+                # ser gerado durante a pausa
+                board, _, _, generator = self.options
+                self.next_seed = random.randrange(2**32)
+                if generator == 'checked':
+                    level_cache.prefetch(self.next_seed, 0, board)
+
+    async def run(self, seconds=None):
+        # Passo fixo: um tick a cada TICK_SECONDS, sem esperar nenhum cliente
+        start = next_time = time.perf_counter()
+        while seconds is None or next_time - start < seconds:
+            begin = time.perf_counter()
+            self.tick()
+            self.tick_times.append(time.perf_counter() - begin)
+            next_time += TICK_SECONDS
+            delay = next_time - time.perf_counter()
+            if delay < -MAX_LAG:
+                next_time = time.perf_counter()
+            if delay < 0:
+                self.late += 1
+            await asyncio.sleep(max(0.0, delay))
+
+    async def shutdown(self, timeout=10):
+        # Avisa o fim e espera os clientes receberem tudo; quem não lê é derrubado
+        self.broadcast(frame(END.pack(b"E", self.sim.ticks)))
+        for client in list(self.clients):
+            client.close()
+        deadline = time.perf_counter() + timeout
+        while self.clients and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        for client in list(self.clients):
+            client.writer.transport.abort()
+
+async def serve(host, port, **options):
+    server = GameServer(**options)
+    listener = await asyncio.start_server(server.handle, host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Servidor em {address[0]}:{address[1]}")
+    async with listener:
+        await server.run()
+
+# Teste de carga: espectadores em outro processo, para o custo deles não
+# entrar na medida do laço de ticks do servidor
+async def spectate(port, slow, stats):
+    # Cliente "lento": buffers de recepção pequenos e pausas longas sem ler.
+    # O SO_RCVBUF vai antes do connect, senão a janela anunciada já é grande.
+    if slow:
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_BUFFER)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=SLOW_BUFFER)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2**16)
+    writer.write(bytes((SPECTATE,)))
+    mirror = Mirror()
+    frames = 0
+    received = 0
+    keyframes = 0
+    next_stall = time.perf_counter()  # Os lentos param logo depois do primeiro quadro
+    try:
+        while not mirror.finished:
+            header = await reader.readexactly(FRAME.size)
+            payload = await reader.readexactly(FRAME.unpack(header)[0])
+            mirror.apply(payload)
+            frames += 1
+            received += len(header) + len(payload)
+            if payload[:1] == b"K":
+                keyframes += 1
+            if slow and time.perf_counter() > next_stall:
+                await asyncio.sleep(slow)
+                next_stall = time.perf_counter() + 1.0
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    writer.close()
+    stats.append({'slow': bool(slow), 'frames': frames, 'bytes': received, 'keyframes': keyframes,
+                  'ticks': mirror.ticks, 'digest': view_digest(mirror) if mirror.grid else None})
+
+def spectators_main(port, count, slow, stall, results):
+    async def run():
+        stats = []
+        await asyncio.gather(*(spectate(port, stall if i < slow else 0, stats) for i in range(count)))
+        return stats
+    results.put(asyncio.run(run()))
+
+async def load_test(spectators=50, slow=2, seconds=10, level=3, seed=1, board=(GRID_WIDTH, GRID_HEIGHT),
+                    stall=None):
+    from multiprocessing import Process, Queue
+
+    if stall is None:
+        stall = seconds  # Os lentos só voltam a ler quando o teste acaba
+    server = GameServer(level, seed, board, bot=True)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    results = Queue()
+    process = Process(target=spectators_main, args=(port, spectators, slow, stall, results))
+    process.start()
+    while len(server.clients) < spectators:
+        await asyncio.sleep(0.01)
+
+    await server.run(seconds)
+    final = view_digest(server.sim)
+    await server.shutdown()
+    listener.close()
+    stats = await asyncio.get_running_loop().run_in_executor(None, results.get)
+    process.join()
+
+    times = sorted(server.tick_times)
+    fast = [client for client in stats if not client['slow']]
+    return {
+        'spectators': spectators,
+        'ticks': server.ticks,
+        'ticks_per_second': server.ticks / seconds,
+        'late_ticks': server.late,
+        'tick_p50_ms': times[len(times) // 2] * 1000,
+        'tick_max_ms': times[-1] * 1000,
+        'bytes_per_client_per_second': sum(c['bytes'] for c in stats) / len(stats) / seconds,
+        'keyframes_fast_client': max(c['keyframes'] for c in fast) if fast else 0,
+        'resyncs': server.resyncs,
+        'fast_clients_in_sync': sum(c['digest'] == final for c in fast),
+        'slow_clients_in_sync': sum(c['digest'] == final for c in stats if c['slow']),
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor de partidas em rede do EletroBlast")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--board", type=parse_board, default=(GRID_WIDTH, GRID_HEIGHT), metavar="LxA")
+    parser.add_argument("--field", choices=FIELD_MODES[1:],
+                        help="inimigos andam pelo campo resultante (precisa de NumPy)")
+    parser.add_argument("--ai", action="store_true",
+                        help="inimigos perseguem o jogador e fogem dos campos opostos")
+    parser.add_argument("--generator", choices=GENERATORS, default='classic',
+                        help="gerador de níveis (checked: área conectada e orçamento)")
+    parser.add_argument("--bot", action="store_true",
+                        help="o robô de lote.py joga enquanto nenhum jogador está conectado")
+    parser.add_argument("--load-test", type=int, metavar="N",
+                        help="roda um teste de carga local com N espectadores e sai")
+    parser.add_argument("--slow", type=int, default=2,
+                        help="espectadores lentos no teste de carga")
+    parser.add_argument("--stall", type=float,
+                        help="segundos que cada espectador lento passa sem ler (padrão: o teste todo)")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.load_test:
+        report = asyncio.run(load_test(args.load_test, args.slow, args.seconds, args.level,
+                                       args.seed or 1, args.board, args.stall))
+        for name, value in report.items():
+            print(f"{name}: {value:,.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        try:
+            asyncio.run(serve(args.host, args.port, level=args.level, seed=args.seed, board=args.board,
+                              field=args.field, ai=args.ai, bot=args.bot,
+                              generator=args.generator))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,700 @@
+# Núcleo de simulação do EletroBlast
+#
+# Contém toda a lógica do jogo (grid, jogador, inimigos, power-ups e
+# pontuação) sem nenhuma dependência de pygame. Importar este módulo não
+# abre janela nem inicializa o mixer, e Simulation.step() roda tão rápido
+# quanto a CPU permitir, sem o limite de 60 FPS do jogo.
+#
+# Meta de desempenho: >= 50.000 ticks/s em um tabuleiro do nível 20
+# (42 inimigos) em uma máquina de desenvolvimento comum. Para medir:
+#
+#     python simulacao.py --level 20 --ticks 100000
+
+import math
+import random
+import time
+from collections import deque
+from enum import Enum
+
+from grade import Grid
+from perfil import profiler
+
+# Constantes do jogo
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+GRID_SIZE = 50
+GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
+GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
+FPS = 60
+
+# Tempo máximo por nível nas partidas sem jogador (lote.py e ambiente.py),
+# em ticks (3 minutos de jogo)
+MAX_TICKS = 3 * 60 * FPS
+
+# Estados do jogo
+class GameState(Enum):
+    MENU = 0
+    PLAYING = 1
+    LEVEL_COMPLETE = 2
+    GAME_OVER = 3
+
+# Tipos de carga
+class ChargeType(Enum):
+    POSITIVE = 1
+    NEGATIVE = -1
+    DIPOLE = 0  # Dipolo tem ambas as cargas
+
+# Tipos de power-up
+class PowerUpType(Enum):
+    FIELD_STRENGTH = 1
+    EXTRA_CHARGE = 2
+    EXTRA_LIFE = 3
+
+# Ações do jogador (uma por tecla pressionada)
+class Action(Enum):
+    NONE = 0
+    LEFT = 1
+    RIGHT = 2
+    UP = 3
+    DOWN = 4
+    PLACE_POSITIVE = 5
+    PLACE_NEGATIVE = 6
+
+# Modos do motor de campo (None = só as regras de raio do campo)
+FIELD_MODES = [None, 'charges', 'all']
+
+# Geradores de nível: 'classic' é create_level, 'checked' é o de niveis.py
+# (área conectada, orçamento de dificuldade e próximo nível já pronto)
+GENERATORS = ['classic', 'checked']
+
+# Deslocamento de cada ação de movimento
+ACTION_MOVES = {
+    Action.LEFT: (-1, 0),
+    Action.RIGHT: (1, 0),
+    Action.UP: (0, -1),
+    Action.DOWN: (0, 1),
+}
+
+# Classes do jogo
+class Charge:
+    # Carga colocada pelo jogador
+    __slots__ = ('x', 'y', 'type', 'timer', 'active', 'activation_timer')
+
+    def __init__(self, x, y, charge_type):
+        self.x = x
+        self.y = y
+        self.type = charge_type
+        self.timer = 180
+        self.active = False
+        self.activation_timer = 0
+
+class ChargeStore:
+    # Cargas colocadas, em ordem de colocação, com a lista das ativas mantida
+    # à parte. Como todas duram o mesmo tempo, elas expiram na ordem em que
+    # foram colocadas e saem pela frente da fila em O(1). A versão muda
+    # sempre que o conjunto de cargas ativas muda.
+    __slots__ = ('charges', 'active', 'version')
+
+    def __init__(self):
+        self.charges = deque()
+        self.active = []
+        self.version = 0
+
+    def __len__(self):
+        return len(self.charges)
+
+    def __iter__(self):
+        return iter(self.charges)
+
+    def __getitem__(self, index):
+        return self.charges[index]
+
+    def append(self, charge):
+        self.charges.append(charge)
+
+    def clear(self):
+        self.charges.clear()
+        self.active.clear()
+        self.version += 1
+
+    def update(self, activated):
+        expired = 0
+        for charge in self.charges:
+            charge.timer -= 1
+
+            # Ativa automaticamente após 3 segundos
+            if charge.timer <= 0 and not charge.active:
+                charge.active = True
+                activated.append(charge)
+                charge.activation_timer = 60  # Campo fica ativo por 1 segundo
+                self.active.append(charge)
+                self.version += 1
+
+            # Desativa após o tempo de ativação
+            if charge.active:
+                charge.activation_timer -= 1
+                if charge.activation_timer <= 0:
+                    expired += 1
+
+        if expired:
+            self.version += 1
+            charges = self.charges
+            while expired and charges and charges[0].active and charges[0].activation_timer <= 0:
+                self.active.remove(charges.popleft())
+                expired -= 1
+            if expired:
+                # Fora de ordem (temporizadores alterados): filtra a fila toda
+                for charge in [c for c in charges if c.active and c.activation_timer <= 0]:
+                    charges.remove(charge)
+                    self.active.remove(charge)
+
+class Player:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.max_charges = 1  # Começa colocando apenas 1 campo por vez
+        self.placed_charges = ChargeStore()
+        self.activated = []  # Cargas ativadas no último update
+        self.field_strength = 1.0  # Intensidade do campo
+        self.field_radius = 2  # Raio do campo em células
+        self.score = 0
+        self.lives = 3
+        self.invincible = 0
+        self.message = ""
+        self.message_timer = 0
+
+    def move(self, dx, dy, grid):
+        new_x = self.x + dx
+        new_y = self.y + dy
+
+        # Verifica se a nova posição está dentro dos limites e não é uma parede
+        if not grid.is_wall(new_x, new_y):
+            self.x = new_x
+            self.y = new_y
+
+    def place_charge(self, charge_type):
+        if len(self.placed_charges) < self.max_charges:
+            self.placed_charges.append(Charge(self.x, self.y, charge_type))
+            return True
+        return False
+
+    def update(self):
+        # Retorna as cargas ativadas neste tick (o jogo toca o som para cada uma)
+        activated = self.activated
+        activated.clear()
+
+        # Atualiza temporizador de invencibilidade
+        if self.invincible > 0:
+            self.invincible -= 1
+
+        # Atualiza mensagem
+        if self.message_timer > 0:
+            self.message_timer -= 1
+
+        # Atualiza cargas colocadas
+        self.placed_charges.update(activated)
+
+        return activated
+
+    def show_message(self, message):
+        self.message = message
+        self.message_timer = 60  # Mostra por 1 segundo
+
+class Enemy:
+    def __init__(self, x, y, charge_type=ChargeType.POSITIVE):
+        self.x = x
+        self.y = y
+        self.charge = charge_type
+        self.health = 100
+        self.stunned = 0
+        self.move_counter = 0
+
+    def update(self, player, grid, fields=None, rng=random, efield=None, paths=None):
+        if self.stunned > 0:
+            self.stunned -= 1
+            return
+
+        self.move_counter += 1
+        if self.move_counter < 30:  # Move a cada 0.5 segundos
+            return
+        self.move_counter = 0
+
+        # Movimento aleatório
+        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        direction = rng.choice(directions)
+        if paths is not None:
+            # Com a IA, segue os mapas de distância e de perigo (caminhos.py)
+            direction = paths.step(self.x, self.y, self.charge.value) or direction
+        if efield is not None:
+            # Com o motor de campo, anda na direção da força do campo resultante
+            direction = efield.step(self.x, self.y, self.charge.value) or direction
+
+        new_x = self.x + direction[0]
+        new_y = self.y + direction[1]
+
+        # Verifica colisão com paredes
+        if not grid.is_wall(new_x, new_y):
+            self.x = new_x
+            self.y = new_y
+
+        # Verifica interação com campos elétricos ativos
+        if fields is None:
+            fields = FieldIndex(grid).active_fields(player)
+        for charge, cells in fields:
+            dx = self.x - charge.x
+            dy = self.y - charge.y
+
+            # Verifica se está no raio do campo e sem paredes no caminho
+            if self.y * grid.width + self.x in cells:
+                # Dipolo tem comportamento especial
+                if self.charge == ChargeType.DIPOLE:
+                    if charge.type == ChargeType.POSITIVE:
+                        # Parte negativa do dipolo é atraída
+                        self.charge = ChargeType.POSITIVE  # Transforma em carga positiva
+                    else:
+                        # Parte positiva do dipolo é atraída
+                        self.charge = ChargeType.NEGATIVE  # Transforma em carga negativa
+                    continue
+
+                # Cargas normais
+                if self.charge != charge.type:
+                    # Atração - inimigo é eliminado
+                    self.health = 0
+                else:
+                    # Repulsão - inimigo é empurrado
+                    force_dir = (int(dx / max(1, abs(dx))), int(dy / max(1, abs(dy))))
+                    new_x = self.x + force_dir[0]
+                    new_y = self.y + force_dir[1]
+
+                    if not grid.is_wall(new_x, new_y):
+                        self.x = new_x
+                        self.y = new_y
+
+    def has_wall_between(self, x1, y1, grid):
+        return has_wall_between(x1, y1, self.x, self.y, grid)
+
+class PowerUp:
+    def __init__(self, x, y, type):
+        self.x = x
+        self.y = y
+        self.type = type
+        self.active = True
+
+    def apply(self, player):
+        if self.type == PowerUpType.FIELD_STRENGTH:
+            player.field_strength += 0.5
+            player.field_radius += 0.5
+            return "Raio do Campo +"
+        elif self.type == PowerUpType.EXTRA_CHARGE:
+            player.max_charges += 1
+            return "Campo Extra +"
+        else:  # EXTRA_LIFE
+            player.lives += 1
+            return "Vida Extra +"
+
+def has_wall_between(x1, y1, x2, y2, grid):
+    # Bresenham's line algorithm para verificar paredes no caminho
+    dx = abs(x2 - x1)
+    dy = abs(y2 - y1)
+    x, y = x1, y1
+    sx = -1 if x1 > x2 else 1
+    sy = -1 if y1 > y2 else 1
+    err = dx - dy
+
+    walls = grid.walls
+    width = grid.width
+    while x != x2 or y != y2:
+        if walls[y * width + x]:
+            return True
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x += sx
+        if e2 < dx:
+            err += dx
+            y += sy
+    return False
+
+# Índice das células afetadas por cada campo elétrico
+#
+# Em vez de cada inimigo calcular a distância e percorrer a linha de Bresenham
+# até cada carga ativa a cada movimento, as células dentro do raio e com
+# linha de visão livre são calculadas uma vez por (célula da carga, raio) e
+# reaproveitadas enquanto o grid do nível não muda.
+class FieldIndex:
+    def __init__(self, grid):
+        self.grid = grid
+        self.cells = {}
+        self.fields = []
+        self.fields_version = None
+        self.fields_radius = None
+
+    def affected(self, x, y, radius):
+        key = (x, y, radius)
+        cells = self.cells.get(key)
+        if cells is None:
+            cells = set()
+            grid = self.grid
+            reach = int(radius)
+            for cy in range(max(0, y - reach), min(grid.height, y + reach + 1)):
+                for cx in range(max(0, x - reach), min(grid.width, x + reach + 1)):
+                    dx = cx - x
+                    dy = cy - y
+                    if (math.sqrt(dx*dx + dy*dy) <= radius and
+                        not has_wall_between(x, y, cx, cy, grid)):
+                        cells.add(cy * grid.width + cx)
+            cells = frozenset(cells)
+            self.cells[key] = cells
+        return cells
+
+    def active_fields(self, player):
+        # Lista (carga, células afetadas) das cargas ativas do jogador, refeita
+        # só quando o conjunto de cargas ativas ou o raio do campo mudam
+        charges = player.placed_charges
+        if charges.version != self.fields_version or player.field_radius != self.fields_radius:
+            self.fields_version = charges.version
+            self.fields_radius = player.field_radius
+            self.fields = [(charge, self.affected(charge.x, charge.y, player.field_radius))
+                           for charge in charges.active]
+        return self.fields
+
+# Função para criar um nível
+#
+# Tabuleiros maiores que a tela (modo de tabuleiro grande) recebem paredes e
+# inimigos proporcionais à área; no tamanho padrão o nível é o de sempre.
+def create_level(level_num, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    grid = Grid(width, height)
+    enemies = []
+    powerups = []
+    scale = max(1, (width * height) // (GRID_WIDTH * GRID_HEIGHT))
+
+    # Parede externa
+    grid.set_border()
+
+    # Adiciona algumas paredes internas
+    for _ in range((5 + level_num) * scale):
+        x = rng.randint(1, width-2)
+        y = rng.randint(1, height-2)
+        grid.set_wall(x, y)
+
+    # Adiciona inimigos
+    for _ in range((2 + level_num * 2) * scale):
+        x = rng.randint(1, width-2)
+        y = rng.randint(1, height-2)
+        if not grid.is_wall(x, y):
+            # 50% chance de carga positiva, 30% negativa, 20% dipolo
+            charge_type = rng.choices(
+                [ChargeType.POSITIVE, ChargeType.NEGATIVE, ChargeType.DIPOLE],
+                weights=[5, 3, 2]
+            )[0]
+            enemies.append(Enemy(x, y, charge_type))
+
+    # Adiciona power-ups (apenas um de campo ou carga extra, e raramente vida extra)
+    powerup_types = []
+
+    # Escolhe entre intensidade de campo ou carga extra
+    main_powerup = rng.choice([PowerUpType.FIELD_STRENGTH, PowerUpType.EXTRA_CHARGE])
+    powerup_types.append(main_powerup)
+
+    # 20% chance de aparecer uma vida extra
+    if rng.random() < 0.2:
+        powerup_types.append(PowerUpType.EXTRA_LIFE)
+
+    for powerup_type in powerup_types:
+        placed = False
+        attempts = 0
+        while not placed and attempts < 100:
+            x = rng.randint(1, width-2)
+            y = rng.randint(1, height-2)
+            if not grid.is_wall(x, y):
+                powerups.append(PowerUp(x, y, powerup_type))
+                placed = True
+            attempts += 1
+
+    # Posição inicial do jogador
+    player_x, player_y = 1, 1
+    while grid.is_wall(player_x, player_y):
+        player_x += 1
+        if player_x >= width-1:
+            player_x = 1
+            player_y += 1
+
+    return grid, player_x, player_y, enemies, powerups
+
+# Estado completo de uma partida, avançado um tick por vez
+class Simulation:
+    def __init__(self, level=1, backend='objects', seed=None, board=(GRID_WIDTH, GRID_HEIGHT),
+                 field=None, ai=False, generator='classic'):
+        # Cada partida tem sua semente e fluxos de números aleatórios próprios,
+        # então a mesma semente com as mesmas ações reproduz a partida inteira
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.level_rng = random.Random(f"{seed}:level")
+        self.enemy_rng = random.Random(f"{seed}:enemy")
+
+        self.level = level
+        self.state = GameState.PLAYING
+        self.ticks = 0
+        self.backend = backend
+        self.board = board  # Largura e altura do tabuleiro em células
+        self.swarm = None
+
+        # Motor de campo por superposição (campo.py, precisa de NumPy):
+        # None desliga, 'charges' soma as cargas colocadas e 'all' também as
+        # cargas dos inimigos
+        self.field = field
+        self.efield = None
+
+        # IA dos inimigos por mapas de distância compartilhados (caminhos.py):
+        # perseguem o jogador e fogem dos campos que os eliminariam
+        self.ai = ai
+        self.paths = None
+
+        self.generator = generator
+
+        # Eventos do último tick (usados pelo jogo para sons e efeitos)
+        self.activated = []
+        self.killed = []
+        self.picked = []
+
+        grid, player_x, player_y, enemies, powerups = self.generate()
+        self.player = Player(player_x, player_y)
+        self.load(grid, player_x, player_y, enemies, powerups)
+
+    def load(self, grid, player_x, player_y, enemies, powerups):
+        # Coloca um nível (gerado por create_level ou outro gerador) em jogo
+        self.grid = grid
+        self.enemies = enemies
+        self.powerups = powerups
+        self.field_index = FieldIndex(grid)
+        self.player.x = player_x
+        self.player.y = player_y
+        self.player.placed_charges.clear()
+        self.state = GameState.PLAYING
+
+        # Índice espacial das entidades (o backend NumPy tem o seu próprio)
+        for powerup in powerups:
+            grid.powerups.add(powerup)
+        if self.backend == 'numpy':
+            from inimigos_vetorizados import EnemyArrays
+            self.swarm = EnemyArrays(enemies, grid, self.enemy_rng.getrandbits(64))
+            self.enemies = self.swarm.views()
+        else:
+            for enemy in enemies:
+                grid.enemies.add(enemy)
+
+        if self.ai:
+            from caminhos import DistanceMaps
+            self.paths = DistanceMaps(grid)
+
+        if self.field:
+            from campo import FieldEngine
+            self.efield = FieldEngine(grid.width, grid.height, enemy_sources=self.field == 'all')
+            if self.efield.enemy_sources:
+                for enemy in enemies:
+                    self.efield.add(enemy.x, enemy.y, enemy.charge.value)
+
+    def next_level(self):
+        # Prepara próxima fase mantendo pontuação, vidas e power-ups do jogador
+        self.level += 1
+        self.load(*self.generate())
+
+    def generate(self):
+        # Gera o nível atual; com o gerador checado ele pode já estar no
+        # cache (veja prefetch_next_level)
+        if self.generator == 'checked':
+            from niveis import level_cache
+            return level_cache.get(self.seed, self.level, self.board)
+        return create_level(self.level, self.level_rng, *self.board)
+
+    def prefetch_next_level(self):
+        # Com o gerador checado, começa a gerar a próxima fase em segundo
+        # plano. Só o jogo e o servidor chamam: episódios do ambiente e
+        # tarefas do lote nunca chegam à fase seguinte.
+        if self.generator == 'checked':
+            from niveis import level_cache
+            level_cache.prefetch(self.seed, self.level, self.board)
+
+    def apply_action(self, action):
+        player = self.player
+        if action in ACTION_MOVES:
+            dx, dy = ACTION_MOVES[action]
+            player.move(dx, dy, self.grid)
+        elif action == Action.PLACE_POSITIVE:
+            player.place_charge(ChargeType.POSITIVE)
+        elif action == Action.PLACE_NEGATIVE:
+            player.place_charge(ChargeType.NEGATIVE)
+
+    def step(self, actions=()):
+        self.ticks += 1
+        self.killed.clear()
+        self.picked.clear()
+
+        # Ações do jogador
+        for action in actions:
+            self.apply_action(action)
+
+        if profiler.enabled:
+            with profiler.span('player_update'):
+                self.update_player()
+            with profiler.span('enemies'):
+                self.update_enemies()
+            with profiler.span('powerups'):
+                self.check_powerups()
+        else:
+            # Caminho sem instrumentação, usado na simulação em lote
+            self.update_player()
+            self.update_enemies()
+            self.check_powerups()
+
+        # Verifica se completou o nível
+        if len(self.enemies) == 0:
+            self.player.score += 500 * self.level
+            self.state = GameState.LEVEL_COMPLETE
+
+        return self.state
+
+    def update_player(self):
+        # Atualiza lógica do jogo
+        self.activated = self.player.update()
+
+    def update_enemies(self):
+        player = self.player
+        enemies = self.enemies
+
+        # Campos ativos calculados uma vez por tick para todos os inimigos
+        fields = self.field_index.active_fields(player)
+        efield = self.efield
+        if efield is not None:
+            efield.sync(player.placed_charges)
+        paths = self.paths
+        if paths is not None:
+            paths.update(player, self.field_index)
+
+        # Atualiza inimigos
+        if self.swarm is not None:
+            self.update_swarm(fields)
+            return
+        grid = self.grid
+        occupancy = grid.enemies
+        killed = self.killed
+        sources = efield is not None and efield.enemy_sources
+        for enemy in enemies:
+            old_x, old_y = enemy.x, enemy.y
+            if sources:
+                old_charge = enemy.charge
+            enemy.update(player, grid, fields, self.enemy_rng, efield, paths)
+            if enemy.x != old_x or enemy.y != old_y:
+                occupancy.move(enemy, old_x, old_y)
+            if sources and (enemy.x != old_x or enemy.y != old_y or
+                            enemy.charge is not old_charge or enemy.health <= 0):
+                efield.move_source(old_x, old_y, old_charge.value, enemy.x, enemy.y,
+                                   enemy.charge.value if enemy.health > 0 else 0)
+            if enemy.health <= 0:
+                player.score += 100 if enemy.charge != ChargeType.DIPOLE else 150
+                occupancy.remove(enemy)
+                killed.append(enemy)
+        if killed:
+            self.enemies = [enemy for enemy in enemies if enemy.health > 0]
+
+        # Verifica colisão com jogador (inclusive com quem foi eliminado agora)
+        if player.invincible == 0:
+            if occupancy.at(player.x, player.y) or any(
+                    enemy.x == player.x and enemy.y == player.y for enemy in killed):
+                self.hit_player()
+
+    def check_powerups(self):
+        player = self.player
+
+        # Verifica power-ups na célula do jogador
+        here = self.grid.powerups.at(player.x, player.y)
+        if not here:
+            return
+        for powerup in list(here):
+            if powerup.active:
+                powerup.active = False
+                message = powerup.apply(player)
+                player.show_message(message + "1")
+                player.score += 50
+                self.grid.powerups.remove(powerup)
+                self.powerups.remove(powerup)
+                self.picked.append(powerup)
+
+    def update_swarm(self, fields):
+        # Mesmas regras do laço de Enemy.update, em lote no backend NumPy
+        player = self.player
+        killed, hit = self.swarm.update(player, fields, self.efield, self.paths)
+        if killed:
+            for enemy in killed:
+                player.score += 100 if enemy.charge != ChargeType.DIPOLE else 150
+            self.killed.extend(killed)
+            self.enemies = self.swarm.views()
+        if hit and player.invincible == 0:
+            self.hit_player()
+
+    def hit_player(self):
+        player = self.player
+        player.lives -= 1
+        player.invincible = 60
+        if player.lives <= 0:
+            self.state = GameState.GAME_OVER
+
+# Cria uma partida, opcionalmente começando em uma fase de estresse
+def new_simulation(level=1, backend='objects', seed=None, stress=0, board=(GRID_WIDTH, GRID_HEIGHT),
+                   field=None, ai=False, generator='classic'):
+    sim = Simulation(level, backend, seed, board, field, ai, generator)
+    if stress:
+        from inimigos_vetorizados import create_stress_level
+        sim.load(*create_stress_level(stress, level, sim.level_rng, board))
+    return sim
+
+# Lê um tamanho de tabuleiro no formato "LARGURAxALTURA"
+def parse_board(text):
+    width, height = (int(n) for n in text.lower().split("x"))
+    if width < 3 or height < 3:
+        raise ValueError("tabuleiro precisa de pelo menos 3x3 células")
+    return width, height
+
+# Lê uma semente; replays e snapshots a gravam como inteiro de 64 bits sem sinal
+def parse_seed(text):
+    seed = int(text)
+    if not 0 <= seed < 2**64:
+        raise ValueError("semente precisa estar entre 0 e 2^64 - 1")
+    return seed
+
+# Mede ticks por segundo da simulação sem janela
+def run_headless(level=20, ticks=100000, backend='objects', stress=0, board=(GRID_WIDTH, GRID_HEIGHT),
+                 field=None, ai=False, generator='classic'):
+    sim = new_simulation(level, backend, stress=stress, board=board, field=field, ai=ai,
+                         generator=generator)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if sim.step() != GameState.PLAYING:
+            sim = new_simulation(level, backend, stress=stress, board=board, field=field, ai=ai,
+                                 generator=generator)
+    elapsed = time.perf_counter() - start
+    return ticks / elapsed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulação do EletroBlast sem janela")
+    parser.add_argument("--level", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--backend", choices=['objects', 'numpy'], default='objects')
+    parser.add_argument("--stress", type=int, default=0, metavar="N",
+                        help="fase de estresse com N inimigos")
+    parser.add_argument("--board", type=parse_board, default=(GRID_WIDTH, GRID_HEIGHT), metavar="LxA",
+                        help="tamanho do tabuleiro em células, por exemplo 512x512")
+    parser.add_argument("--field", choices=FIELD_MODES[1:],
+                        help="inimigos andam pelo campo resultante (precisa de NumPy)")
+    parser.add_argument("--ai", action="store_true",
+                        help="inimigos perseguem o jogador e fogem dos campos opostos")
+    parser.add_argument("--generator", choices=GENERATORS, default='classic',
+                        help="gerador de níveis (checked: área conectada e orçamento)")
+    args = parser.parse_args()
+
+    tps = run_headless(args.level, args.ticks, args.backend, args.stress, args.board, args.field,
+                       args.ai, args.generator)
+    print(f"Nível {args.level}: {tps:,.0f} ticks/s")
@@ -0,0 +1,272 @@
+# Mixagem do áudio: grupos de canais, roubo de vozes e eventos juntados
+#
+# Antes, cada carga ativada tocava charge.mp3 com Sound.play(), que pega
+# qualquer canal livre do mixer: com muitos power-ups E+ várias ativações
+# caem no mesmo tick e ocupam todos os canais. Aqui os sons passam por um
+# AudioManager:
+#
+# - cada som pertence a um grupo com canais reservados só para ele
+#   (CHANNEL_GROUPS), então as cargas nunca calam os outros sons;
+# - pedidos do mesmo som no mesmo frame viram uma voz só, um pouco mais
+#   alta, e um som não toca de novo antes de interval segundos;
+# - sem canal livre no grupo, a voz mais antiga de prioridade igual ou
+#   menor é interrompida (roubo de voz); se todas forem mais importantes, o
+#   pedido é descartado;
+# - a música toca em fluxo (pygame.mixer.music), sem decodificar o arquivo
+#   inteiro, e é pausada e retomada em vez de recomeçar do início;
+# - NullBackend não usa o mixer: com --mute ou com o driver de áudio dummy
+#   do SDL (benchmarks e testes sem tela) nada é inicializado nem
+#   decodificado, e só a contabilidade das vozes roda.
+#
+# Para ver quantos pedidos viram vozes em uma partida com muitas cargas:
+#
+#     python som.py --charges 12 --ticks 3600
+
+import os
+import time
+
+import pygame
+
+from recursos import assets
+
+# Canais reservados por grupo
+CHANNEL_GROUPS = {'charges': 4, 'effects': 3, 'ui': 1}
+
+# Ganho de volume por pedido extra juntado na mesma voz
+COALESCE_GAIN = 0.25
+
+# Duração suposta dos sons quando não há mixer para perguntar
+NULL_LENGTH = 0.5
+
+class PygameBackend:
+    silent = False
+
+    def __init__(self, channels):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(channels)
+        pygame.mixer.set_reserved(channels)  # Sound.play() solto não pega estes canais
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+
+    def preload(self, names):
+        assets.load_in_background(sounds=names)
+
+    def length(self, name):
+        return assets.sound(name).get_length()
+
+    def play(self, channel, name, volume):
+        voice = self.channels[channel]
+        voice.set_volume(volume)
+        voice.play(assets.sound(name))  # Interrompe o que o canal tocava
+
+    def play_music(self, name, loops):
+        # Música em fluxo: só o trecho que está tocando fica decodificado
+        if name not in assets.missing:
+            try:
+                pygame.mixer.music.load(name)
+                pygame.mixer.music.play(loops)
+                return True
+            except (pygame.error, OSError):
+                assets.missing.add(name)
+        pygame.mixer.music.stop()
+        return False
+
+    def pause_music(self):
+        pygame.mixer.music.pause()
+
+    def resume_music(self):
+        pygame.mixer.music.unpause()
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+
+class NullBackend:
+    silent = True
+
+    def __init__(self, channels=0):
+        # pygame.init() pode já ter aberto o dispositivo de áudio
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
+
+    def preload(self, names):
+        pass
+
+    def length(self, name):
+        return NULL_LENGTH
+
+    def play(self, channel, name, volume):
+        pass
+
+    def play_music(self, name, loops):
+        return True
+
+    def pause_music(self):
+        pass
+
+    def resume_music(self):
+        pass
+
+    def stop_music(self):
+        pass
+
+class AudioManager:
+    def __init__(self, groups=CHANNEL_GROUPS, backend=None):
+        # Índices dos canais de cada grupo
+        self.groups = {}
+        first = 0
+        for group, count in groups.items():
+            self.groups[group] = range(first, first + count)
+            first += count
+        self.channel_count = first
+        self.backend = backend
+
+        self.sounds = {}  # nome -> (grupo, volume, intervalo, prioridade)
+        self.lengths = {}
+        self.pending = {}  # nome -> pedidos desde o último flush
+        self.last_played = {}
+        self.voices = [None] * first  # canal -> (prioridade, início, fim)
+        self.music = None
+        self.music_paused = False
+        self.stats = dict.fromkeys(('requested', 'played', 'coalesced', 'limited', 'stolen',
+                                    'dropped'), 0)
+
+    def start(self, mute=False):
+        # Abre o mixer, a não ser com --mute, com o driver de áudio dummy ou
+        # se não houver dispositivo de áudio
+        if mute or os.environ.get("SDL_AUDIODRIVER") == "dummy":
+            self.backend = NullBackend()
+        else:
+            try:
+                self.backend = PygameBackend(self.channel_count)
+            except pygame.error as error:
+                print(f"Sem áudio: {error}")
+                self.backend = NullBackend()
+        self.lengths.clear()
+        self.backend.preload(list(self.sounds))
+        return self.backend
+
+    def register(self, name, group, volume=1.0, interval=0.0, priority=0):
+        self.sounds[name] = (group, volume, interval, priority)
+
+    def play(self, name):
+        # Só anota o pedido; o som sai no próximo flush()
+        self.stats['requested'] += 1
+        self.pending[name] = self.pending.get(name, 0) + 1
+
+    def flush(self, now=None):
+        # Chamado uma vez por frame: uma voz por som pedido
+        if not self.pending:
+            return
+        if self.backend is None:
+            self.start()
+        if now is None:
+            now = time.perf_counter()
+        stats = self.stats
+        for name, count in self.pending.items():
+            stats['coalesced'] += count - 1
+            group, volume, interval, priority = self.sounds[name]
+            last = self.last_played.get(name)
+            if last is not None and now - last < interval:
+                stats['limited'] += 1
+                continue
+            channel = self.pick(group, priority, now)
+            if channel is None:
+                stats['dropped'] += 1
+                continue
+            length = self.lengths.get(name)
+            if length is None:
+                length = self.lengths[name] = self.backend.length(name)
+            self.voices[channel] = (priority, now, now + length)
+            self.backend.play(channel, name, min(1.0, volume * (1 + COALESCE_GAIN * (count - 1))))
+            self.last_played[name] = now
+            stats['played'] += 1
+        self.pending.clear()
+
+    def pick(self, group, priority, now):
+        # Canal livre do grupo ou, se não houver, a voz mais antiga que pode
+        # ser interrompida
+        oldest = None
+        for channel in self.groups[group]:
+            voice = self.voices[channel]
+            if voice is None or voice[2] <= now:
+                return channel
+            if voice[0] <= priority and (oldest is None or voice[1] < self.voices[oldest][1]):
+                oldest = channel
+        if oldest is not None:
+            self.stats['stolen'] += 1
+        return oldest
+
+    def busy(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        return sum(1 for voice in self.voices if voice is not None and voice[2] > now)
+
+    def play_music(self, name, loops=-1):
+        # A mesma música continua de onde parou em vez de recomeçar
+        if self.backend is None:
+            self.start()
+        if name == self.music:
+            if self.music_paused:
+                self.backend.resume_music()
+                self.music_paused = False
+            return
+        self.music = name if self.backend.play_music(name, loops) else None
+        self.music_paused = False
+
+    def pause_music(self):
+        if self.music and not self.music_paused:
+            self.backend.pause_music()
+            self.music_paused = True
+
+    def stop_music(self):
+        if self.backend is not None:
+            self.backend.stop_music()
+        self.music = None
+        self.music_paused = False
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    from simulacao import FPS, GameState, ChargeType, Simulation
+
+    parser = argparse.ArgumentParser(description="Sons de ativação de carga pelo AudioManager, sem mixer")
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--charges", type=int, default=12, help="cargas que o jogador pode colocar")
+    parser.add_argument("--level", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    manager = AudioManager(backend=NullBackend())
+    manager.register("charge.mp3", 'charges', volume=0.6, interval=0.05)
+    sim = Simulation(args.level, seed=args.seed)
+    player = sim.player
+    player.max_charges = args.charges
+    player.lives = 10**9
+    rng = random.Random(args.seed)
+    free = sim.grid.free_cells()
+
+    # Uma carga por tick sempre que possível, espalhadas pelo tabuleiro, como
+    # no cenário many_charges de benchmark.py; no primeiro tick o jogador
+    # coloca todas de uma vez
+    same_tick = peak = 0
+    for tick in range(args.ticks):
+        saved = player.x, player.y
+        for _ in range(player.max_charges - len(player.placed_charges) if tick == 0 else 1):
+            player.x, player.y = rng.choice(free)
+            player.place_charge(rng.choice([ChargeType.POSITIVE, ChargeType.NEGATIVE]))
+        player.x, player.y = saved
+        if sim.step() != GameState.PLAYING:
+            break
+        for _ in sim.activated:
+            manager.play("charge.mp3")
+        same_tick = max(same_tick, len(sim.activated))
+        now = tick / FPS
+        manager.flush(now)
+        peak = max(peak, manager.busy(now))
+
+    stats = manager.stats
+    print(f"{stats['requested']} ativações (até {same_tick} no mesmo tick) viraram "
+          f"{stats['played']} vozes, no máximo {peak} tocando juntas")
+    print(f"juntadas: {stats['coalesced']}, limitadas: {stats['limited']}, "
+          f"roubadas: {stats['stolen']}, descartadas: {stats['dropped']}")
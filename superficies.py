@@ -0,0 +1,170 @@
+# Cache de superfícies com transparência dos campos das cargas
+#
+# Um campo ativo criava uma Surface SRCALPHA (2r x 2r) nova por frame e
+# redesenhava o círculo enquanto o alfa diminuía. Aqui essas superfícies são
+# criadas uma vez por (cor, raio, faixa de alfa), já convertidas com
+# convert_alpha(), e ficam em um cache LRU; a animação do campo vira só um
+# blit de uma superfície pronta. (O quadrado da carga colocada vem do atlas
+# de sprites de jogo.py.)
+#
+# Também guarda em disco superfícies caras de produzir (o fundo do menu já
+# escalado e o atlas de sprites), em formato bruto com um cabeçalho mínimo,
+# identificadas por um hash do conteúdo que as gerou. Assim os próximos
+# lançamentos só leem os bytes, sem decodificar PNG nem escalar.
+
+import hashlib
+import os
+import struct
+from collections import OrderedDict
+
+import pygame
+
+# Largura das faixas de alfa do campo (alfa do círculo vai de 0 a 80)
+FIELD_ALPHA_STEP = 4
+
+# Memória máxima de pixels de um cache; o círculo do campo tem (2 * raio)²
+# pixels e cresce com os power-ups de raio, então contar entradas não basta
+CACHE_BYTES = 32 * 1024 * 1024
+
+def surface_bytes(surface):
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+class SurfaceCache:
+    def __init__(self, max_bytes=CACHE_BYTES, alpha=True):
+        self.max_bytes = max_bytes
+        self.alpha = alpha  # False para superfícies opacas (convert em vez de convert_alpha)
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = build()
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if self.alpha else surface.convert()
+        self.surfaces[key] = surface
+        self.bytes += surface_bytes(surface)
+        # Descarta os menos usados até caber (a nova fica mesmo se for maior que tudo)
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= surface_bytes(old)
+        return surface
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.surfaces),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+surface_cache = SurfaceCache()
+
+def field_surface(color, radius, alpha):
+    # Círculo do campo elétrico com o alfa arredondado para a faixa
+    alpha -= alpha % FIELD_ALPHA_STEP
+
+    def build():
+        s = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+        pygame.draw.circle(s, (color[0], color[1], color[2], alpha), (radius, radius), radius)
+        return s
+    return surface_cache.get(('field', color, radius, alpha), build)
+
+# Cache em disco: "EBSF", formato dos pixels (4 bytes), largura e altura
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CACHE_MAGIC = b"EBSF"
+CACHE_HEADER = struct.Struct("<4s4sHH")
+
+def cache_key(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+    return digest.hexdigest()
+
+def load_cached(key):
+    # Superfície gravada com save_cached, ou None se não houver ou estiver corrompida
+    try:
+        with open(os.path.join(CACHE_DIR, key + ".raw"), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, fmt, width, height = CACHE_HEADER.unpack_from(data)
+    fmt = fmt.decode().strip()
+    pixels = data[CACHE_HEADER.size:]
+    if magic != CACHE_MAGIC or len(pixels) != width * height * len(fmt):
+        return None
+    return pygame.image.frombytes(pixels, (width, height), fmt)
+
+def save_cached(key, surface, fmt):
+    # fmt é "RGB" para superfícies opacas ou "RGBA"; falhas de escrita são ignoradas
+    path = os.path.join(CACHE_DIR, key + ".raw")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, fmt.ljust(4).encode(), *surface.get_size()))
+            f.write(pygame.image.tobytes(surface, fmt))
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+# Atlas de sprites: todos os sprites de um tamanho em uma única superfície
+# convertida para o formato da tela, desenhados uma vez (ou lidos do cache em
+# disco) e copiados com um blit de uma área do atlas. Sprites sem partes
+# translúcidas usam alpha=False: o atlas fica opaco com uma cor chave
+# codificada em RLE, que o SDL copia bem mais rápido que alfa por pixel.
+ATLAS_COLUMNS = 8
+ATLAS_COLORKEY = (255, 0, 255)
+
+class Atlas:
+    def __init__(self, cell, sprites, key, alpha=True):
+        # sprites: lista de (nome, função que desenha o sprite em uma
+        # superfície cell x cell); key identifica o desenho no cache em disco
+        self.rects = {}
+        for i, (name, paint) in enumerate(sprites):
+            self.rects[name] = pygame.Rect((i % ATLAS_COLUMNS) * cell, (i // ATLAS_COLUMNS) * cell,
+                                           cell, cell)
+        rows = (len(sprites) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+        size = (ATLAS_COLUMNS * cell, rows * cell)
+
+        fmt = "RGBA" if alpha else "RGB"
+        key = cache_key("atlas", key, size, fmt, [name for name, paint in sprites])
+        surface = load_cached(key)
+        if surface is None or surface.get_size() != size:
+            if alpha:
+                surface = pygame.Surface(size, pygame.SRCALPHA)
+            else:
+                surface = pygame.Surface(size)
+                surface.fill(ATLAS_COLORKEY)
+            for name, paint in sprites:
+                paint(surface.subsurface(self.rects[name]))
+            save_cached(key, surface, fmt)
+
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        if alpha:
+            surface.set_alpha(255, pygame.RLEACCEL)
+        else:
+            surface.set_colorkey(ATLAS_COLORKEY, pygame.RLEACCEL)
+        self.surface = surface
+
+    def blit(self, target, name, pos):
+        target.blit(self.surface, pos, self.rects[name])